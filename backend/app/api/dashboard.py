@@ -0,0 +1,23 @@
+"""
+首页看板 API
+
+一次请求返回投资组合汇总、持仓列表、基金列表和持仓基金实时估值
+"""
+from fastapi import APIRouter
+
+from .. import schemas
+from ..services.dashboard import build_dashboard
+from ..utils.json_response import prebuilt_response
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+@router.get("", response_model=schemas.DashboardResponse)
+async def get_dashboard():
+    """
+    获取首页看板数据
+
+    各部分单独缓存（stale-while-revalidate），未命中的部分并发计算；
+    各部分已按响应模型序列化，直接渲染不再二次校验
+    """
+    return prebuilt_response(await build_dashboard())
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session
 from typing import List
 import logging
 
 from ..database import get_db
-from .. import crud, schemas, models
+from .. import crud, schemas
 from ..services.fund_fetcher import FundDataFetcher
+from ..utils.json_response import prebuilt_response
 
 logger = logging.getLogger(__name__)
 
@@ -37,34 +37,8 @@ def create_fund(fund: schemas.FundCreate, db: Session = Depends(get_db)):
 @router.get("/", response_model=List[schemas.FundResponse])
 def get_funds(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """获取所有基金列表（包含持仓信息和股票持仓统计）"""
-    # 子查询 - 获取每只基金的股票持仓统计
-    stock_positions_subquery = db.query(
-        models.FundStockPosition.fund_id,
-        func.count(models.FundStockPosition.id).label('count'),
-        func.max(models.FundStockPosition.updated_at).label('last_update')
-    ).group_by(models.FundStockPosition.fund_id).subquery()
-
-    # 查询基金列表，包含持仓统计
-    funds = db.query(models.Fund)\
-        .options(joinedload(models.Fund.holdings))\
-        .outerjoin(stock_positions_subquery, models.Fund.id == stock_positions_subquery.c.fund_id)\
-        .add_columns(
-            stock_positions_subquery.c.count.label('stock_positions_count'),
-            stock_positions_subquery.c.last_update.label('stock_positions_updated_at')
-        )\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-
-    # 组装响应数据
-    result = []
-    for fund, stock_count, stock_updated in funds:
-        fund_dict = schemas.FundResponse.model_validate(fund).model_dump()
-        fund_dict['stock_positions_count'] = stock_count or 0
-        fund_dict['stock_positions_updated_at'] = stock_updated
-        result.append(schemas.FundResponse(**fund_dict))
-
-    return result
+    # 轻量查询路径：只取需要的列，直接按 FundResponse 结构渲染，跳过 ORM 装配和二次校验
+    return prebuilt_response(crud.get_funds_overview_rows(db, skip=skip, limit=limit))
 
 
 @router.get("/{fund_id}", response_model=schemas.FundResponse)
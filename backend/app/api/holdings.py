@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from decimal import Decimal
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import get_async_db, get_db
+from .. import crud, crud_async, schemas
 
 router = APIRouter(prefix="/api/holdings", tags=["holdings"])
 
@@ -77,15 +78,15 @@ def create_holding(holding: schemas.HoldingCreate, db: Session = Depends(get_db)
 
 
 @router.get("/", response_model=List[schemas.HoldingResponse])
-def get_holdings(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_holdings(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """获取所有持仓"""
-    return crud.get_holdings(db, skip=skip, limit=limit)
+    return await crud_async.get_holdings(db, skip=skip, limit=limit)
 
 
 @router.get("/{fund_id}", response_model=schemas.HoldingResponse)
-def get_holding(fund_id: int, db: Session = Depends(get_db)):
+async def get_holding(fund_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取特定基金持仓"""
-    holding = crud.get_holding(db, fund_id)
+    holding = await crud_async.get_holding(db, fund_id)
     if not holding:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,17 @@
+"""
+Prometheus 指标导出 API
+
+GET /metrics：以 Prometheus 文本格式导出 app.utils.metrics 注册表中的全部指标
+"""
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..utils.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """导出 Prometheus 指标"""
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
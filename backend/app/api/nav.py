@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, date
 import logging
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import get_async_db, get_db
+from .. import crud, crud_async, schemas
+from ..services import nav_sync
 from ..services.fund_fetcher import FundDataFetcher
-from ..services.efinance_client import efinance_client
-from ..utils.retry_helper import APICallError
+from ..utils.json_response import prebuilt_response
+from ..services.realtime_valuation import build_batch_stock_valuations
+from ..services.intraday_recorder import intraday_recorder
+from ..services.position_index import position_index
+from ..utils.cache_invalidation import invalidation_bus
 
 logger = logging.getLogger(__name__)
 
@@ -18,17 +24,46 @@ router = APIRouter(prefix="/api/nav", tags=["nav"])
 _realtime_cache = {}
 
 
+def _purge_realtime_cache(fund_codes):
+    """净值写入后清理实时估值内存缓存（响应中包含最新正式净值）"""
+    if fund_codes is None:
+        _realtime_cache.clear()
+        return
+    for fund_code in fund_codes:
+        _realtime_cache.pop(f"realtime_{fund_code}", None)
+
+
+invalidation_bus.subscribe("nav", _purge_realtime_cache)
+
+
+@router.get("/sync-status", response_model=schemas.NavSyncStatusResponse)
+def get_nav_sync_status(limit: int = 7, db: Session = Depends(get_db)):
+    """每日净值同步任务最近的运行记录，以及当前连续失败的基金"""
+    runs = crud.get_sync_job_runs(db, nav_sync.NIGHTLY_JOB, limit=limit)
+    failing = [
+        schemas.FundSyncFailure(
+            fund_code=fund_code,
+            consecutive_failures=state.consecutive_failures,
+            last_error=state.last_error,
+            last_attempt_at=state.last_attempt_at,
+            next_eligible_at=state.next_eligible_at,
+        )
+        for fund_code, state in crud.get_failing_fund_sync_states(db)
+    ]
+    return schemas.NavSyncStatusResponse(runs=runs, failing_funds=failing)
+
+
 @router.get("/{fund_code}", response_model=schemas.NavHistoryResponse)
-def get_latest_nav(fund_code: str, db: Session = Depends(get_db)):
+async def get_latest_nav(fund_code: str, db: AsyncSession = Depends(get_async_db)):
     """获取基金最新净值"""
-    fund = crud.get_fund_by_code(db, fund_code)
+    fund = await crud_async.get_fund_by_code(db, fund_code)
     if not fund:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"基金代码 {fund_code} 不存在"
         )
 
-    nav = crud.get_latest_nav(db, fund.id)
+    nav = await crud_async.get_latest_nav(db, fund.id)
     if not nav:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,22 +73,38 @@ def get_latest_nav(fund_code: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{fund_code}/history", response_model=List[schemas.NavHistoryResponse])
-def get_nav_history(
+async def get_nav_history(
     fund_code: str,
     start_date: date = None,
     end_date: date = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取基金历史净值"""
-    fund = crud.get_fund_by_code(db, fund_code)
+    fund = await crud_async.get_fund_by_code(db, fund_code)
     if not fund:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"基金代码 {fund_code} 不存在"
         )
 
-    return crud.get_nav_history(db, fund.id, start_date, end_date, limit)
+    return prebuilt_response(await crud_async.get_nav_history_rows(db, fund.id, start_date, end_date, limit))
+
+
+@router.get("/{fund_code}/intraday", response_model=schemas.IntradayNavResponse)
+def get_intraday_nav(fund_code: str, day: Optional[date] = None):
+    """
+    获取基金日内估值曲线
+
+    数据由日内估值记录器在交易时间定时采样写入 Redis，
+    本接口只读取已记录的数据，不调用外部 API
+
+    Args:
+        fund_code: 基金代码
+        day: 日期（默认今天），格式 YYYY-MM-DD
+    """
+    series = intraday_recorder.get_series(fund_code, day)
+    return schemas.IntradayNavResponse(fund_code=fund_code, **series)
 
 
 @router.post("/sync-all", response_model=schemas.SyncResponse)
@@ -69,8 +120,19 @@ def sync_all_nav(db: Session = Depends(get_db)):
     )
 
 
+@router.post("/sync-history", response_model=schemas.NavHistorySyncResponse)
+def sync_nav_history(force: bool = False, db: Session = Depends(get_db)):
+    """
+    增量同步所有基金的净值历史
+
+    按 fund_sync_state 水位线只拉取缺失的净值；已是最新或处于失败退避期的基金跳过，
+    force=true 时忽略这两项
+    """
+    return nav_sync.sync_nav_history(db, force=force)
+
+
 @router.get("/{fund_code}/realtime", response_model=schemas.RealtimeNavResponse)
-async def get_realtime_valuation(
+def get_realtime_valuation(
     fund_code: str,
     db: Session = Depends(get_db)
 ):
@@ -177,7 +239,7 @@ async def get_realtime_valuation(
 
 
 @router.post("/realtime/batch", response_model=schemas.BatchRealtimeNavResponse)
-async def get_batch_realtime_valuation(
+def get_batch_realtime_valuation(
     fund_codes: List[str],
     db: Session = Depends(get_db)
 ):
@@ -247,7 +309,7 @@ async def get_batch_realtime_valuation(
 
 
 @router.get("/{fund_code}/realtime-stock", response_model=schemas.StockRealtimeNavResponse)
-async def get_fund_realtime_nav_by_stocks(
+def get_fund_realtime_nav_by_stocks(
     fund_code: str,
     db: Session = Depends(get_db)
 ):
@@ -376,6 +438,52 @@ async def get_fund_realtime_nav_by_stocks(
     # return schemas.StockRealtimeNavResponse(**result)
 
 
+@router.get("/realtime/stock-board", response_model=schemas.StockRealtimeBoardResponse)
+def get_stock_realtime_board(
+    fund_codes: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    基于股票持仓的估值看板
+
+    持仓反向索引（position_index）中所有股票的行情走实时行情缓存获取，
+    只有涨跌幅变化的股票会按差值调整持有它们的基金，不逐只基金重新计算
+
+    Args:
+        fund_codes: 只返回这些基金（逗号分隔，默认索引中的全部基金）
+    """
+    codes = [code.strip() for code in fund_codes.split(",") if code.strip()] if fund_codes else None
+    changed = position_index.refresh_quotes()
+    estimates = position_index.estimates(codes)
+
+    funds = crud.get_funds_by_codes(db, list(estimates))
+    navs = crud.get_latest_navs(db, [fund.id for fund in funds])
+    update_time = position_index.quotes_updated_at or datetime.now()
+
+    valuations = []
+    for fund in funds:
+        nav = navs.get(fund.id)
+        increase_rate, stock_count = estimates[fund.fund_code]
+        if nav is None or stock_count == 0:
+            continue
+        latest_nav = float(nav.unit_nav)
+        valuations.append(schemas.StockRealtimeNavResponse(
+            fund_code=fund.fund_code,
+            realtime_nav=round(latest_nav * (1 + increase_rate / 100), 4),
+            increase_rate=round(increase_rate, 2),
+            latest_nav=latest_nav,
+            stock_count=stock_count,
+            update_time=update_time,
+            data_source="position_index"
+        ))
+
+    return schemas.StockRealtimeBoardResponse(
+        valuations=valuations,
+        changed_funds=len(changed),
+        update_time=update_time
+    )
+
+
 @router.post("/realtime/batch-stock", response_model=schemas.BatchRealtimeNavResponse)
 async def get_batch_realtime_valuation_by_stocks(
     fund_codes: List[str],
@@ -392,152 +500,13 @@ async def get_batch_realtime_valuation_by_stocks(
     2. 有股票持仓的基金：使用股票持仓估值
     3. 降级方案：使用最新正式净值的日增长率
 
+    盘中推送通道 /ws/realtime 复用同一计算逻辑
+
     Args:
         fund_codes: 基金代码列表
 
     Returns:
         批量实时估值数据
     """
-    from ..services.tushare_service import tushare_service
-
-    fetcher = FundDataFetcher()
-    is_trading = fetcher.is_trading_time()
-
-    valuations = []
-
-    # 获取基金信息
-    funds = crud.get_funds_by_codes(db, fund_codes)
-    fund_id_map = {f.fund_code: f.id for f in funds}
-    fund_types = {f.fund_code: f.fund_type for f in funds}
-
-    if is_trading:
-        # ========== 交易时间处理 ==========
-
-        # 1. 分离场内和场外基金
-        listed_funds = []
-        offshore_funds = []
-
-        for fund_code in fund_codes:
-            fund_type = fund_types.get(fund_code)
-            if FundDataFetcher.is_listed_fund(fund_type):
-                listed_funds.append(fund_code)
-            else:
-                offshore_funds.append(fund_code)
-
-        # 2. 处理场内基金（实时股价，带重试）
-        if listed_funds:
-            try:
-                etf_data = efinance_client.get_realtime_quotes('ETF')
-                lof_data = efinance_client.get_realtime_quotes('LOF')
-
-                # 合并数据
-                listed_data = None
-                if etf_data is not None and not etf_data.empty:
-                    if lof_data is not None and not lof_data.empty:
-                        import pandas as pd
-                        listed_data = pd.concat([etf_data, lof_data], ignore_index=True)
-                    else:
-                        listed_data = etf_data
-                elif lof_data is not None and not lof_data.empty:
-                    listed_data = lof_data
-
-                if listed_data is not None:
-                    for code in listed_funds:
-                        fund_row = listed_data[listed_data['股票代码'] == code]
-                        if not fund_row.empty:
-                            row = fund_row.iloc[0]
-                            fund_id = fund_id_map.get(code)
-                            latest_nav = crud.get_latest_nav(db, int(fund_id)) if fund_id else None  # type: ignore[arg-type]
-                            valuations.append(schemas.RealtimeNavItem(
-                                fund_code=code,
-                                data_source="stock",
-                                is_listed_fund=True,
-                                current_price=float(row['最新价']),
-                                increase_rate=float(row['涨跌幅']),
-                                estimate_time=datetime.now(),
-                                latest_nav_date=latest_nav.date if latest_nav else None,
-                                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
-                            ))
-                        else:
-                            # 场内基金未找到，降级到场外处理
-                            offshore_funds.append(code)
-            except APICallError as e:
-                logger.error(f"获取场内基金实时股价失败: {e.message}, error_type={e.error_type}")
-                offshore_funds.extend(listed_funds)
-            except Exception as e:
-                logger.error(f"获取场内基金实时股价失败: {e}")
-                offshore_funds.extend(listed_funds)
-
-        # 3. 处理场外基金（基于股票持仓）
-        # v1.7.3: 股票实时估值功能已禁用（efinance API 不可用）
-        # 直接跳过股票持仓估值，使用 efinance 降级方案
-        for fund_code in offshore_funds:
-            fund_id = fund_id_map.get(fund_code)
-            if fund_id is None:  # type: ignore[truthy-bool-function]
-                continue
-
-            # 使用 efinance 降级方案（跳过股票持仓估值）
-            await _append_efinance_fallback(fund_code, int(fund_id), valuations, db)  # type: ignore[arg-type]
-    else:
-        # ========== 非交易时间处理 ==========
-        # 返回最新正式净值的日增长率
-        for fund in funds:
-            latest_nav = crud.get_latest_nav(db, fund.id)
-            valuations.append(schemas.RealtimeNavItem(
-                fund_code=fund.fund_code,
-                data_source="nav",
-                is_listed_fund=False,
-                increase_rate=float(latest_nav.daily_growth * 100) if latest_nav and latest_nav.daily_growth else None,
-                estimate_time=None,
-                latest_nav_date=latest_nav.date if latest_nav else None,
-                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
-            ))
-
-    return schemas.BatchRealtimeNavResponse(
-        valuations=valuations,
-        update_time=datetime.now(),
-        is_trading_time=is_trading
-    )
-
-
-async def _append_efinance_fallback(fund_code: str, fund_id: int, valuations: List, db: Session):
-    """efinance 降级方案"""
-    latest_nav = crud.get_latest_nav(db, fund_id)
-
-    try:
-        realtime_data = FundDataFetcher.get_fund_realtime_valuation(fund_code)
-
-        if realtime_data and realtime_data.get("increase_rate") is not None:
-            valuations.append(schemas.RealtimeNavItem(
-                fund_code=fund_code,
-                data_source=realtime_data.get("data_source", "estimate"),
-                is_listed_fund=False,
-                current_price=realtime_data.get("current_price"),
-                increase_rate=realtime_data.get("increase_rate"),
-                estimate_time=realtime_data.get("estimate_time"),
-                latest_nav_date=realtime_data.get("latest_nav_date") or (latest_nav.date if latest_nav else None),
-                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
-            ))
-        else:
-            # efinance也失败，使用正式净值
-            valuations.append(schemas.RealtimeNavItem(
-                fund_code=fund_code,
-                data_source="nav",
-                is_listed_fund=False,
-                increase_rate=float(latest_nav.daily_growth * 100) if latest_nav and latest_nav.daily_growth else None,
-                estimate_time=None,
-                latest_nav_date=latest_nav.date if latest_nav else None,
-                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
-            ))
-    except Exception as e:
-        logger.error(f"efinance 降级失败 {fund_code}: {e}")
-        # 最终降级：使用正式净值
-        valuations.append(schemas.RealtimeNavItem(
-            fund_code=fund_code,
-            data_source="nav",
-            is_listed_fund=False,
-            increase_rate=float(latest_nav.daily_growth * 100) if latest_nav and latest_nav.daily_growth else None,
-            estimate_time=None,
-            latest_nav_date=latest_nav.date if latest_nav else None,
-            latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
-        ))
+    # 外部行情调用是阻塞的，放到线程池中执行，避免阻塞事件循环
+    return await run_in_threadpool(build_batch_stock_valuations, db, fund_codes)
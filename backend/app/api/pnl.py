@@ -1,37 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..database import get_db
+from ..database import get_async_db, get_db
 from .. import crud, schemas
+from ..services.dashboard import build_portfolio_summary_async
+from ..utils.json_response import prebuilt_response
 
 router = APIRouter(prefix="/api/pnl", tags=["pnl"])
 
 
 @router.get("/summary", response_model=schemas.PortfolioSummary)
-def get_portfolio_summary(db: Session = Depends(get_db)):
+async def get_portfolio_summary(db: AsyncSession = Depends(get_async_db)):
     """获取投资组合汇总（使用累计总收益）"""
-
-    # 获取实时计算的投资组合汇总
-    summary = crud.get_portfolio_summary(db)
-
-    # 获取累计总收益（每日收益叠加）
-    cumulative = crud.get_portfolio_cumulative_profit(db)
-
-    # 🔧 使用累计收益替换实时收益作为 total_profit
-    summary_dict = dict(summary)
-    summary_dict["total_profit"] = cumulative["cumulative_profit"]
-    summary_dict["total_profit_rate"] = (
-        cumulative["cumulative_profit"] / summary_dict["total_cost"] * 100
-        if summary_dict["total_cost"] > 0 else 0
-    )
-
-    # 合并返回结果
-    return {
-        **summary_dict,
-        "cumulative_profit": cumulative["cumulative_profit"],
-        "daily_profits_history": cumulative["daily_profits"]
-    }
+    return await build_portfolio_summary_async(db)
 
 
 @router.get("/daily/{fund_id}", response_model=List[schemas.DailyPnLResponse])
@@ -45,7 +28,7 @@ def get_daily_pnl(fund_id: int, limit: int = 30, db: Session = Depends(get_db)):
             detail=f"基金 ID {fund_id} 不存在"
         )
 
-    return crud.get_daily_pnl_history(db, fund_id, limit)
+    return prebuilt_response(crud.get_daily_pnl_history_rows(db, fund_id, limit))
 
 
 @router.get("/chart/{fund_id}")
@@ -0,0 +1,66 @@
+"""
+实时估值推送 API
+
+WebSocket /ws/realtime：替代前端对 /api/nav/realtime/batch-stock 的定时轮询。
+
+协议：
+    客户端 → 服务端: {"action": "subscribe", "fund_codes": ["000001", "110011"]}
+    服务端 → 客户端: {"type": "snapshot" | "update", "valuations": [...],
+                      "update_time": "...", "is_trading_time": true}
+
+首条消息为订阅范围内的全量估值（snapshot），之后只推送发生变化的估值（update）。
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from ..services.realtime_hub import realtime_hub, Subscriber
+from ..utils.json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["realtime"])
+
+
+def _parse_codes(value) -> list[str]:
+    """解析基金代码列表（支持列表或逗号分隔字符串）"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(code).strip() for code in value if str(code).strip()]
+
+
+async def _send_loop(websocket: WebSocket, subscriber: Subscriber):
+    """将订阅者队列中的消息发送到 WebSocket"""
+    while True:
+        message = await subscriber.queue.get()
+        await websocket.send_text(dumps(message).decode("utf-8"))
+
+
+@router.websocket("/ws/realtime")
+async def realtime_valuation_ws(websocket: WebSocket, fund_codes: Optional[str] = None):
+    """
+    实时估值推送通道
+
+    Args:
+        fund_codes: 初始订阅的基金代码（逗号分隔，可选；也可连接后发送 subscribe 消息）
+    """
+    await websocket.accept()
+    subscriber = realtime_hub.subscribe(_parse_codes(fund_codes))
+    sender = asyncio.create_task(_send_loop(websocket, subscriber))
+
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if message.get("action") == "subscribe":
+                realtime_hub.update_subscription(subscriber, _parse_codes(message.get("fund_codes")))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"[实时推送] 连接 #{subscriber.id} 异常断开: {e}")
+    finally:
+        sender.cancel()
+        realtime_hub.unsubscribe(subscriber)
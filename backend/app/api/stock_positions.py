@@ -8,13 +8,13 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
 import logging
-import pandas as pd
-import json
 
 from ..database import get_db
 from .. import crud, schemas, models
 from ..services.tushare_service import tushare_service
 from ..utils.redis_client import redis_client
+from ..utils.cache_invalidation import cache_tag
+from ..utils.swr_cache import swr_cache
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -63,31 +63,46 @@ def get_fund_stock_positions(
                 detail="报告期格式错误，应为 YYYY-MM-DD"
             )
 
-    # Redis缓存检查
+    # Redis缓存（stale-while-revalidate）
     report_date_str = report_date_obj.isoformat() if report_date_obj else 'latest'
     cache_key = f"fund:positions:{fund_id}:{report_date_str}"
     ttl = settings.FUND_POSITIONS_CACHE_TTL_WITH_DATE if report_date_obj else settings.FUND_POSITIONS_CACHE_TTL_LATEST
+    tags = [cache_tag("positions", fund.fund_code)]
+
+    if update_names:
+        positions_data = _load_positions_payload(db, fund_id, report_date_obj, update_names=True)
+        swr_cache.write(cache_key, positions_data,
+                        ttl=ttl if positions_data else settings.FUND_POSITIONS_NULL_CACHE_TTL, tags=tags)
+    else:
+        positions_data = swr_cache.get(
+            cache_key,
+            lambda: _load_positions_payload(db, fund_id, report_date_obj),
+            ttl=ttl,
+            null_ttl=settings.FUND_POSITIONS_NULL_CACHE_TTL,
+            # 后台刷新在请求结束后执行，不能使用请求的数据库会话
+            background_loader=lambda: _load_positions_payload_in_session(fund_id, report_date_obj),
+            tags=tags,
+        )
+
+    return [schemas.FundStockPositionResponse(**pos) for pos in positions_data or []]
+
+
+def _load_positions_payload(
+    db: Session,
+    fund_id: int,
+    report_date: Optional[date],
+    update_names: bool = False
+) -> Optional[List[dict]]:
+    """
+    查询持仓并修复股票名称，返回可直接写入缓存的字典列表（没有持仓时返回 None）
+
+    Args:
+        update_names: 同时把修复后的名称写回数据库
+    """
+    positions = crud.get_fund_stock_positions(db, fund_id, report_date)
+    if not positions:
+        return None
 
-    # 尝试从Redis获取
-    if redis_client.is_available() and not update_names:
-        cached_value = redis_client.get(cache_key)
-        if cached_value:
-            if cached_value == "NULL":
-                logger.debug(f"[持仓缓存] 空值命中: fund_id={fund_id}")
-                return []
-            try:
-                logger.debug(f"[持仓缓存] 命中: fund_id={fund_id}")
-                positions_data = json.loads(cached_value)
-                return [schemas.FundStockPositionResponse(**pos) for pos in positions_data]
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.warning(f"[持仓缓存] 反序列化失败: fund_id={fund_id}, {e}")
-
-    logger.info(f"[持仓缓存] 未命中: fund_id={fund_id}，查询数据库")
-
-    # 获取持仓数据
-    positions = crud.get_fund_stock_positions(db, fund_id, report_date_obj)
-
-    # 转换为字典列表（便于 ensure_stock_names 处理）
     positions_dict = [
         {
             'id': p.id,
@@ -98,85 +113,51 @@ def get_fund_stock_positions(
             'market_value': p.market_value,
             'weight': p.weight,
             'cost_price': p.cost_price,
-            'report_date': p.report_date,
-            'created_at': p.created_at,
-            'updated_at': p.updated_at,
+            'report_date': p.report_date.isoformat() if p.report_date else None,
+            'created_at': p.created_at.isoformat() if p.created_at else None,
+            'updated_at': p.updated_at.isoformat() if p.updated_at else None,
         }
         for p in positions
     ]
 
-    # ✅ 新增：检查并修复股票名称
-    if positions_dict:
-        logger.info(f"[名称修复] 基金 {fund.fund_code}: 检查 {len(positions_dict)} 条持仓记录")
-        fixed_positions = tushare_service.ensure_stock_names(positions_dict)
-
-        # 可选：更新数据库
-        if update_names:
-            logger.info("[名称修复] 同时更新数据库")
-            for fixed_pos in fixed_positions:
-                db_position = db.query(models.FundStockPosition).filter(
-                    models.FundStockPosition.id == fixed_pos['id']
-                ).first()
-
-                if db_position and db_position.stock_name != fixed_pos['stock_name']:
-                    old_name = db_position.stock_name
-                    db_position.stock_name = fixed_pos['stock_name']
-                    logger.info(
-                        f"[名称修复] 更新数据库: {db_position.stock_code} "
-                        f"'{old_name}' → '{fixed_pos['stock_name']}'"
-                    )
-
-            db.commit()
-            # 重新从数据库获取（包含更新的名称）
-            positions = crud.get_fund_stock_positions(db, fund_id, report_date_obj)
-        else:
-            # 直接返回修复后的数据（不更新数据库）
-            # 使用 schemas.FundStockPositionResponse 确保类型匹配
-            positions = []
-            for p in fixed_positions:
-                positions.append(schemas.FundStockPositionResponse(
-                    id=p['id'],
-                    fund_id=p['fund_id'],
-                    stock_code=p['stock_code'],
-                    stock_name=p['stock_name'],
-                    shares=p['shares'],
-                    market_value=p['market_value'],
-                    weight=p['weight'],
-                    cost_price=p['cost_price'],
-                    report_date=p['report_date'],
-                    created_at=p['created_at'],
-                    updated_at=p['updated_at']
-                ))
+    # 检查并修复股票名称
+    logger.info(f"[名称修复] 基金 {fund_id}: 检查 {len(positions_dict)} 条持仓记录")
+    fixed_positions = tushare_service.ensure_stock_names(positions_dict)
+
+    if update_names:
+        changed = {
+            fixed['id']: fixed['stock_name']
+            for fixed, original in zip(fixed_positions, positions)
+            if fixed['stock_name'] and fixed['stock_name'] != original.stock_name
+        }
+        if changed:
+            logger.info(f"[名称修复] 同时更新数据库: {len(changed)} 条")
+            crud.bulk_update_stock_names(db, changed)
+
+    return [
+        {**p, 'shares': _decimal_str(p['shares']), 'market_value': _decimal_str(p['market_value']),
+         'weight': _decimal_str(p['weight']), 'cost_price': _decimal_str(p['cost_price'])}
+        for p in fixed_positions
+    ]
+
+
+def _load_positions_payload_in_session(fund_id: int, report_date: Optional[date]) -> Optional[List[dict]]:
+    """使用独立数据库会话加载持仓（供后台刷新使用）"""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return _load_positions_payload(db, fund_id, report_date)
+    finally:
+        db.close()
+
 
-    # 更新Redis缓存
-    if redis_client.is_available() and positions:
-        cache_value = json.dumps([
-            {
-                'id': p.id,
-                'fund_id': p.fund_id,
-                'stock_code': p.stock_code,
-                'stock_name': p.stock_name,
-                'shares': p.shares,
-                'market_value': p.market_value,
-                'weight': p.weight,
-                'cost_price': p.cost_price,
-                'report_date': p.report_date.isoformat() if p.report_date else None,
-                'created_at': p.created_at.isoformat() if p.created_at else None,
-                'updated_at': p.updated_at.isoformat() if p.updated_at else None,
-            }
-            for p in positions
-        ], ensure_ascii=False)
-
-        redis_client.set(cache_key, cache_value, ttl=ttl)
-        logger.debug(f"[持仓缓存] 已缓存: fund_id={fund_id}, {len(positions)} 条记录")
-    elif redis_client.is_available() and not positions:
-        redis_client.set(cache_key, "NULL", ttl=settings.FUND_POSITIONS_NULL_CACHE_TTL)
-
-    return positions
+def _decimal_str(value) -> Optional[str]:
+    return str(value) if value is not None else None
 
 
 @router.post("/funds/{fund_id}/sync", response_model=schemas.SyncResponse)
-async def sync_fund_stock_positions(
+def sync_fund_stock_positions(
     fund_id: int,
     db: Session = Depends(get_db)
 ):
@@ -191,6 +172,8 @@ async def sync_fund_stock_positions(
     Returns:
         同步结果，包含成功数量和错误信息
     """
+    import pandas as pd
+
     fund = crud.get_fund(db, fund_id)
     if not fund:
         raise HTTPException(
@@ -234,7 +217,7 @@ async def sync_fund_stock_positions(
         stock_name_mapping = {}
         if stock_codes_list:
             logger.info(f"[持仓同步] 正在批量查询 {len(stock_codes_list)} 只股票的名称")
-            stock_name_mapping = tushare_service.get_stock_names_batch(stock_codes_list)
+            stock_name_mapping = tushare_service.lookup_stock_names(stock_codes_list)
             logger.info(f"[持仓同步] 成功获取 {len([n for n in stock_name_mapping.values() if n])}/{len(stock_codes_list)} 只股票的名称")
 
         # 转换为持仓记录
@@ -309,8 +292,7 @@ async def sync_fund_stock_positions(
         count = crud.update_fund_stock_positions(db, fund_id, positions)
         logger.info(f"[持仓同步] 成功保存 {count} 条持仓记录到数据库")
 
-        # 同步成功后，失效相关缓存
-        _invalidate_positions_cache(fund_id)
+        # 持仓缓存由提交时的缓存失效事件清理（见 utils.cache_invalidation）
 
         return schemas.SyncResponse(
             success=True,
@@ -370,9 +352,10 @@ def check_positions_quality(fund_id: int, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/admin/fix-names", response_model=schemas.SyncResponse)
-async def fix_all_stock_names(
+@router.post("/admin/fix-names", response_model=schemas.StockNameFixResponse)
+def fix_all_stock_names(
     fund_id: Optional[int] = None,
+    dry_run: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -381,87 +364,85 @@ async def fix_all_stock_names(
     扫描数据库中的所有持仓记录，修复缺失或乱码的股票名称。
     可选择修复特定基金或所有基金。
 
+    按集合处理，不逐行查询：
+    1. 一次查询取出 id / 代码 / 名称
+    2. 相同名称只做一次本地修复（GBK 乱码修复、清理）
+    3. 本地无法修复的代码去重后一次 Redis MGET，未命中的一次 stock_basic 补齐
+    4. 变化的记录批量写回（PostgreSQL 为 UPDATE ... FROM (VALUES ...)）
+
     Args:
         fund_id: 基金 ID（可选），不指定则修复所有基金
+        dry_run: 只返回待修改明细，不写数据库
 
     Returns:
-        修复结果统计
+        修复结果统计（dry_run 时包含修改明细）
     """
+    from ..utils.encoding import repair_stock_name
+
     try:
-        # 构建查询
-        query = db.query(models.FundStockPosition)
-        if fund_id:
-            query = query.filter(models.FundStockPosition.fund_id == fund_id)
-
-        positions = query.all()
-        total_count = len(positions)
-
-        logger.info(f"[批量修复] 开始处理 {total_count} 条持仓记录")
-
-        # 转换为字典列表
-        positions_dict = [
-            {
-                'id': p.id,
-                'stock_code': p.stock_code,
-                'stock_name': p.stock_name or '',
-            }
-            for p in positions
-        ]
-
-        # 批量修复名称
-        fixed_positions = tushare_service.ensure_stock_names(positions_dict)
-
-        # 统计修复数量
-        updated_count = 0
-        for fixed_pos in fixed_positions:
-            db_position = db.query(models.FundStockPosition).filter(
-                models.FundStockPosition.id == fixed_pos['id']
-            ).first()
-
-            if db_position and db_position.stock_name != fixed_pos['stock_name']:
-                old_name = db_position.stock_name
-                db_position.stock_name = fixed_pos['stock_name']
-                updated_count += 1
-
-                logger.info(
-                    f"[批量修复] {db_position.stock_code}: "
-                    f"'{old_name}' → '{fixed_pos['stock_name']}'"
-                )
-
-        # 提交更改
-        db.commit()
+        rows = crud.get_stock_position_names(db, fund_id)
+        total_count = len(rows)
+
+        logger.info(f"[批量修复] 开始处理 {total_count} 条持仓记录{'（dry run）' if dry_run else ''}")
+
+        # 本地修复：同一名称只处理一次
+        local_names = {}
+        for row in rows:
+            name = row['stock_name'] or ''
+            if name not in local_names:
+                local_names[name] = repair_stock_name(name)
+
+        # 本地无法修复的记录，按代码统一查询缓存 / Tushare
+        unresolved_codes = {
+            row['stock_code'] for row in rows
+            if not local_names[row['stock_name'] or ''] and row['stock_code']
+        }
+        lookup_names = tushare_service.lookup_stock_names(list(unresolved_codes)) if unresolved_codes else {}
+
+        changes = []
+        for row in rows:
+            new_name = local_names[row['stock_name'] or ''] or lookup_names.get(row['stock_code'])
+            if new_name and new_name != row['stock_name']:
+                changes.append(schemas.StockNameChange(
+                    id=row['id'],
+                    fund_id=row['fund_id'],
+                    stock_code=row['stock_code'],
+                    old_name=row['stock_name'],
+                    new_name=new_name
+                ))
+
+        # funds_updated 是持仓记录数而不是基金数：与实际写入时的 updated_count
+        # 和前端提示（成功修复 N 条股票名称）保持一致，dry run 预览的数字与随后实际执行的结果相同
+        if dry_run:
+            logger.info(f"[批量修复] dry run: 共 {total_count} 条，待更新 {len(changes)} 条")
+            return schemas.StockNameFixResponse(
+                success=True,
+                message=f"待修复 {len(changes)}/{total_count} 条股票名称（未写入）",
+                funds_updated=len(changes),
+                dry_run=True,
+                total=total_count,
+                changes=changes
+            )
+
+        updated_count = crud.bulk_update_stock_names(db, {c.id: c.new_name for c in changes})
 
         logger.info(f"[批量修复] 完成: 共 {total_count} 条，更新 {updated_count} 条")
 
-        return schemas.SyncResponse(
+        return schemas.StockNameFixResponse(
             success=True,
             message=f"成功修复 {updated_count}/{total_count} 条股票名称",
             funds_updated=updated_count,
-            errors=[]
+            total=total_count
         )
 
     except Exception as e:
         logger.error(f"[批量修复] 失败: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return schemas.SyncResponse(
+        return schemas.StockNameFixResponse(
             success=False,
             message=f"批量修复失败: {str(e)}",
             funds_updated=0,
-            errors=[str(e)]
+            errors=[str(e)],
+            dry_run=dry_run
         )
-
-
-def _invalidate_positions_cache(fund_id: int, report_date: Optional[date] = None):
-    """失效持仓缓存"""
-    from ..utils.redis_client import redis_client
-
-    if not redis_client.is_available():
-        return
-
-    report_date_str = report_date.isoformat() if report_date else 'latest'
-    cache_key = f"fund:positions:{fund_id}:{report_date_str}"
-    deleted = redis_client.delete(cache_key)
-
-    if deleted:
-        logger.info(f"[持仓缓存] 已失效缓存: {cache_key}")
@@ -5,6 +5,7 @@ from decimal import Decimal
 
 from ..database import get_db
 from .. import crud, schemas
+from ..utils.json_response import prebuilt_response
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
@@ -77,4 +78,4 @@ def sell_fund(transaction: schemas.TransactionCreate, db: Session = Depends(get_
 @router.get("/{fund_id}", response_model=List[schemas.TransactionResponse])
 def get_transactions(fund_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """获取基金交易历史"""
-    return crud.get_transactions(db, fund_id, skip=skip, limit=limit)
+    return prebuilt_response(crud.get_transactions_rows(db, fund_id, skip=skip, limit=limit))
@@ -12,16 +12,19 @@ class Settings(BaseSettings):
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
     DB_NAME: str = "fund_tracker"
+    ASYNC_DATABASE_URL: str = ""  # 异步引擎连接串（默认由 DATABASE_URL 换用 asyncpg 驱动）
+    ASYNC_DB_POOL_SIZE: int = 20  # 异步引擎连接池大小（只读接口）
+    ASYNC_DB_MAX_OVERFLOW: int = 10  # 异步引擎连接池溢出连接数
 
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
+    DEBUG: bool = False  # 调试模式（响应头返回 SQL 统计等诊断信息）
 
     # Scheduler
     SCHEDULER_ENABLED: bool = True
-    SCHEDULER_HOUR: int = 0
-    SCHEDULER_MINUTE: int = 0
+    SCHEDULER_MINUTE: int = 0  # 每日净值同步在重试窗口内每小时的第几分钟执行
 
     # Tushare Pro
     TUSHARE_TOKEN: str = "" # 从 .env 文件中读取
@@ -31,6 +34,20 @@ class Settings(BaseSettings):
     EFINANCE_TIMEOUT: int = 15
     EFINANCE_MAX_RETRIES: int = 3
     EFINANCE_RETRY_BACKOFF: float = 1.0
+    EFINANCE_RETRY_BACKOFF_MAX: float = 8.0  # 单次退避等待上限（秒）
+
+    # Retry Budget（外部 API 重试的时间预算和次数预算）
+    REQUEST_DEADLINE_SECONDS: float = 10.0  # 单个 HTTP 请求内重试的时间预算，0 表示不限制
+    RETRY_BUDGET_RATIO: float = 0.2  # 窗口内重试次数不超过调用次数的该比例
+    RETRY_BUDGET_MIN_PER_SECOND: float = 0.5  # 低流量时保底的每秒重试次数
+    RETRY_BUDGET_WINDOW: int = 10  # 统计窗口（秒）
+
+    # Realtime Quote Hedging（efinance 未在对冲延迟内返回时并行请求 Tushare，取先返回者）
+    QUOTE_HEDGING_ENABLED: bool = False
+    QUOTE_HEDGE_DELAY_DEFAULT: float = 1.0  # 样本不足时的对冲延迟（秒）
+    QUOTE_HEDGE_DELAY_MIN: float = 0.2  # 对冲延迟下限（秒），实际延迟取主数据源耗时 p95
+    QUOTE_HEDGE_DELAY_MAX: float = 5.0  # 对冲延迟上限（秒）
+    QUOTE_HEDGE_MAX_WORKERS: int = 8  # 行情请求线程池大小
 
     # Redis Configuration
     REDIS_HOST: str = "localhost"
@@ -51,11 +68,85 @@ class Settings(BaseSettings):
     FUND_HISTORY_NAV_CACHE_TTL: int = 86400  # 24小时（历史净值）
     FUND_DATA_NULL_CACHE_TTL: int = 300  # 5分钟（空值缓存）
 
+    # Latest NAV Fetch
+    FUND_LATEST_NAV_PAGE_SIZE: int = 5  # 获取最新净值时请求的条数（0 表示下载全部历史）
+    FUND_NAV_FETCH_CONCURRENCY: int = 8  # 批量获取最新净值的并发数
+
+    # Quote Ingestion（python -m app.services.quote_feed：每台机器一个采集进程，写入以下启用的目标）
+    QUOTE_INGEST_MARKETS: str = "A股,ETF,LOF"  # 采集的 efinance 市场类型
+    QUOTE_INGEST_INTERVAL_TRADING: int = 5  # 采集间隔（秒，交易时间）
+    QUOTE_INGEST_INTERVAL_NON_TRADING: int = 600  # 采集间隔（秒，非交易时间，保持收盘价可读）
+
+    # Shared-memory Quote Board（采集进程写入，本机 API 工作进程只读）
+    QUOTE_BOARD_ENABLED: bool = False  # 写入并优先读取共享内存看板
+    QUOTE_BOARD_PATH: str = ""  # 看板文件路径（默认 /dev/shm，不存在时为系统临时目录）
+    QUOTE_BOARD_CAPACITY: int = 16384  # 最多容纳的代码数
+
+    # Redis Streams Quotes（采集进程写入，API 只读 Redis）
+    QUOTE_SOURCE: str = "request"  # 实时行情来源：request（请求时按需拉取并缓存）/ stream（只读采集进程写入的 Redis 最新行情）
+    QUOTE_STREAM_KEY: str = "stock:quotes:stream"  # 行情变化快照 Stream
+    QUOTE_LATEST_KEY: str = "stock:quotes:latest"  # 最新行情哈希（代码 -> JSON）
+    QUOTE_STREAM_MAXLEN: int = 20000  # Stream 保留的快照条数（近似裁剪）
+
+    # Batch Realtime Estimates (get_realtime_increase_rate)
+    FUND_ESTIMATE_BATCH_SIZE: int = 30  # 单次请求的最大基金数
+    FUND_ESTIMATE_MIN_BATCH_SIZE: int = 10  # 拆分后每批的最少基金数（少于该值不再拆分以提高并发）
+    FUND_ESTIMATE_FETCH_CONCURRENCY: int = 4  # 并发请求的批次数
+
+    # NAV History Incremental Sync（fund_sync_state 水位线）
+    NAV_PUBLISH_HOUR: int = 20  # 交易日净值一般在该时刻之后发布，之前以上一个交易日为预期净值日期
+    NAV_SYNC_PAGE_MARGIN: int = 2  # 增量请求条数 = 交易日缺口 + 该余量
+    NAV_SYNC_RECHECK_MINUTES: int = 30  # 尚未发布新净值时的再次检查间隔
+    NAV_SYNC_BACKOFF_BASE_MINUTES: int = 30  # 失败退避基数（按 2 的幂增长）
+    NAV_SYNC_BACKOFF_MAX_HOURS: int = 24  # 失败退避上限
+    NAV_SYNC_WINDOW_START_HOUR: int = 20  # 每日净值同步重试窗口开始（整点，每小时执行一次）
+    NAV_SYNC_WINDOW_END_HOUR: int = 1  # 重试窗口结束（含该小时；小于开始时间表示次日）
+    NAV_SYNC_RESUME_ON_STARTUP: bool = True  # 启动时补跑未完成的每日同步（进程重启或错过窗口）
+
     # Fund Stock Positions Cache TTL
     FUND_POSITIONS_CACHE_TTL_WITH_DATE: int = 604800  # 7天（有报告期）
-    FUND_POSITIONS_CACHE_TTL_LATEST: int = 86400  # 24小时（无报告期）
+    FUND_POSITIONS_CACHE_TTL_LATEST: int = 604800  # 7天（无报告期，同步持仓时按标签失效）
     FUND_POSITIONS_NULL_CACHE_TTL: int = 300  # 5分钟（空值缓存）
 
+    # Dashboard Sections Cache TTL（/api/dashboard 各部分单独缓存，数据写入时经失效总线删除）
+    DASHBOARD_PORTFOLIO_CACHE_TTL: int = 3600  # 1小时（持仓汇总和持仓列表）
+    DASHBOARD_FUNDS_CACHE_TTL: int = 300  # 5分钟（基金列表）
+    DASHBOARD_VALUATION_CACHE_TTL_TRADING: int = 30  # 30秒（实时估值，交易时间）
+    DASHBOARD_VALUATION_CACHE_TTL_NON_TRADING: int = 1800  # 30分钟（实时估值，非交易时间）
+
+    # Stale-While-Revalidate（基金信息、净值、实时行情、持仓缓存）
+    CACHE_SOFT_TTL_RATIO: float = 0.5  # soft TTL = hard TTL × 该比例，超过后返回旧值并后台刷新
+    SWR_REFRESH_WORKERS: int = 4  # 后台刷新线程数
+    SWR_REFRESH_LOCK_TTL: int = 30  # 刷新锁过期时间（秒），防止多个进程同时刷新同一个键
+
+    # Cache Invalidation（数据库写入提交后按标签失效缓存）
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_TAG_INDEX_TTL: int = 691200  # 标签索引集合过期时间（秒），需大于最长的缓存 TTL
+
+    # Metrics (/metrics)
+    METRICS_ENABLED: bool = True  # 启用 Prometheus 指标采集和 /metrics 端点
+
+    # SQL Profiler（按需开启，用于定位 N+1 查询）
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_PROFILER_SLOW_REQUEST_MS: int = 500  # 慢请求阈值（毫秒）
+    SQL_PROFILER_REPEAT_THRESHOLD: int = 10  # 同一语句形状执行次数达到该值时标记为重复
+
+    # Startup Warm-up
+    STARTUP_WARMUP_ENABLED: bool = False  # 启动时预热最新净值、基金信息和股票名称缓存
+    STARTUP_WARMUP_CONCURRENCY: int = 4  # 预热并发线程数
+
+    # Realtime Push Channel (/ws/realtime)
+    REALTIME_PUSH_INTERVAL_TRADING: int = 30  # 30秒（交易时间）
+    REALTIME_PUSH_INTERVAL_NON_TRADING: int = 300  # 5分钟（非交易时间）
+
+    # Intraday Valuation Recorder
+    INTRADAY_RECORDER_ENABLED: bool = True
+    INTRADAY_SAMPLE_INTERVAL: int = 60  # 采样间隔（秒）
+    INTRADAY_STREAM_MAXLEN: int = 2000  # 单只基金单日最多保留的原始采样点（环形缓冲区）
+    INTRADAY_STREAM_TTL: int = 172800  # 2天（原始采样流）
+    INTRADAY_COMPACT_BUCKET: int = 300  # 压缩粒度（秒，大于采样间隔才会减少点数），每个区间保留最后一个采样点
+    INTRADAY_COMPACT_TTL: int = 2592000  # 30天（压缩后的日内曲线）
+
     class Config:
         env_file = ".env"
         case_sensitive = True
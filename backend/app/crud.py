@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, func
-from typing import List, Optional
+from sqlalchemy import Integer, String, and_, bindparam, column, desc, func, select, update, values
+from typing import Dict, List, Optional, Tuple
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -77,52 +77,71 @@ def delete_fund(db: Session, fund_id: int) -> bool:
 # ==================== Holding CRUD ====================
 def get_holding(db: Session, fund_id: int) -> Optional[models.Holding]:
     """获取基金持仓（包含基金信息和收益率数据）"""
-    holding = db.query(models.Holding)\
-        .options(joinedload(models.Holding.fund))\
-        .filter(models.Holding.fund_id == fund_id)\
-        .first()
+    holding = db.execute(holdings_stmt(fund_id=fund_id)).scalars().first()
 
     if holding:
-        _enrich_holding_with_profit_rates(db, holding)
+        _enrich_holdings_with_profit_rates(db, [holding])
 
     return holding
 
 
 def get_holdings(db: Session, skip: int = 0, limit: int = 100) -> List[models.Holding]:
     """获取所有持仓（包含基金信息和收益率数据）"""
-    holdings = db.query(models.Holding)\
-        .options(joinedload(models.Holding.fund))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    holdings = list(db.execute(holdings_stmt(skip=skip, limit=limit)).scalars())
 
     # 为每个持仓计算收益率数据
-    for holding in holdings:
-        _enrich_holding_with_profit_rates(db, holding)
+    _enrich_holdings_with_profit_rates(db, holdings)
 
     return holdings
 
 
-def _enrich_holding_with_profit_rates(db: Session, holding: models.Holding):
-    """为持仓对象添加收益率数据（动态属性）"""
-    # 获取最新净值
-    latest_nav = get_latest_nav(db, holding.fund_id)
+def holdings_stmt(skip: int = 0, limit: Optional[int] = 100, fund_id: Optional[int] = None):
+    """持仓查询（预加载基金信息；同步与异步 CRUD 共用）"""
+    stmt = select(models.Holding).options(joinedload(models.Holding.fund))
+    if fund_id is not None:
+        stmt = stmt.where(models.Holding.fund_id == fund_id)
+    return stmt.offset(skip).limit(limit)
 
-    # 计算今日收益率（从 DailyPnL 表获取最新记录）
-    latest_pnl = db.query(models.DailyPnL)\
-        .filter(models.DailyPnL.fund_id == holding.fund_id)\
-        .order_by(models.DailyPnL.date.desc())\
-        .first()
 
-    holding.daily_profit_rate = latest_pnl.profit_rate if latest_pnl else None
+def _enrich_holdings_with_profit_rates(db: Session, holdings: List[models.Holding]):
+    """为持仓对象添加收益率数据（最新净值和最新每日收益各用一条批量查询）"""
+    fund_ids = [holding.fund_id for holding in holdings]
+    apply_profit_rates(holdings, get_latest_navs(db, fund_ids), get_latest_daily_pnls(db, fund_ids))
 
-    # 计算整体收益率（当前市值 / 成本 - 1）
-    if holding.cost > 0 and latest_nav:
-        market_value = holding.shares * latest_nav.unit_nav
-        profit = market_value - holding.cost
-        holding.total_profit_rate = (profit / holding.cost * 100) if holding.cost > 0 else Decimal("0")
-    else:
-        holding.total_profit_rate = None
+
+def apply_profit_rates(
+    holdings: List[models.Holding],
+    latest_navs: Dict[int, models.NavHistory],
+    latest_pnls: Dict[int, models.DailyPnL]
+):
+    """
+    按已加载的最新净值和最新每日收益设置持仓的收益率（动态属性）
+
+    最新净值记录保存在 holding.latest_nav 上，summarize_portfolio 复用，不再逐只查询
+    """
+    for holding in holdings:
+        latest_nav = latest_navs.get(holding.fund_id)
+        latest_pnl = latest_pnls.get(holding.fund_id)
+        holding.latest_nav = latest_nav
+
+        # 今日收益率（DailyPnL 表最新记录）
+        holding.daily_profit_rate = latest_pnl.profit_rate if latest_pnl else None
+
+        # 计算整体收益率（当前市值 / 成本 - 1）
+        if holding.cost > 0 and latest_nav:
+            market_value = holding.shares * latest_nav.unit_nav
+            profit = market_value - holding.cost
+            holding.total_profit_rate = (profit / holding.cost * 100) if holding.cost > 0 else Decimal("0")
+        else:
+            holding.total_profit_rate = None
+
+
+def get_held_fund_codes(db: Session) -> List[str]:
+    """获取当前有持仓（份额大于0）的基金代码"""
+    stmt = select(models.Fund.fund_code).join(
+        models.Holding, models.Holding.fund_id == models.Fund.id
+    ).where(models.Holding.shares > 0).order_by(models.Fund.fund_code)
+    return list(db.execute(stmt).scalars())
 
 
 def create_or_update_holding(db: Session, holding: HoldingCreate) -> models.Holding:
@@ -240,6 +259,130 @@ def upsert_nav_history(db: Session, fund_id: int, date: date, unit_nav: Decimal,
     return db_nav
 
 
+def upsert_nav_history_rows(db: Session, fund_id: int, rows: List[dict]) -> int:
+    """
+    批量写入一只基金的净值记录（按日期创建或更新，不提交，由调用方提交）
+
+    Args:
+        rows: [{"date", "unit_nav", "accumulated_nav", "daily_growth"}, ...]
+
+    Returns:
+        int: 写入的记录数
+    """
+    if not rows:
+        return 0
+
+    dates = [row["date"] for row in rows]
+    existing = {
+        nav.date: nav
+        for nav in db.query(models.NavHistory).filter(
+            models.NavHistory.fund_id == fund_id,
+            models.NavHistory.date.between(min(dates), max(dates))
+        )
+    }
+
+    for row in rows:
+        db_nav = existing.get(row["date"])
+        if db_nav is None:
+            db_nav = models.NavHistory(fund_id=fund_id, date=row["date"])
+            db.add(db_nav)
+            existing[row["date"]] = db_nav
+        db_nav.unit_nav = row["unit_nav"]
+        db_nav.accumulated_nav = row.get("accumulated_nav") or Decimal("0")
+        db_nav.daily_growth = row.get("daily_growth") or Decimal("0")
+    return len(rows)
+
+
+def get_latest_nav_dates(db: Session, fund_ids: List[int]) -> Dict[int, date]:
+    """批量获取基金已有的最新净值日期（一条聚合查询）"""
+    if not fund_ids:
+        return {}
+    table = models.NavHistory.__table__
+    stmt = (
+        select(table.c.fund_id, func.max(table.c.date))
+        .where(table.c.fund_id.in_(fund_ids))
+        .group_by(table.c.fund_id)
+    )
+    return {fund_id: latest for fund_id, latest in db.execute(stmt)}
+
+
+def get_latest_navs(db: Session, fund_ids: List[int]) -> Dict[int, models.NavHistory]:
+    """批量获取基金最新净值（一条查询）"""
+    if not fund_ids:
+        return {}
+    return {nav.fund_id: nav for nav in db.execute(latest_navs_stmt(fund_ids)).scalars()}
+
+
+def latest_navs_stmt(fund_ids: List[int]):
+    """各基金最新一条净值的查询（同步与异步 CRUD 共用）"""
+    latest = (
+        select(models.NavHistory.fund_id, func.max(models.NavHistory.date).label("date"))
+        .where(models.NavHistory.fund_id.in_(fund_ids))
+        .group_by(models.NavHistory.fund_id)
+        .subquery()
+    )
+    return select(models.NavHistory).join(
+        latest, and_(models.NavHistory.fund_id == latest.c.fund_id, models.NavHistory.date == latest.c.date)
+    )
+
+
+def get_latest_daily_pnls(db: Session, fund_ids: List[int]) -> Dict[int, models.DailyPnL]:
+    """批量获取基金最新每日收益（一条查询）"""
+    if not fund_ids:
+        return {}
+    return {pnl.fund_id: pnl for pnl in db.execute(latest_daily_pnls_stmt(fund_ids)).scalars()}
+
+
+def latest_daily_pnls_stmt(fund_ids: List[int]):
+    """各基金最新一条每日收益的查询（同步与异步 CRUD 共用）"""
+    latest = (
+        select(models.DailyPnL.fund_id, func.max(models.DailyPnL.date).label("date"))
+        .where(models.DailyPnL.fund_id.in_(fund_ids))
+        .group_by(models.DailyPnL.fund_id)
+        .subquery()
+    )
+    return select(models.DailyPnL).join(
+        latest, and_(models.DailyPnL.fund_id == latest.c.fund_id, models.DailyPnL.date == latest.c.date)
+    )
+
+
+# ==================== Fund Sync State CRUD ====================
+def get_fund_sync_states(db: Session, fund_ids: List[int]) -> Dict[int, models.FundSyncState]:
+    """批量获取基金同步状态（没有记录的基金不包含在内）"""
+    if not fund_ids:
+        return {}
+    states = db.query(models.FundSyncState).filter(models.FundSyncState.fund_id.in_(fund_ids))
+    return {state.fund_id: state for state in states}
+
+
+def get_failing_fund_sync_states(db: Session) -> List[Tuple[str, models.FundSyncState]]:
+    """获取连续失败次数大于 0 的基金同步状态（基金代码, 状态），按失败次数降序"""
+    rows = db.query(models.Fund.fund_code, models.FundSyncState).join(
+        models.FundSyncState, models.FundSyncState.fund_id == models.Fund.id
+    ).filter(
+        models.FundSyncState.consecutive_failures > 0
+    ).order_by(desc(models.FundSyncState.consecutive_failures), models.Fund.fund_code)
+    return [(fund_code, state) for fund_code, state in rows]
+
+
+def get_or_create_sync_job_run(db: Session, job: str, run_date: date) -> models.SyncJobRun:
+    """获取任务在预期净值日期上的运行记录，不存在时创建（不提交）"""
+    run = db.query(models.SyncJobRun).filter(
+        and_(models.SyncJobRun.job == job, models.SyncJobRun.run_date == run_date)
+    ).first()
+    if run is None:
+        run = models.SyncJobRun(job=job, run_date=run_date, status="running", attempts=0)
+        db.add(run)
+    return run
+
+
+def get_sync_job_runs(db: Session, job: str, limit: int = 7) -> List[models.SyncJobRun]:
+    """获取任务最近的运行记录"""
+    return db.query(models.SyncJobRun).filter(
+        models.SyncJobRun.job == job
+    ).order_by(desc(models.SyncJobRun.run_date)).limit(limit).all()
+
+
 # ==================== DailyPnL CRUD ====================
 def get_daily_pnl(db: Session, fund_id: int, pnl_date: date) -> Optional[models.DailyPnL]:
     """获取指定日期收益"""
@@ -287,14 +430,19 @@ def create_or_update_daily_pnl(db: Session, pnl: DailyPnLCreate) -> models.Daily
 
 
 # ==================== Sync Functions ====================
-def sync_fund_data(db: Session, fund_id: int) -> Optional[models.NavHistory]:
-    """同步基金数据"""
+def sync_fund_data(db: Session, fund_id: int, nav_data: Optional[dict] = None) -> Optional[models.NavHistory]:
+    """
+    同步基金数据
+
+    Args:
+        nav_data: 已获取的最新净值（批量同步时预先并发获取）；为空时单独获取
+    """
     fund = get_fund(db, fund_id)
     if not fund:
         return None
 
-    fetcher = FundDataFetcher()
-    nav_data = fetcher.get_fund_nav(fund.fund_code)
+    if nav_data is None:
+        nav_data = FundDataFetcher().get_fund_nav(fund.fund_code)
 
     if nav_data:
         # Update fund info if needed
@@ -349,10 +497,20 @@ def calculate_daily_pnl(db: Session, fund_id: int, holding: models.Holding) -> O
     return pnl
 
 
-def get_portfolio_summary(db: Session) -> dict:
-    """获取投资组合汇总"""
-    holdings = get_holdings(db)
+def get_portfolio_summary(db: Session, holdings: Optional[List[models.Holding]] = None) -> dict:
+    """
+    获取投资组合汇总
+
+    Args:
+        holdings: 已由 get_holdings 加载的持仓（复用其最新净值，不传时重新加载）
+    """
+    if holdings is None:
+        holdings = get_holdings(db)
+    return summarize_portfolio(holdings)
+
 
+def summarize_portfolio(holdings: List[models.Holding]) -> dict:
+    """按已设置 latest_nav 的持仓计算投资组合汇总（不访问数据库）"""
     total_cost = Decimal("0")
     total_market_value = Decimal("0")
     fund_summaries = []
@@ -361,7 +519,7 @@ def get_portfolio_summary(db: Session) -> dict:
         cost = holding.cost
         total_cost += cost
 
-        latest_nav = get_latest_nav(db, holding.fund_id)
+        latest_nav = holding.latest_nav
         if latest_nav and holding.shares > 0:
             market_value = holding.shares * latest_nav.unit_nav
         else:
@@ -418,19 +576,23 @@ def get_portfolio_cumulative_profit(db: Session) -> dict:
             ]
         }
     """
-    from sqlalchemy import func
+    return accumulate_daily_profits(db.execute(daily_profit_totals_stmt()).all())
+
 
-    # 获取所有基金的每日收益，按日期分组求和
-    # DailyPnL 已经包含 fund_id，直接查询即可
-    daily_totals = db.query(
+def daily_profit_totals_stmt():
+    """所有基金的每日收益按日期分组求和（日期升序；同步与异步 CRUD 共用）"""
+    return select(
         models.DailyPnL.date,
         func.sum(models.DailyPnL.profit).label('total_profit')
     ).group_by(
         models.DailyPnL.date
     ).order_by(
         models.DailyPnL.date.asc()  # 按日期升序排列
-    ).all()
+    )
+
 
+def accumulate_daily_profits(daily_totals) -> dict:
+    """按日期升序的 (日期, 当日总收益) 计算累计收益（get_portfolio_cumulative_profit 的返回格式）"""
     if not daily_totals:
         return {
             "cumulative_profit": Decimal("0"),
@@ -460,9 +622,12 @@ def sync_all_funds(db: Session) -> dict:
     updated_count = 0
     errors = []
 
+    # 并发预取所有基金的最新净值，数据库写入仍按基金顺序执行
+    navs = FundDataFetcher.get_fund_navs([fund.fund_code for fund in funds])
+
     for fund in funds:
         try:
-            result = sync_fund_data(db, fund.id)
+            result = sync_fund_data(db, fund.id, navs.get(fund.fund_code))
             if result:
                 updated_count += 1
         except Exception as e:
@@ -630,6 +795,34 @@ def get_fund_stock_positions(
     return query.order_by(models.FundStockPosition.weight.desc()).all()
 
 
+def get_latest_stock_weights(
+    db: Session,
+    fund_codes: Optional[List[str]] = None
+) -> List[Tuple[str, str, float]]:
+    """
+    获取各基金最新报告期的持仓权重（基金代码, 股票代码, 权重），供持仓反向索引使用
+
+    与 get_fund_stock_positions 一致：报告期为空的基金返回全部持仓记录；权重为空或为 0 的记录不返回
+    """
+    table = models.FundStockPosition.__table__
+    funds = models.Fund.__table__
+    latest = (
+        select(table.c.fund_id, func.max(table.c.report_date).label("report_date"))
+        .group_by(table.c.fund_id)
+        .subquery()
+    )
+    stmt = (
+        select(funds.c.fund_code, table.c.stock_code, table.c.weight)
+        .join(funds, funds.c.id == table.c.fund_id)
+        .join(latest, latest.c.fund_id == table.c.fund_id)
+        .where((table.c.report_date == latest.c.report_date) | latest.c.report_date.is_(None))
+        .where(table.c.weight > 0)
+    )
+    if fund_codes is not None:
+        stmt = stmt.where(funds.c.fund_code.in_(fund_codes))
+    return [(fund_code, stock_code, float(weight)) for fund_code, stock_code, weight in db.execute(stmt)]
+
+
 def create_fund_stock_position(
     db: Session,
     position: FundStockPositionCreate,
@@ -673,3 +866,195 @@ def update_fund_stock_positions(
 
     db.commit()
     return count
+
+
+def get_stock_position_names(db: Session, fund_id: Optional[int] = None) -> List[dict]:
+    """
+    获取持仓记录的股票代码和名称（批量修复名称用）
+
+    只取 id / fund_id / stock_code / stock_name 四列，不装配 ORM 对象
+    """
+    table = models.FundStockPosition.__table__
+    stmt = select(table.c.id, table.c.fund_id, table.c.stock_code, table.c.stock_name)
+    if fund_id:
+        stmt = stmt.where(table.c.fund_id == fund_id)
+    return [dict(row) for row in db.execute(stmt.order_by(table.c.id)).mappings()]
+
+
+def bulk_update_stock_names(db: Session, names: Dict[int, str], chunk_size: int = 5000) -> int:
+    """
+    按持仓 ID 批量更新股票名称
+
+    PostgreSQL 每批生成一条 UPDATE ... FROM (VALUES ...) 语句；
+    其他数据库（SQLite）退化为单条 UPDATE 语句的 executemany。
+
+    Args:
+        names: 持仓 ID 到新名称的映射
+        chunk_size: 每条语句包含的行数
+
+    Returns:
+        int: 更新的记录数
+    """
+    if not names:
+        return 0
+
+    table = models.FundStockPosition.__table__
+    items = list(names.items())
+
+    if db.get_bind().dialect.name == "postgresql":
+        for i in range(0, len(items), chunk_size):
+            new_names = values(
+                column("id", Integer), column("stock_name", String), name="new_names"
+            ).data(items[i:i + chunk_size])
+            db.execute(
+                update(table)
+                .where(table.c.id == new_names.c.id)
+                .values(stock_name=new_names.c.stock_name, updated_at=func.now())
+            )
+    else:
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("position_id"))
+            .values(stock_name=bindparam("new_name"), updated_at=func.now())
+        )
+        for i in range(0, len(items), chunk_size):
+            db.execute(stmt, [
+                {"position_id": position_id, "new_name": name}
+                for position_id, name in items[i:i + chunk_size]
+            ])
+
+    db.commit()
+    return len(items)
+
+
+# ==================== Lean Read Queries ====================
+# 只读列表/历史接口的轻量查询路径：
+# Core select() 只取响应需要的列，直接映射为响应字典，
+# 跳过 ORM 对象装配（identity map、关系加载）和 Pydantic 二次校验
+
+def _select_rows(db: Session, stmt) -> List[dict]:
+    """执行 Core 查询并返回字典列表"""
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+def get_funds_overview_rows(db: Session, skip: int = 0, limit: int = 100) -> List[dict]:
+    """
+    获取基金列表（按 FundResponse 结构组装，包含持仓信息和股票持仓统计）
+
+    一次查询完成基金、持仓和股票持仓统计的关联，不加载 ORM 关系
+    """
+    fund = models.Fund
+    holding = models.Holding
+
+    stock_stats = select(
+        models.FundStockPosition.fund_id,
+        func.count(models.FundStockPosition.id).label("count"),
+        func.max(models.FundStockPosition.updated_at).label("last_update")
+    ).group_by(models.FundStockPosition.fund_id).subquery()
+
+    stmt = select(
+        fund.id,
+        fund.fund_code,
+        fund.fund_name,
+        fund.fund_type,
+        fund.created_at,
+        fund.updated_at,
+        holding.id.label("holding_id"),
+        holding.amount.label("holding_amount"),
+        holding.shares.label("holding_shares"),
+        holding.cost_price.label("holding_cost_price"),
+        holding.created_at.label("holding_created_at"),
+        holding.updated_at.label("holding_updated_at"),
+        stock_stats.c.count.label("stock_positions_count"),
+        stock_stats.c.last_update.label("stock_positions_updated_at"),
+    ).outerjoin(
+        holding, holding.fund_id == fund.id
+    ).outerjoin(
+        stock_stats, stock_stats.c.fund_id == fund.id
+    ).order_by(fund.id).offset(skip).limit(limit)
+
+    result = []
+    for row in db.execute(stmt).mappings():
+        fund_basic = {
+            "fund_code": row["fund_code"],
+            "fund_name": row["fund_name"],
+            "fund_type": row["fund_type"],
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+        holding_dict = None
+        if row["holding_id"] is not None:
+            shares = row["holding_shares"]
+            cost_price = row["holding_cost_price"]
+            holding_dict = {
+                "amount": row["holding_amount"],
+                "shares": shares,
+                "cost_price": cost_price,
+                "id": row["holding_id"],
+                "fund_id": row["id"],
+                "created_at": row["holding_created_at"],
+                "updated_at": row["holding_updated_at"],
+                # 与 models.Holding.cost 保持一致
+                "cost": shares * cost_price if shares and cost_price else Decimal("0"),
+                "daily_profit_rate": None,
+                "total_profit_rate": None,
+                "fund": fund_basic,
+            }
+
+        result.append({
+            **fund_basic,
+            "holdings": holding_dict,
+            "stock_positions_count": row["stock_positions_count"] or 0,
+            "stock_positions_updated_at": row["stock_positions_updated_at"],
+        })
+
+    return result
+
+
+def get_nav_history_rows(db: Session, fund_id: int, start_date: Optional[date] = None,
+                         end_date: Optional[date] = None, limit: int = 100) -> List[dict]:
+    """获取净值历史（按 NavHistoryResponse 结构的字典列表）"""
+    return _select_rows(db, nav_history_rows_stmt(fund_id, start_date, end_date, limit))
+
+
+def nav_history_rows_stmt(fund_id: int, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None, limit: int = 100):
+    """净值历史查询（NavHistoryResponse 的列，日期降序；同步与异步 CRUD 共用）"""
+    nav = models.NavHistory
+    stmt = select(
+        nav.date, nav.unit_nav, nav.accumulated_nav, nav.daily_growth,
+        nav.id, nav.fund_id, nav.created_at
+    ).where(nav.fund_id == fund_id)
+
+    if start_date:
+        stmt = stmt.where(nav.date >= start_date)
+    if end_date:
+        stmt = stmt.where(nav.date <= end_date)
+
+    return stmt.order_by(desc(nav.date)).limit(limit)
+
+
+def get_daily_pnl_history_rows(db: Session, fund_id: int, limit: int = 30) -> List[dict]:
+    """获取收益历史（按 DailyPnLResponse 结构的字典列表）"""
+    pnl = models.DailyPnL
+    stmt = select(
+        pnl.date, pnl.shares, pnl.unit_nav, pnl.market_value, pnl.cost,
+        pnl.profit, pnl.profit_rate, pnl.id, pnl.fund_id, pnl.created_at
+    ).where(pnl.fund_id == fund_id).order_by(desc(pnl.date)).limit(limit)
+
+    return _select_rows(db, stmt)
+
+
+def get_transactions_rows(db: Session, fund_id: int, skip: int = 0, limit: int = 100) -> List[dict]:
+    """获取基金交易历史（按 TransactionResponse 结构的字典列表）"""
+    txn = models.Transaction
+    stmt = select(
+        txn.transaction_type, txn.amount, txn.shares, txn.id, txn.fund_id,
+        txn.nav, txn.transaction_date, txn.created_at
+    ).where(
+        txn.fund_id == fund_id
+    ).order_by(desc(txn.transaction_date)).offset(skip).limit(limit)
+
+    return _select_rows(db, stmt)
@@ -0,0 +1,87 @@
+"""
+异步 CRUD（AsyncSession + asyncpg）
+
+只读接口的热点查询：最新净值、净值历史、持仓和投资组合汇总。
+查询语句和计算逻辑与 crud 中的同名函数共用（crud.*_stmt / apply_profit_rates /
+summarize_portfolio / accumulate_daily_profits），这里只负责在事件循环中执行查询，
+返回值与同步版本一致。写入路径仍使用同步会话（事务和缓存失效事件在 crud 中）。
+"""
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models
+
+
+# ==================== Fund ====================
+async def get_fund_by_code(db: AsyncSession, fund_code: str) -> Optional[models.Fund]:
+    """根据基金代码获取基金"""
+    return (await db.execute(select(models.Fund).where(models.Fund.fund_code == fund_code))).scalars().first()
+
+
+# ==================== NAV ====================
+async def get_latest_nav(db: AsyncSession, fund_id: int) -> Optional[models.NavHistory]:
+    """获取最新净值"""
+    stmt = select(models.NavHistory).where(
+        models.NavHistory.fund_id == fund_id
+    ).order_by(desc(models.NavHistory.date)).limit(1)
+    return (await db.execute(stmt)).scalars().first()
+
+
+async def get_latest_navs(db: AsyncSession, fund_ids: List[int]) -> Dict[int, models.NavHistory]:
+    """批量获取基金最新净值（一条查询）"""
+    if not fund_ids:
+        return {}
+    return {nav.fund_id: nav for nav in (await db.execute(crud.latest_navs_stmt(fund_ids))).scalars()}
+
+
+async def get_nav_history_rows(db: AsyncSession, fund_id: int, start_date: Optional[date] = None,
+                               end_date: Optional[date] = None, limit: int = 100) -> List[dict]:
+    """获取净值历史（按 NavHistoryResponse 结构的字典列表）"""
+    result = await db.execute(crud.nav_history_rows_stmt(fund_id, start_date, end_date, limit))
+    return [dict(row) for row in result.mappings()]
+
+
+# ==================== Holding ====================
+async def get_latest_daily_pnls(db: AsyncSession, fund_ids: List[int]) -> Dict[int, models.DailyPnL]:
+    """批量获取基金最新每日收益（一条查询）"""
+    if not fund_ids:
+        return {}
+    return {pnl.fund_id: pnl for pnl in (await db.execute(crud.latest_daily_pnls_stmt(fund_ids))).scalars()}
+
+
+async def _enrich_holdings_with_profit_rates(db: AsyncSession, holdings: List[models.Holding]):
+    fund_ids = [holding.fund_id for holding in holdings]
+    crud.apply_profit_rates(
+        holdings, await get_latest_navs(db, fund_ids), await get_latest_daily_pnls(db, fund_ids)
+    )
+
+
+async def get_holding(db: AsyncSession, fund_id: int) -> Optional[models.Holding]:
+    """获取基金持仓（包含基金信息和收益率数据）"""
+    holding = (await db.execute(crud.holdings_stmt(fund_id=fund_id))).scalars().first()
+    if holding:
+        await _enrich_holdings_with_profit_rates(db, [holding])
+    return holding
+
+
+async def get_holdings(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Holding]:
+    """获取所有持仓（包含基金信息和收益率数据）"""
+    holdings = list((await db.execute(crud.holdings_stmt(skip=skip, limit=limit))).scalars())
+    await _enrich_holdings_with_profit_rates(db, holdings)
+    return holdings
+
+
+# ==================== PnL ====================
+async def get_portfolio_summary(db: AsyncSession, holdings: Optional[List[models.Holding]] = None) -> dict:
+    """获取投资组合汇总（holdings 为已由 get_holdings 加载的持仓，不传时重新加载）"""
+    if holdings is None:
+        holdings = await get_holdings(db)
+    return crud.summarize_portfolio(holdings)
+
+
+async def get_portfolio_cumulative_profit(db: AsyncSession) -> dict:
+    """获取投资组合累计总收益（每日收益叠加）"""
+    return crud.accumulate_daily_profits((await db.execute(crud.daily_profit_totals_stmt())).all())
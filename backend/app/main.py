@@ -1,16 +1,21 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from decimal import Decimal
-from json import JSONEncoder
-import json
 import logging
 
 from .config import settings
-from .database import init_db
+from .database import async_engine, engine, init_db
 from .scheduler import start_scheduler, stop_scheduler
-from .api import funds, holdings, nav, pnl, transactions, stock_positions
+from .api import funds, holdings, nav, pnl, transactions, stock_positions, realtime, metrics, dashboard
+from .services.realtime_hub import realtime_hub
+from .services.warmup import run_warmup
+from .utils.json_response import FastJSONResponse
+from .utils.metrics import MetricsMiddleware, instrument_engine
+from .utils.retry_helper import RequestDeadlineMiddleware
+from .utils.cache_invalidation import invalidation_bus
+from .utils.swr_cache import FreshnessMiddleware
+from .utils.sql_profiler import SQLProfilerMiddleware, install_sql_profiler
 
 # Configure logging
 logging.basicConfig(
@@ -21,28 +26,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Custom JSON encoder to handle Decimal types
-class CustomJSONEncoder(JSONEncoder):
-    """自定义 JSON 编码器，将 Decimal 转换为 float"""
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
-
-
-class CustomJSONResponse(JSONResponse):
-    """自定义 JSON Response，使用自定义编码器"""
-    def render(self, content) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=False,
-            indent=None,
-            separators=(",", ":"),
-            cls=CustomJSONEncoder,
-        ).encode("utf-8")
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -50,10 +33,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up 天玑基金管理系统 API...")
     init_db()  # Initialize database tables
     start_scheduler()  # Start scheduler
+    if settings.CACHE_INVALIDATION_ENABLED:
+        invalidation_bus.start_listener()  # Purge local caches on other workers' commits
+    if settings.STARTUP_WARMUP_ENABLED:
+        await asyncio.to_thread(run_warmup)  # Preload caches
     yield
     # Shutdown
     logger.info("Shutting down 天玑基金管理系统 API...")
+    await realtime_hub.stop()
+    invalidation_bus.stop_listener()
     stop_scheduler()
+    await async_engine.dispose()
 
 
 # Create FastAPI app
@@ -62,7 +52,7 @@ app = FastAPI(
     description="智能基金投资管理与实时分析平台",
     version="2.0.0",
     lifespan=lifespan,
-    default_response_class=CustomJSONResponse
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -72,8 +62,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Data-Age"] + (["X-DB-Queries", "X-DB-Time"] if settings.DEBUG else []),
 )
 
+# Configure cache freshness header (X-Data-Age)
+app.add_middleware(FreshnessMiddleware)
+
+# Configure cache invalidation on DB commits
+if settings.CACHE_INVALIDATION_ENABLED:
+    invalidation_bus.install()
+
+# Configure retry deadline
+if settings.REQUEST_DEADLINE_SECONDS > 0:
+    app.add_middleware(RequestDeadlineMiddleware)
+
+# Instrument SQL execution (metrics and the SQL profiler share one set of cursor hooks)
+if settings.METRICS_ENABLED or settings.SQL_PROFILER_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+# Configure metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Configure SQL profiler
+if settings.SQL_PROFILER_ENABLED:
+    install_sql_profiler()
+    app.add_middleware(SQLProfilerMiddleware)
+
 # Include routers
 app.include_router(funds.router)
 app.include_router(holdings.router)
@@ -81,6 +97,10 @@ app.include_router(nav.router)
 app.include_router(pnl.router)
 app.include_router(transactions.router)
 app.include_router(stock_positions.router)
+app.include_router(realtime.router)
+app.include_router(dashboard.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from decimal import Decimal
@@ -147,3 +147,44 @@ class FundStockPosition(Base):
 
     def __repr__(self):
         return f"<FundStockPosition(id={self.id}, fund_id={self.fund_id}, stock_code={self.stock_code})>"
+
+
+class FundSyncState(Base):
+    """基金净值历史同步状态表（增量同步的水位线和失败退避）"""
+    __tablename__ = "fund_sync_state"
+
+    fund_id = Column(Integer, ForeignKey("funds.id", ondelete="CASCADE"), primary_key=True, comment="基金ID")
+    last_nav_date = Column(Date, comment="已完整同步的最新净值日期（水位线）")
+    last_attempt_at = Column(DateTime(timezone=True), comment="最近一次同步时间")
+    last_success_at = Column(DateTime(timezone=True), comment="最近一次成功同步时间")
+    consecutive_failures = Column(Integer, nullable=False, default=0, comment="连续失败次数")
+    next_eligible_at = Column(DateTime(timezone=True), comment="下次允许同步的时间（退避）")
+    last_error = Column(Text, comment="最近一次失败原因")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<FundSyncState(fund_id={self.fund_id}, last_nav_date={self.last_nav_date}, failures={self.consecutive_failures})>"
+
+
+class SyncJobRun(Base):
+    """定时同步任务运行记录（每个任务每个预期净值日期一条，用于断点续跑和重试窗口）"""
+    __tablename__ = "sync_job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String(50), nullable=False, comment="任务名称")
+    run_date = Column(Date, nullable=False, comment="预期净值日期")
+    status = Column(String(20), nullable=False, default="running", comment="状态: running/partial/completed")
+    attempts = Column(Integer, nullable=False, default=0, comment="执行次数")
+    funds_total = Column(Integer, nullable=False, default=0, comment="需要完成的基金数（持仓基金）")
+    funds_done = Column(Integer, nullable=False, default=0, comment="已同步到预期日期的基金数")
+    funds_failed = Column(Integer, nullable=False, default=0, comment="最近一次执行失败的基金数")
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), comment="首次执行时间")
+    last_attempt_at = Column(DateTime(timezone=True), comment="最近一次执行时间")
+    finished_at = Column(DateTime(timezone=True), comment="完成时间")
+
+    __table_args__ = (
+        UniqueConstraint('job', 'run_date', name='unique_job_run_date'),
+    )
+
+    def __repr__(self):
+        return f"<SyncJobRun(job={self.job}, run_date={self.run_date}, status={self.status})>"
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy.orm import Session
@@ -5,6 +6,7 @@ from sqlalchemy.orm import Session
 from .database import SessionLocal
 from . import crud
 from .config import settings
+from .utils.metrics import track_job_duration
 
 logger = logging.getLogger(__name__)
 
@@ -12,37 +14,50 @@ logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
 
 
+# 同一进程内的每日同步串行执行（窗口轮询和启动补跑可能重叠）
+_nightly_lock = asyncio.Lock()
+
+
+@track_job_duration("daily_nav_update")
 async def update_daily_nav():
-    """每日净值更新任务（24:00 执行）"""
-    db = SessionLocal()
-    try:
-        logger.info("开始执行每日净值更新任务")
+    """每日净值同步任务（重试窗口内每小时执行，直到所有持仓基金都有预期日期的净值）"""
+    if _nightly_lock.locked():
+        logger.info("上一次每日净值同步仍在执行，跳过本次")
+        return
 
-        # Check if today is a trading day
-        from .services.fund_fetcher import FundDataFetcher
-        fetcher = FundDataFetcher()
+    async with _nightly_lock:
+        db = SessionLocal()
+        try:
+            from .services.nav_sync import run_nightly_sync
+            run, result = await asyncio.to_thread(run_nightly_sync, db)
+            if result is None:
+                logger.info(f"{run.run_date} 的净值同步已完成，跳过")
+                return
 
-        if not fetcher.is_trading_day():
-            logger.info("今天不是交易日，跳过更新")
-            return
+            logger.info(
+                f"净值更新第 {run.attempts} 次执行: 更新 {result.funds_updated}/{result.total} 只基金，"
+                f"写入 {result.rows_written} 条，已是最新 {result.skipped}，退避中 {result.backed_off}，"
+                f"等待发布 {result.pending}；持仓基金完成 {run.funds_done}/{run.funds_total}"
+            )
 
-        # Sync all funds
-        result = crud.sync_all_funds(db)
+            # 每次执行都按最新净值刷新持仓金额（上一次执行可能在写入净值后中断）
+            await update_holdings_amount(db)
 
-        logger.info(
-            f"净值更新完成: {result['updated_count']}/{result['total_count']} 只基金成功"
-        )
+            if result.errors:
+                logger.warning(f"{len(result.errors)} 只基金同步失败，失败原因见 fund_sync_state，退避结束后重试")
 
-        # Update holdings amount based on latest NAV
-        await update_holdings_amount(db)
+        except Exception as e:
+            logger.error(f"每日净值更新任务失败: {str(e)}")
+        finally:
+            db.close()
 
-        if result['errors']:
-            logger.error(f"更新过程中的错误: {result['errors']}")
 
-    except Exception as e:
-        logger.error(f"每日净值更新任务失败: {str(e)}")
-    finally:
-        db.close()
+def _window_hours() -> str:
+    """重试窗口对应的 cron 小时表达式（支持跨零点）"""
+    start, end = settings.NAV_SYNC_WINDOW_START_HOUR, settings.NAV_SYNC_WINDOW_END_HOUR
+    if start <= end:
+        return f"{start}-{end}"
+    return f"{start}-23,0-{end}"
 
 
 async def update_holdings_amount(db: Session):
@@ -73,24 +88,75 @@ async def update_holdings_amount(db: Session):
     logger.info(f"持仓金额更新完成: {updated_count}/{len(holdings)} 个持仓")
 
 
+@track_job_duration("intraday_nav_sample")
+async def record_intraday_valuations():
+    """日内估值采样任务（交易时间内每 INTRADAY_SAMPLE_INTERVAL 秒执行）"""
+    from .services.intraday_recorder import intraday_recorder
+
+    try:
+        await asyncio.to_thread(intraday_recorder.sample)
+    except Exception as e:
+        logger.error(f"日内估值采样失败: {str(e)}")
+
+
+@track_job_duration("intraday_nav_compact")
+async def compact_intraday_valuations():
+    """日内估值压缩任务（收盘后执行）"""
+    from .services.intraday_recorder import intraday_recorder
+
+    try:
+        await asyncio.to_thread(intraday_recorder.compact)
+    except Exception as e:
+        logger.error(f"日内估值压缩失败: {str(e)}")
+
+
 def start_scheduler():
     """启动定时任务调度器"""
     if not settings.SCHEDULER_ENABLED:
         logger.info("定时任务调度器已禁用")
         return
 
-    # Schedule daily task
+    # 每日净值同步：重试窗口内每小时执行，已完成的预期日期直接跳过
     scheduler.add_job(
         update_daily_nav,
         'cron',
-        hour=settings.SCHEDULER_HOUR,
+        hour=_window_hours(),
         minute=settings.SCHEDULER_MINUTE,
         id='daily_nav_update',
-        replace_existing=True
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
     )
+    if settings.NAV_SYNC_RESUME_ON_STARTUP:
+        # 启动后立即执行一次：补跑重启前未完成或错过窗口的同步
+        scheduler.add_job(update_daily_nav, 'date', id='daily_nav_resume', replace_existing=True)
+
+    if settings.INTRADAY_RECORDER_ENABLED:
+        # 采样任务自行判断是否为交易时间，非交易时间直接返回
+        scheduler.add_job(
+            record_intraday_valuations,
+            'interval',
+            seconds=settings.INTRADAY_SAMPLE_INTERVAL,
+            id='intraday_nav_sample',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        scheduler.add_job(
+            compact_intraday_valuations,
+            'cron',
+            day_of_week='mon-fri',
+            hour=15,
+            minute=10,
+            id='intraday_nav_compact',
+            replace_existing=True
+        )
 
     scheduler.start()
-    logger.info(f"定时任务调度器已启动，每日 {settings.SCHEDULER_HOUR:02d}:{settings.SCHEDULER_MINUTE:02d} 执行净值更新")
+    logger.info(
+        f"定时任务调度器已启动，每日 {settings.NAV_SYNC_WINDOW_START_HOUR:02d}:{settings.SCHEDULER_MINUTE:02d} 起"
+        f"每小时执行净值更新，直到 {settings.NAV_SYNC_WINDOW_END_HOUR:02d}:{settings.SCHEDULER_MINUTE:02d}"
+    )
 
 
 def stop_scheduler():
@@ -269,6 +269,21 @@ class BatchRealtimeNavResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class IntradayNavPoint(BaseModel):
+    """日内估值采样点"""
+    time: datetime = Field(..., description="采样时间")
+    estimated_nav: float = Field(..., description="估算净值")
+    increase_rate: Optional[float] = Field(None, description="估算涨跌幅(%)")
+
+
+class IntradayNavResponse(BaseModel):
+    """日内估值曲线响应"""
+    fund_code: str = Field(..., description="基金代码")
+    date: date
+    compacted: bool = Field(False, description="是否为收盘后压缩的数据")
+    points: List[IntradayNavPoint] = Field(default_factory=list, description="采样点（按时间升序）")
+
+
 # ==================== Fund Stock Position Schemas ====================
 class FundStockPositionBase(BaseModel):
     """基金股票持仓基础模型"""
@@ -296,6 +311,61 @@ class FundStockPositionResponse(FundStockPositionBase):
     updated_at: datetime
 
 
+class StockNameChange(BaseModel):
+    """股票名称修复明细"""
+    id: int
+    fund_id: int
+    stock_code: str
+    old_name: Optional[str] = None
+    new_name: str
+
+
+class StockNameFixResponse(SyncResponse):
+    """批量修复股票名称响应（dry_run 时返回待修改明细，不写库）"""
+    dry_run: bool = False
+    total: int = Field(0, description="扫描的持仓记录数")
+    changes: list[StockNameChange] = Field(default_factory=list, description="待修改明细（仅 dry_run）")
+
+
+class NavHistorySyncResponse(SyncResponse):
+    """净值历史增量同步响应"""
+    total: int = Field(0, description="参与同步的基金数")
+    skipped: int = Field(0, description="已是最新、跳过的基金数")
+    backed_off: int = Field(0, description="处于失败退避期、跳过的基金数")
+    pending: int = Field(0, description="尚未发布最新净值、等待再次检查的基金数")
+    rows_written: int = Field(0, description="写入的净值记录数")
+
+
+class SyncJobRunResponse(BaseModel):
+    """每日同步任务运行记录"""
+    run_date: date = Field(..., description="预期净值日期")
+    status: str = Field(..., description="状态: running/partial/completed")
+    attempts: int = Field(0, description="执行次数")
+    funds_total: int = Field(0, description="需要完成的持仓基金数")
+    funds_done: int = Field(0, description="已同步到预期日期的持仓基金数")
+    funds_failed: int = Field(0, description="最近一次执行失败的持仓基金数")
+    started_at: Optional[datetime] = None
+    last_attempt_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FundSyncFailure(BaseModel):
+    """同步失败的基金"""
+    fund_code: str
+    consecutive_failures: int = Field(..., description="连续失败次数")
+    last_error: Optional[str] = None
+    last_attempt_at: Optional[datetime] = None
+    next_eligible_at: Optional[datetime] = Field(None, description="退避结束时间")
+
+
+class NavSyncStatusResponse(BaseModel):
+    """每日净值同步状态"""
+    runs: list[SyncJobRunResponse] = Field(default_factory=list, description="最近的运行记录")
+    failing_funds: list[FundSyncFailure] = Field(default_factory=list, description="当前连续失败的基金")
+
+
 class StockRealtimeNavResponse(BaseModel):
     """基于股票持仓的基金实时估值响应"""
     fund_code: str = Field(..., description="基金代码")
@@ -307,3 +377,18 @@ class StockRealtimeNavResponse(BaseModel):
     data_source: str = Field(default="tushare_sina", description="数据源标识")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class StockRealtimeBoardResponse(BaseModel):
+    """基于股票持仓的估值看板（持仓反向索引增量维护）"""
+    valuations: list[StockRealtimeNavResponse] = Field(default_factory=list, description="实时估值列表")
+    changed_funds: int = Field(0, description="本次行情更新后估值发生变化的基金数")
+    update_time: datetime = Field(..., description="更新时间")
+
+
+class DashboardResponse(BaseModel):
+    """首页看板（各部分与对应的独立接口相同）"""
+    summary: PortfolioSummary = Field(..., description="投资组合汇总（/api/pnl/summary）")
+    holdings: list[HoldingResponse] = Field(default_factory=list, description="持仓列表（/api/holdings/）")
+    funds: list[FundResponse] = Field(default_factory=list, description="基金列表（/api/funds/）")
+    valuations: BatchRealtimeNavResponse = Field(..., description="持仓基金实时估值（/api/nav/realtime/batch-stock）")
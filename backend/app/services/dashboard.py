@@ -0,0 +1,170 @@
+"""
+首页看板数据
+
+/api/dashboard 一次返回首页需要的全部数据，替代前端分别请求
+/api/pnl/summary、/api/holdings/、/api/funds/ 和 /api/nav/realtime/batch-stock：
+
+    summary     投资组合汇总（与 /api/pnl/summary 相同）
+    holdings    持仓列表（与 /api/holdings/ 相同）
+    funds       基金列表（与 /api/funds/ 相同）
+    valuations  持仓基金实时估值（与 /api/nav/realtime/batch-stock 相同）
+
+summary 和 holdings 共用一次加载的持仓、最新净值和最新每日收益；
+三组数据（持仓汇总、基金列表、实时估值）在线程池中并发计算，各自使用独立的数据库会话，
+实时估值的外部请求不阻塞数据库查询。每一部分单独缓存在 Redis 中（stale-while-revalidate），
+缓存键登记在所依赖类别的通配标签下（如 nav:*），相关数据表写入提交时由提交的进程删除受影响的部分。
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic_core import to_jsonable_python
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import crud, crud_async, models, schemas
+from ..config import settings
+from ..database import SessionLocal
+from ..utils.cache_invalidation import ALL_FUNDS, cache_tag
+from ..utils.swr_cache import swr_cache
+from .fund_fetcher import FundDataFetcher
+from .realtime_valuation import build_batch_stock_valuations
+
+logger = logging.getLogger(__name__)
+
+SECTION_KEYS = {
+    "summary": "dashboard:summary",
+    "holdings": "dashboard:holdings",
+    "funds": "dashboard:funds",
+    "valuations": "dashboard:valuations",
+}
+
+# 缓存失效类别 -> 受影响的部分
+_INVALIDATED_SECTIONS = {
+    "fund": ("summary", "holdings", "funds"),  # 汇总和持仓中包含基金名称
+    "holding": ("summary", "holdings", "funds", "valuations"),
+    "transactions": ("summary", "holdings"),
+    "pnl": ("summary", "holdings"),
+    "nav": ("summary", "holdings", "valuations"),
+    "positions": ("funds",),
+}
+
+# 部分 -> 失效标签（每部分都依赖全部基金，登记在类别的通配标签下）
+SECTION_TAGS = {
+    section: [cache_tag(kind, ALL_FUNDS) for kind, sections in _INVALIDATED_SECTIONS.items() if section in sections]
+    for section in SECTION_KEYS
+}
+
+
+def build_portfolio_summary(db: Session, holdings: Optional[List[models.Holding]] = None) -> dict:
+    """投资组合汇总（使用累计总收益作为 total_profit）"""
+    return merge_cumulative_profit(crud.get_portfolio_summary(db, holdings), crud.get_portfolio_cumulative_profit(db))
+
+
+async def build_portfolio_summary_async(db: AsyncSession) -> dict:
+    """build_portfolio_summary 的异步版本（只读接口使用）"""
+    summary = await crud_async.get_portfolio_summary(db)
+    return merge_cumulative_profit(summary, await crud_async.get_portfolio_cumulative_profit(db))
+
+
+def merge_cumulative_profit(summary: dict, cumulative: dict) -> dict:
+    """用累计收益（每日收益叠加）替换实时计算的 total_profit，并附加每日收益历史"""
+    # 🔧 使用累计收益替换实时收益作为 total_profit
+    summary_dict = dict(summary)
+    summary_dict["total_profit"] = cumulative["cumulative_profit"]
+    summary_dict["total_profit_rate"] = (
+        cumulative["cumulative_profit"] / summary_dict["total_cost"] * 100
+        if summary_dict["total_cost"] > 0 else 0
+    )
+
+    # 合并返回结果
+    return {
+        **summary_dict,
+        "cumulative_profit": cumulative["cumulative_profit"],
+        "daily_profits_history": cumulative["daily_profits"]
+    }
+
+
+def _in_session(load: Callable[[Session], Any]) -> Any:
+    db = SessionLocal()
+    try:
+        return load(db)
+    finally:
+        db.close()
+
+
+def _load_portfolio(db: Session) -> Dict[str, Any]:
+    """持仓汇总和持仓列表（共用一次加载的持仓、最新净值和最新每日收益）"""
+    holdings = crud.get_holdings(db)
+    summary = schemas.PortfolioSummary(**build_portfolio_summary(db, holdings))
+    return {
+        "summary": summary.model_dump(mode="json"),
+        "holdings": [schemas.HoldingResponse.model_validate(h).model_dump(mode="json") for h in holdings],
+    }
+
+
+def _load_funds(db: Session) -> List[dict]:
+    return to_jsonable_python(crud.get_funds_overview_rows(db))
+
+
+def _load_valuations(db: Session) -> dict:
+    return build_batch_stock_valuations(db, crud.get_held_fund_codes(db)).model_dump(mode="json")
+
+
+def _portfolio_sections() -> Dict[str, Any]:
+    """summary / holdings：两部分都需要加载（未命中或后台刷新）时只加载一次"""
+    lock = threading.Lock()
+    loaded: Dict[str, Any] = {}
+
+    def loader(section: str) -> Callable[[], Any]:
+        # 同步加载和后台刷新共用 loaded：后台刷新在不同线程中执行，用锁保证只加载一次
+        def load():
+            with lock:
+                if not loaded:
+                    loaded.update(_in_session(_load_portfolio))
+            return loaded[section]
+        return load
+
+    return {
+        section: swr_cache.get(
+            SECTION_KEYS[section],
+            loader(section),
+            ttl=settings.DASHBOARD_PORTFOLIO_CACHE_TTL,
+            background_loader=loader(section),
+            tags=SECTION_TAGS[section],
+        )
+        for section in ("summary", "holdings")
+    }
+
+
+def _funds_section() -> List[dict]:
+    return swr_cache.get(
+        SECTION_KEYS["funds"],
+        lambda: _in_session(_load_funds),
+        ttl=settings.DASHBOARD_FUNDS_CACHE_TTL,
+        tags=SECTION_TAGS["funds"],
+    )
+
+
+def _valuations_section() -> dict:
+    ttl = (
+        settings.DASHBOARD_VALUATION_CACHE_TTL_TRADING
+        if FundDataFetcher.is_trading_time()
+        else settings.DASHBOARD_VALUATION_CACHE_TTL_NON_TRADING
+    )
+    return swr_cache.get(
+        SECTION_KEYS["valuations"], lambda: _in_session(_load_valuations), ttl=ttl, tags=SECTION_TAGS["valuations"]
+    )
+
+
+async def build_dashboard() -> Dict[str, Any]:
+    """并发计算（或读取缓存）看板的各部分"""
+    portfolio, funds, valuations = await asyncio.gather(
+        run_in_threadpool(_portfolio_sections),
+        run_in_threadpool(_funds_section),
+        run_in_threadpool(_valuations_section),
+    )
+    return {**portfolio, "funds": funds, "valuations": valuations}
+
@@ -2,17 +2,45 @@
 Efinance client wrapper with retry logic and timeout handling
 
 包装 efinance 库的所有 API 调用，添加自动重试和错误处理机制。
+efinance（连带 pandas）在首次调用时才导入，避免拖慢应用启动。
 """
+from __future__ import annotations
+
+import importlib
 import logging
-from typing import Optional
-import pandas as pd
-import efinance as ef
+import time
+from typing import Optional, TYPE_CHECKING
 from ..config import get_settings
 from ..utils.retry_helper import retry_with_backoff, APICallError
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_ef_module = None
+
+
+def _ef():
+    """延迟导入 efinance 模块（首次调用时加载并记录耗时）"""
+    global _ef_module
+    if _ef_module is None:
+        start = time.perf_counter()
+        _ef_module = importlib.import_module("efinance")
+        logger.info(f"[EfinanceClient] efinance 模块已加载，耗时 {time.perf_counter() - start:.2f}s")
+    return _ef_module
+
+
+# 重试参数来自配置：EFINANCE_MAX_RETRIES / EFINANCE_RETRY_BACKOFF / EFINANCE_RETRY_BACKOFF_MAX
+_retry = retry_with_backoff(
+    max_retries=settings.EFINANCE_MAX_RETRIES,
+    backoff_base=settings.EFINANCE_RETRY_BACKOFF,
+    backoff_max=settings.EFINANCE_RETRY_BACKOFF_MAX,
+    retry_on_timeout=True,
+    retry_on_connection_error=True
+)
+
 
 class EfinanceClient:
     """
@@ -26,6 +54,7 @@ class EfinanceClient:
         - EFINANCE_TIMEOUT: Connection/read timeout in seconds
         - EFINANCE_MAX_RETRIES: Maximum number of retry attempts
         - EFINANCE_RETRY_BACKOFF: Base backoff time for exponential backoff
+        - EFINANCE_RETRY_BACKOFF_MAX: Upper bound of a single backoff
     """
 
     def __init__(self):
@@ -33,18 +62,14 @@ class EfinanceClient:
         self._timeout = settings.EFINANCE_TIMEOUT
         self._max_retries = settings.EFINANCE_MAX_RETRIES
         self._backoff_base = settings.EFINANCE_RETRY_BACKOFF
+        self._backoff_max = settings.EFINANCE_RETRY_BACKOFF_MAX
 
         logger.info(
             f"[EfinanceClient] Initialized with timeout={self._timeout}s, "
-            f"max_retries={self._max_retries}, backoff_base={self._backoff_base}s"
+            f"max_retries={self._max_retries}, backoff_base={self._backoff_base}s, backoff_max={self._backoff_max}s"
         )
 
-    @retry_with_backoff(
-        max_retries=3,
-        backoff_base=1.0,
-        retry_on_timeout=True,
-        retry_on_connection_error=True
-    )
+    @_retry
     def get_base_info(self, fund_code: str) -> Optional[pd.Series]:
         """
         获取基金基本信息 (with retry)
@@ -59,14 +84,9 @@ class EfinanceClient:
             APICallError: 当所有重试都失败时
         """
         logger.debug(f"[EfinanceClient] Calling get_base_info for {fund_code}")
-        return ef.fund.get_base_info(fund_code)
-
-    @retry_with_backoff(
-        max_retries=3,
-        backoff_base=1.0,
-        retry_on_timeout=True,
-        retry_on_connection_error=True
-    )
+        return _ef().fund.get_base_info(fund_code)
+
+    @_retry
     def get_quote_history(
         self,
         fund_code: str,
@@ -77,7 +97,7 @@ class EfinanceClient:
 
         Args:
             fund_code: 基金代码
-            pz: 返回条数
+            pz: 返回条数（最新的 pz 条；为空时下载全部历史）
 
         Returns:
             历史净值 DataFrame 或 None
@@ -87,15 +107,10 @@ class EfinanceClient:
         """
         logger.debug(f"[EfinanceClient] Calling get_quote_history for {fund_code}, pz={pz}")
         if pz:
-            return ef.fund.get_quote_history(fund_code, pz=pz)
-        return ef.fund.get_quote_history(fund_code)
-
-    @retry_with_backoff(
-        max_retries=3,
-        backoff_base=1.0,
-        retry_on_timeout=True,
-        retry_on_connection_error=True
-    )
+            return _ef().fund.get_quote_history(fund_code, pz=pz)
+        return _ef().fund.get_quote_history(fund_code)
+
+    @_retry
     def get_realtime_increase_rate(self, fund_codes) -> Optional[pd.DataFrame]:
         """
         获取基金实时估算涨跌幅 (with retry)
@@ -110,14 +125,9 @@ class EfinanceClient:
             APICallError: 当所有重试都失败时
         """
         logger.debug(f"[EfinanceClient] Calling get_realtime_increase_rate for {fund_codes}")
-        return ef.fund.get_realtime_increase_rate(fund_codes)
-
-    @retry_with_backoff(
-        max_retries=3,
-        backoff_base=1.0,
-        retry_on_timeout=True,
-        retry_on_connection_error=True
-    )
+        return _ef().fund.get_realtime_increase_rate(fund_codes)
+
+    @_retry
     def get_fund_codes(self) -> Optional[pd.DataFrame]:
         """
         获取所有基金代码列表 (with retry)
@@ -129,14 +139,9 @@ class EfinanceClient:
             APICallError: 当所有重试都失败时
         """
         logger.debug("[EfinanceClient] Calling get_fund_codes")
-        return ef.fund.get_fund_codes()
-
-    @retry_with_backoff(
-        max_retries=3,
-        backoff_base=1.0,
-        retry_on_timeout=True,
-        retry_on_connection_error=True
-    )
+        return _ef().fund.get_fund_codes()
+
+    @_retry
     def get_realtime_quotes(self, market_type: str = None) -> Optional[pd.DataFrame]:
         """
         获取股票/ETF/LOF 实时行情 (with retry)
@@ -151,7 +156,7 @@ class EfinanceClient:
             APICallError: 当所有重试都失败时
         """
         logger.debug(f"[EfinanceClient] Calling get_realtime_quotes for {market_type}")
-        return ef.stock.get_realtime_quotes(market_type)
+        return _ef().stock.get_realtime_quotes(market_type)
 
 
 # Global singleton instance
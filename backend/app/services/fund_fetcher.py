@@ -1,6 +1,7 @@
-import pandas as pd
 from datetime import datetime, date, timedelta
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from typing import Optional, Dict, Any, List
 from decimal import Decimal
 import logging
 import json
@@ -8,6 +9,10 @@ import json
 from ..services.efinance_client import efinance_client
 from ..utils.retry_helper import APICallError
 from ..utils.redis_client import redis_client
+from ..utils.cache_invalidation import cache_tag, track_keys
+from ..utils.swr_cache import swr_cache
+from .quote_board import quote_board
+from .quote_stream import quote_stream
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -16,232 +21,285 @@ logger = logging.getLogger(__name__)
 class FundDataFetcher:
     """基金数据获取服务 - 使用 efinance (东方财富)"""
 
+    @staticmethod
+    def _default_fund_info(fund_code: str) -> Dict[str, Any]:
+        """查询不到基金信息时的默认值"""
+        return {
+            "fund_code": fund_code,
+            "fund_name": f"基金{fund_code}",
+            "fund_type": "开放式基金",
+            "latest_nav": 0,
+        }
+
     @staticmethod
     def get_fund_info(fund_code: str) -> Dict[str, Any]:
         """
         获取基金基本信息
 
+        缓存：stale-while-revalidate，FUND_INFO_CACHE_TTL 为 hard TTL；
+        查询不到或接口失败时按 FUND_DATA_NULL_CACHE_TTL 缓存空值
+
         Args:
             fund_code: 基金代码 (6位)
 
         Returns:
             基金信息字典
         """
-        # 检查缓存
         cache_key = f"fund:info:{fund_code}"
-        if redis_client.is_available():
-            cached_value = redis_client.get(cache_key)
-            if cached_value:
-                if cached_value == "NULL":
-                    logger.info(f"[基金信息缓存] 命中（空值）: {cache_key}")
-                    return {
-                        "fund_code": fund_code,
-                        "fund_name": f"基金{fund_code}",
-                        "fund_type": "开放式基金",
-                        "latest_nav": 0,
-                    }
-                try:
-                    result = json.loads(cached_value)
-                    logger.info(f"[基金信息缓存] 命中: {cache_key}")
-                    return result
-                except json.JSONDecodeError:
-                    logger.warning(f"[基金信息缓存] 缓存数据格式错误: {cache_key}")
-
-            logger.info(f"[基金信息缓存] 未命中: {cache_key}，调用API")
-
         try:
-            # 使用 get_base_info 获取基金基本信息（带重试）
-            fund_info = efinance_client.get_base_info(fund_code)
-
-            if fund_info is None:
-                logger.warning(f"基金 {fund_code} 未找到数据")
-                return {
-                    "fund_code": fund_code,
-                    "fund_name": f"基金{fund_code}",
-                    "fund_type": "开放式基金",
-                    "latest_nav": 0,
-                }
-
-            # 处理不同类型的返回值 (dict 或 pandas Series)
-            if hasattr(fund_info, 'empty') and fund_info.empty:
-                logger.warning(f"基金 {fund_code} 数据为空")
-                return {
-                    "fund_code": fund_code,
-                    "fund_name": f"基金{fund_code}",
-                    "fund_type": "开放式基金",
-                    "latest_nav": 0,
-                }
-
-            # 安全地获取基金信息
-            fund_name = f"基金{fund_code}"
-            fund_type = "开放式基金"
-            latest_nav = 0
-
-            if hasattr(fund_info, 'get'):
-                # 是 dict 或 pandas Series
-                fund_name = fund_info.get("基金简称", f"基金{fund_code}")
-                fund_type = fund_info.get("基金类型", "开放式基金")
-                latest_nav = fund_info.get("最新净值", 0)
-            elif isinstance(fund_info, dict):
-                fund_name = fund_info.get("基金简称", f"基金{fund_code}")
-                fund_type = fund_info.get("基金类型", "开放式基金")
-                latest_nav = fund_info.get("最新净值", 0)
-
-            result = {
-                "fund_code": fund_code,
-                "fund_name": fund_name,
-                "fund_type": fund_type,
-                "latest_nav": float(latest_nav) if latest_nav else 0,
-            }
-
-            # 更新缓存
-            if redis_client.is_available():
-                cache_value = json.dumps(result, ensure_ascii=False)
-                redis_client.set(cache_key, cache_value, ttl=settings.FUND_INFO_CACHE_TTL)
-                logger.info(f"[基金信息缓存] 已缓存: {cache_key}")
-
-            return result
-
+            result = swr_cache.get(
+                cache_key,
+                lambda: FundDataFetcher._fetch_fund_info(fund_code),
+                ttl=settings.FUND_INFO_CACHE_TTL,
+                null_ttl=settings.FUND_DATA_NULL_CACHE_TTL,
+            )
         except APICallError as e:
             logger.error(
                 f"获取基金 {fund_code} 信息失败: {e.message}, "
                 f"error_type={e.error_type}, attempts=exhausted"
             )
-            result = {
-                "fund_code": fund_code,
-                "fund_name": f"基金{fund_code}",
-                "fund_type": "开放式基金",
-                "latest_nav": 0,
-            }
             # 空值缓存
-            if redis_client.is_available():
-                redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
-            return result
+            swr_cache.write(cache_key, None, ttl=settings.FUND_DATA_NULL_CACHE_TTL)
+            result = None
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 信息失败: {str(e)}")
-            result = {
-                "fund_code": fund_code,
-                "fund_name": f"基金{fund_code}",
-                "fund_type": "开放式基金",
-                "latest_nav": 0,
-            }
             # 空值缓存
-            if redis_client.is_available():
-                redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
-            return result
+            swr_cache.write(cache_key, None, ttl=settings.FUND_DATA_NULL_CACHE_TTL)
+            result = None
+
+        return result or FundDataFetcher._default_fund_info(fund_code)
+
+    @staticmethod
+    def _fetch_fund_info(fund_code: str) -> Optional[Dict[str, Any]]:
+        """
+        调用 efinance 获取基金基本信息
+
+        Returns:
+            基金信息字典，基金不存在或数据为空时返回 None
+
+        Raises:
+            APICallError: 当所有重试都失败时
+        """
+        logger.info(f"[基金信息缓存] 调用API: {fund_code}")
+
+        # 使用 get_base_info 获取基金基本信息（带重试）
+        fund_info = efinance_client.get_base_info(fund_code)
+
+        if fund_info is None:
+            logger.warning(f"基金 {fund_code} 未找到数据")
+            return None
+
+        # 处理不同类型的返回值 (dict 或 pandas Series)
+        if hasattr(fund_info, 'empty') and fund_info.empty:
+            logger.warning(f"基金 {fund_code} 数据为空")
+            return None
+
+        # 安全地获取基金信息
+        fund_name = f"基金{fund_code}"
+        fund_type = "开放式基金"
+        latest_nav = 0
+
+        if hasattr(fund_info, 'get'):
+            # 是 dict 或 pandas Series
+            fund_name = fund_info.get("基金简称", f"基金{fund_code}")
+            fund_type = fund_info.get("基金类型", "开放式基金")
+            latest_nav = fund_info.get("最新净值", 0)
+
+        return {
+            "fund_code": fund_code,
+            "fund_name": fund_name,
+            "fund_type": fund_type,
+            "latest_nav": float(latest_nav) if latest_nav else 0,
+        }
 
     @staticmethod
     def get_fund_nav(fund_code: str) -> Optional[Dict[str, Any]]:
         """
         获取基金最新净值
 
+        缓存：stale-while-revalidate，FUND_LATEST_NAV_CACHE_TTL 为 hard TTL；
+        没有净值或接口失败时按 FUND_DATA_NULL_CACHE_TTL 缓存空值
+
         Args:
             fund_code: 基金代码 (6位)
 
         Returns:
             净值信息字典
         """
-        # 检查缓存
         cache_key = f"fund:nav:latest:{fund_code}"
-        if redis_client.is_available():
-            cached_value = redis_client.get(cache_key)
-            if cached_value:
-                if cached_value == "NULL":
-                    logger.info(f"[最新净值缓存] 命中（空值）: {cache_key}")
-                    return None
-                try:
-                    cached_data = json.loads(cached_value)
-                    # 反序列化特殊类型
-                    if cached_data.get("date"):
-                        cached_data["date"] = datetime.strptime(cached_data["date"], "%Y-%m-%d").date()
-                    if cached_data.get("unit_nav"):
-                        cached_data["unit_nav"] = Decimal(str(cached_data["unit_nav"]))
-                    if cached_data.get("accumulated_nav"):
-                        cached_data["accumulated_nav"] = Decimal(str(cached_data["accumulated_nav"]))
-                    if cached_data.get("daily_growth"):
-                        cached_data["daily_growth"] = Decimal(str(cached_data["daily_growth"]))
-                    logger.info(f"[最新净值缓存] 命中: {cache_key}")
-                    return cached_data
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"[最新净值缓存] 缓存数据格式错误: {cache_key}, error={e}")
+        tags = [cache_tag("nav", fund_code)]
+        try:
+            cached_data = swr_cache.get(
+                cache_key,
+                lambda: FundDataFetcher._fetch_fund_nav(fund_code),
+                ttl=settings.FUND_LATEST_NAV_CACHE_TTL,
+                null_ttl=settings.FUND_DATA_NULL_CACHE_TTL,
+                tags=tags,
+            )
+        except APICallError as e:
+            logger.error(f"获取基金 {fund_code} 净值失败: {e.message}, error_type={e.error_type}")
+            # 空值缓存
+            swr_cache.write(cache_key, None, ttl=settings.FUND_DATA_NULL_CACHE_TTL, tags=tags)
+            return None
+        except Exception as e:
+            logger.error(f"获取基金 {fund_code} 净值失败: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            # 空值缓存
+            swr_cache.write(cache_key, None, ttl=settings.FUND_DATA_NULL_CACHE_TTL, tags=tags)
+            return None
 
-            logger.info(f"[最新净值缓存] 未命中: {cache_key}，调用API")
+        if not cached_data:
+            return None
 
-        try:
-            # 使用 get_quote_history 获取历史净值数据（带重试）
-            history_df = efinance_client.get_quote_history(fund_code)
+        # 反序列化特殊类型
+        result = dict(cached_data)
+        result["date"] = datetime.strptime(result["date"], "%Y-%m-%d").date()
+        for field in ("unit_nav", "accumulated_nav", "daily_growth"):
+            result[field] = Decimal(result[field])
+        return result
 
-            if history_df is None or history_df.empty:
-                logger.warning(f"基金 {fund_code} 没有净值数据")
-                return None
+    @staticmethod
+    def get_fund_navs(fund_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        并发获取多只基金的最新净值（每只基金走 get_fund_nav 的缓存和单页请求）
+
+        Args:
+            fund_codes: 基金代码列表
+
+        Returns:
+            基金代码 -> 净值信息字典（获取失败或没有净值的基金不包含在内）
+        """
+        fund_codes = list(dict.fromkeys(fund_codes))
+        if not fund_codes:
+            return {}
+
+        workers = max(1, min(settings.FUND_NAV_FETCH_CONCURRENCY, len(fund_codes)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fund-nav") as executor:
+            # 每个任务在调用方上下文的副本中执行：保留请求截止时间和指标统计
+            futures = [
+                executor.submit(contextvars.copy_context().run, FundDataFetcher.get_fund_nav, code)
+                for code in fund_codes
+            ]
+            return {code: nav for code, nav in zip(fund_codes, (future.result() for future in futures)) if nav}
+
+    @staticmethod
+    def _fetch_fund_nav(fund_code: str) -> Optional[Dict[str, Any]]:
+        """
+        调用 efinance 获取基金最新净值（可直接写入缓存的序列化形式：日期和数值为字符串）
+
+        Returns:
+            净值信息字典，没有净值数据时返回 None
+
+        Raises:
+            APICallError: 当所有重试都失败时
+        """
+        import pandas as pd
+
+        logger.info(f"[最新净值缓存] 调用API: {fund_code}")
 
-            # 获取最新一条（第一条是最新的）
-            latest = history_df.iloc[0]
+        # 只请求最新一页净值（带重试），不下载全部历史
+        history_df = efinance_client.get_quote_history(fund_code, pz=settings.FUND_LATEST_NAV_PAGE_SIZE)
 
-            # 解析日期
-            nav_date = latest.get("日期")
+        if history_df is None or history_df.empty:
+            logger.warning(f"基金 {fund_code} 没有净值数据")
+            return None
+
+        # 获取最新一条（第一条是最新的）
+        latest = history_df.iloc[0]
+
+        # 解析日期
+        nav_date = latest.get("日期")
+        if nav_date is None:
+            nav_date = datetime.now().date()
+        elif isinstance(nav_date, str):
+            nav_date = datetime.strptime(nav_date, "%Y-%m-%d").date()
+        elif isinstance(nav_date, pd.Timestamp):
+            nav_date = nav_date.date()
+
+        # 解析单位净值
+        unit_nav = latest.get("单位净值")
+        if unit_nav is None or pd.isna(unit_nav):
+            unit_nav = 0
+
+        # 解析累计净值
+        accumulated_nav = latest.get("累计净值")
+        if accumulated_nav is None or pd.isna(accumulated_nav):
+            accumulated_nav = unit_nav
+
+        # 解析日增长率
+        daily_growth_str = latest.get("涨跌幅")
+        if daily_growth_str is None or pd.isna(daily_growth_str):
+            daily_growth = Decimal("0")
+        else:
+            if isinstance(daily_growth_str, str):
+                daily_growth_str = daily_growth_str.replace("%", "").strip()
+            daily_growth = Decimal(str(daily_growth_str)) / 100
+
+        return {
+            "fund_code": fund_code,
+            "date": nav_date.isoformat(),
+            "unit_nav": str(Decimal(str(unit_nav))),
+            "accumulated_nav": str(Decimal(str(accumulated_nav))),
+            "daily_growth": str(daily_growth),
+        }
+
+    @staticmethod
+    def fetch_nav_history(fund_code: str, pz: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        调用 efinance 获取最新的 pz 条历史净值（不使用缓存，最新在前）
+
+        Args:
+            fund_code: 基金代码 (6位)
+            pz: 条数（为空时下载全部历史）
+
+        Returns:
+            历史净值列表（date / unit_nav / accumulated_nav / daily_growth），没有数据时返回空列表
+
+        Raises:
+            APICallError: 当所有重试都失败时
+        """
+        import pandas as pd
+
+        history_df = efinance_client.get_quote_history(fund_code, pz=pz)
+        if history_df is None or history_df.empty:
+            return []
+
+        result = []
+        for _, row in history_df.iterrows():
+            nav_date = row.get("日期")
             if nav_date is None:
-                nav_date = datetime.now().date()
-            elif isinstance(nav_date, str):
+                continue
+
+            if isinstance(nav_date, str):
                 nav_date = datetime.strptime(nav_date, "%Y-%m-%d").date()
             elif isinstance(nav_date, pd.Timestamp):
                 nav_date = nav_date.date()
 
-            # 解析单位净值
-            unit_nav = latest.get("单位净值")
+            # 解析净值
+            unit_nav = row.get("单位净值")
             if unit_nav is None or pd.isna(unit_nav):
                 unit_nav = 0
 
             # 解析累计净值
-            accumulated_nav = latest.get("累计净值")
+            accumulated_nav = row.get("累计净值")
             if accumulated_nav is None or pd.isna(accumulated_nav):
                 accumulated_nav = unit_nav
 
             # 解析日增长率
-            daily_growth_str = latest.get("涨跌幅")
-            if daily_growth_str is None or pd.isna(daily_growth_str):
-                daily_growth = Decimal("0")
-            else:
-                if isinstance(daily_growth_str, str):
-                    daily_growth_str = daily_growth_str.replace("%", "").strip()
-                daily_growth = Decimal(str(daily_growth_str)) / 100
+            daily_growth_val = row.get("涨跌幅", "0")
+            if isinstance(daily_growth_val, str):
+                daily_growth_val = daily_growth_val.replace("%", "").strip()
+            elif pd.isna(daily_growth_val):
+                daily_growth_val = "0"
 
-            result = {
-                "fund_code": fund_code,
+            result.append({
                 "date": nav_date,
                 "unit_nav": Decimal(str(unit_nav)),
                 "accumulated_nav": Decimal(str(accumulated_nav)),
-                "daily_growth": daily_growth,
-            }
-
-            # 更新缓存
-            if redis_client.is_available():
-                # 序列化特殊类型
-                cache_data = result.copy()
-                cache_data["date"] = result["date"].isoformat()
-                cache_data["unit_nav"] = str(result["unit_nav"])
-                cache_data["accumulated_nav"] = str(result["accumulated_nav"])
-                cache_data["daily_growth"] = str(result["daily_growth"])
-                cache_value = json.dumps(cache_data, ensure_ascii=False)
-                redis_client.set(cache_key, cache_value, ttl=settings.FUND_LATEST_NAV_CACHE_TTL)
-                logger.info(f"[最新净值缓存] 已缓存: {cache_key}")
-
-            return result
-
-        except APICallError as e:
-            logger.error(f"获取基金 {fund_code} 净值失败: {e.message}, error_type={e.error_type}")
-            # 空值缓存
-            if redis_client.is_available():
-                redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
-            return None
-        except Exception as e:
-            logger.error(f"获取基金 {fund_code} 净值失败: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            # 空值缓存
-            if redis_client.is_available():
-                redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
-            return None
+                "daily_growth": Decimal(str(daily_growth_val)) / 100,
+            })
+        return result
 
     @staticmethod
     def get_fund_history(fund_code: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> list[Dict[str, Any]]:
@@ -284,57 +342,18 @@ class FundDataFetcher:
             logger.info(f"[历史净值缓存] 未命中: {cache_key}，调用API")
 
         try:
-            # 使用 get_quote_history 获取历史净值数据（带重试）
-            history_df = efinance_client.get_quote_history(fund_code, pz=40000)
-
-            if history_df is None or history_df.empty:
+            result = FundDataFetcher.fetch_nav_history(fund_code, pz=40000)
+            if not result:
                 logger.warning(f"基金 {fund_code} 没有历史数据")
                 return []
 
-            result = []
-            for _, row in history_df.iterrows():
-                nav_date = row.get("日期")
-                if nav_date is None:
-                    continue
-
-                if isinstance(nav_date, str):
-                    nav_date = datetime.strptime(nav_date, "%Y-%m-%d").date()
-                elif isinstance(nav_date, pd.Timestamp):
-                    nav_date = nav_date.date()
-
-                # 日期过滤
-                if start_date:
-                    start = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    if nav_date < start:
-                        continue
-                if end_date:
-                    end = datetime.strptime(end_date, "%Y-%m-%d").date()
-                    if nav_date > end:
-                        continue
-
-                # 解析净值
-                unit_nav = row.get("单位净值")
-                if unit_nav is None or pd.isna(unit_nav):
-                    unit_nav = 0
-
-                # 解析累计净值
-                accumulated_nav = row.get("累计净值")
-                if accumulated_nav is None or pd.isna(accumulated_nav):
-                    accumulated_nav = unit_nav
-
-                # 解析日增长率
-                daily_growth_val = row.get("涨跌幅", "0")
-                if isinstance(daily_growth_val, str):
-                    daily_growth_val = daily_growth_val.replace("%", "").strip()
-                elif pd.isna(daily_growth_val):
-                    daily_growth_val = "0"
-
-                result.append({
-                    "date": nav_date,
-                    "unit_nav": Decimal(str(unit_nav)),
-                    "accumulated_nav": Decimal(str(accumulated_nav)),
-                    "daily_growth": Decimal(str(daily_growth_val)) / 100,
-                })
+            # 日期过滤
+            if start_date:
+                start = datetime.strptime(start_date, "%Y-%m-%d").date()
+                result = [item for item in result if item["date"] >= start]
+            if end_date:
+                end = datetime.strptime(end_date, "%Y-%m-%d").date()
+                result = [item for item in result if item["date"] <= end]
 
             # 更新缓存
             if redis_client.is_available() and result:
@@ -349,6 +368,7 @@ class FundDataFetcher:
                     cache_list.append(cache_item)
                 cache_value = json.dumps(cache_list, ensure_ascii=False)
                 redis_client.set(cache_key, cache_value, ttl=settings.FUND_HISTORY_NAV_CACHE_TTL)
+                track_keys([cache_tag("nav", fund_code)], [cache_key])
                 logger.info(f"[历史净值缓存] 已缓存: {cache_key}")
 
             return result
@@ -358,12 +378,14 @@ class FundDataFetcher:
             # 空值缓存
             if redis_client.is_available():
                 redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
+                track_keys([cache_tag("nav", fund_code)], [cache_key])
             return []
         except Exception as e:
             logger.error(f"获取基金 {fund_code} 历史数据失败: {str(e)}")
             # 空值缓存
             if redis_client.is_available():
                 redis_client.set(cache_key, "NULL", ttl=settings.FUND_DATA_NULL_CACHE_TTL)
+                track_keys([cache_tag("nav", fund_code)], [cache_key])
             return []
 
     @staticmethod
@@ -451,6 +473,40 @@ class FundDataFetcher:
         # LOF判断：包含 "LOF" 字样
         return 'ETF' in fund_type_upper or 'LOF' in fund_type_upper
 
+    @staticmethod
+    def get_ingested_listed_quotes(fund_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        读取行情采集进程写入的场内基金实时股价：先读共享内存看板（QUOTE_BOARD_ENABLED），
+        再读 Redis 最新行情哈希（QUOTE_SOURCE=stream）；都未启用时返回空字典
+
+        Returns:
+            基金代码 -> 与 get_listed_fund_realtime_price 相同格式的字典（没有行情的基金不包含在内）
+        """
+        if not fund_codes:
+            return {}
+        quotes: Dict[str, dict] = {}
+        # 两种来源都只使用实时行情缓存 TTL 内更新过的数据（采集进程停止后不返回旧价格）
+        max_age = (
+            settings.STOCK_REALTIME_CACHE_TTL_TRADING
+            if FundDataFetcher.is_trading_time()
+            else settings.STOCK_REALTIME_CACHE_TTL_NON_TRADING
+        )
+        if settings.QUOTE_BOARD_ENABLED:
+            quotes = quote_board.read(fund_codes, max_age=max_age)
+        if quote_stream.enabled:
+            quotes.update(quote_stream.read([code for code in fund_codes if code not in quotes], max_age=max_age))
+        return {
+            code: {
+                "fund_code": code,
+                "current_price": quote["price"],
+                "increase_rate": quote["change_pct"],
+                "data_source": "stock",
+                "estimate_time": quote["update_time"]
+            }
+            for code, quote in quotes.items()
+            if quote["price"] is not None and quote["change_pct"] is not None
+        }
+
     @staticmethod
     def get_listed_fund_realtime_price(fund_code: str) -> Optional[Dict[str, Any]]:
         """
@@ -462,6 +518,10 @@ class FundDataFetcher:
         Returns:
             包含实时股价和涨跌幅的字典，失败返回 None
         """
+        ingested_quote = FundDataFetcher.get_ingested_listed_quotes([fund_code]).get(fund_code)
+        if ingested_quote or quote_stream.enabled:
+            return ingested_quote
+
         try:
             # 尝试获取ETF行情（带重试）
             etf_data = efinance_client.get_realtime_quotes('ETF')
@@ -548,6 +608,8 @@ class FundDataFetcher:
             - estimate_time: 估算时间
             - latest_nav_date: 最新净值日期
         """
+        import pandas as pd
+
         # 判断是否为场内基金
         is_listed = FundDataFetcher.is_listed_fund(fund_type)
 
@@ -628,6 +690,120 @@ class FundDataFetcher:
             logger.error(traceback.format_exc())
             return None
 
+    @staticmethod
+    def _chunk_codes(fund_codes: List[str]) -> List[List[str]]:
+        """
+        把基金代码分成大小均衡的批次
+
+        批次数取以下两者的较大值：
+        - 按 FUND_ESTIMATE_BATCH_SIZE 上限需要的批次数
+        - 在每批不少于 FUND_ESTIMATE_MIN_BATCH_SIZE 只的前提下，尽量用满 FUND_ESTIMATE_FETCH_CONCURRENCY
+        例如 40 只基金分为 4 批各 10 只并发请求，200 只分为 7 批各 28~29 只
+        """
+        total = len(fund_codes)
+        if total == 0:
+            return []
+        max_size = max(1, settings.FUND_ESTIMATE_BATCH_SIZE)
+        min_size = max(1, min(settings.FUND_ESTIMATE_MIN_BATCH_SIZE, max_size))
+        chunks = max(
+            -(-total // max_size),
+            min(settings.FUND_ESTIMATE_FETCH_CONCURRENCY, total // min_size),
+            1
+        )
+        size, extra = divmod(total, chunks)
+        result, start = [], 0
+        for i in range(chunks):
+            end = start + size + (1 if i < extra else 0)
+            result.append(fund_codes[start:end])
+            start = end
+        return result
+
+    @staticmethod
+    def _parse_estimate_row(row) -> Optional[Dict[str, Any]]:
+        """解析 get_realtime_increase_rate 返回的一行（估算涨跌幅统一为百分比）"""
+        import pandas as pd
+
+        fund_code = row.get("基金代码")
+        if not fund_code:
+            return None
+
+        increase_rate_val = row.get("估算涨跌幅", 0)
+        if increase_rate_val is None or pd.isna(increase_rate_val):
+            increase_rate = Decimal("0")
+        else:
+            if isinstance(increase_rate_val, str):
+                increase_rate_val = increase_rate_val.replace("%", "").strip()
+            # efinance返回的涨跌幅可能是小数形式（如0.025）或百分比形式（如2.5）
+            # 如果值小于1，说明是小数形式，需要转换为百分比
+            increase_rate_float = float(increase_rate_val)
+            if abs(increase_rate_float) < 1:
+                increase_rate = Decimal(str(increase_rate_float * 100))
+            else:
+                increase_rate = Decimal(str(increase_rate_float))
+
+        return {
+            "fund_code": fund_code,
+            "increase_rate": float(increase_rate),
+            "data_source": "estimate",
+            "is_listed_fund": False,
+            "estimate_time": datetime.now(),
+            "latest_nav_date": row.get("最新净值公开日期")
+        }
+
+    @staticmethod
+    def _fetch_estimate_chunk(fund_codes: List[str]) -> List[Dict[str, Any]]:
+        """请求一批基金的估算涨跌幅（失败时记录日志并返回空列表，不影响其他批次）"""
+        try:
+            result = efinance_client.get_realtime_increase_rate(fund_codes)
+        except APICallError as e:
+            logger.error(f"批量获取估算涨跌幅失败（{len(fund_codes)} 只）: {e.message}, error_type={e.error_type}")
+            return []
+        except Exception as e:
+            logger.error(f"批量获取估算涨跌幅失败（{len(fund_codes)} 只）: {str(e)}")
+            return []
+
+        if result is None or result.empty:
+            return []
+        estimates = []
+        for _, row in result.iterrows():
+            try:
+                estimate = FundDataFetcher._parse_estimate_row(row)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"解析估算涨跌幅失败: {row.get('基金代码')}, error={e}")
+                continue
+            if estimate:
+                estimates.append(estimate)
+        return estimates
+
+    @staticmethod
+    def get_realtime_estimates(fund_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取场外基金估算涨跌幅
+
+        按 _chunk_codes 分批，批次之间并发请求（最多 FUND_ESTIMATE_FETCH_CONCURRENCY 个），合并结果。
+        工作线程复制调用方的上下文，请求的重试截止时间（deadline）对每个批次同样生效。
+
+        Args:
+            fund_codes: 基金代码列表
+
+        Returns:
+            基金代码 -> 估值信息字典（请求失败或没有估值的基金不包含在内）
+        """
+        chunks = FundDataFetcher._chunk_codes(list(dict.fromkeys(fund_codes)))
+        if not chunks:
+            return {}
+        if len(chunks) == 1:
+            results = [FundDataFetcher._fetch_estimate_chunk(chunks[0])]
+        else:
+            workers = min(settings.FUND_ESTIMATE_FETCH_CONCURRENCY, len(chunks))
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fund-estimate") as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, FundDataFetcher._fetch_estimate_chunk, chunk)
+                    for chunk in chunks
+                ]
+                results = [future.result() for future in futures]
+        return {estimate["fund_code"]: estimate for chunk in results for estimate in chunk}
+
     @staticmethod
     def get_all_funds_realtime_valuation(fund_codes: list, fund_types: Optional[Dict[str, str]] = None) -> list[Dict[str, Any]]:
         """
@@ -640,6 +816,8 @@ class FundDataFetcher:
         Returns:
             实时估值列表
         """
+        import pandas as pd
+
         try:
             # 分离场内和场外基金
             listed_fund_codes = []
@@ -657,8 +835,17 @@ class FundDataFetcher:
 
             valuations = []
 
-            # 1. 批量获取场内基金实时股价
-            if listed_fund_codes:
+            # 1. 批量获取场内基金实时股价（先读采集进程写入的行情，未命中的再请求 ETF/LOF 全市场行情）
+            ingested_quotes = FundDataFetcher.get_ingested_listed_quotes(listed_fund_codes)
+            for code in listed_fund_codes:
+                if code in ingested_quotes:
+                    valuations.append({**ingested_quotes[code], "is_listed_fund": True})
+            listed_fund_codes = [code for code in listed_fund_codes if code not in ingested_quotes]
+
+            if listed_fund_codes and quote_stream.enabled:
+                # 只读 Redis 模式：没有行情的场内基金直接降级到场外处理
+                offshore_fund_codes.extend(listed_fund_codes)
+            elif listed_fund_codes:
                 try:
                     # 获取所有ETF和LOF的实时行情（带重试）
                     etf_data = efinance_client.get_realtime_quotes('ETF')
@@ -695,58 +882,10 @@ class FundDataFetcher:
                     # 失败时全部降级到场外处理
                     offshore_fund_codes.extend(listed_fund_codes)
 
-            # 2. 批量获取场外基金估算涨跌幅（带重试）
+            # 2. 批量获取场外基金估算涨跌幅（分批并发，带重试）
             if offshore_fund_codes:
-                result = efinance_client.get_realtime_increase_rate(offshore_fund_codes)
-
-                if result is not None and not (hasattr(result, 'empty') and result.empty):
-                    for idx in range(len(result)):
-                        row = result.iloc[idx] if hasattr(result, 'iloc') else result[idx]
-
-                        fund_code = None
-                        increase_rate_val = 0
-
-                        # 提取数据
-                        if hasattr(row, 'get'):
-                            fund_code = row.get("基金代码")
-                            increase_rate_val = row.get("估算涨跌幅", 0)
-                        elif isinstance(row, dict):
-                            fund_code = row.get("基金代码")
-                            increase_rate_val = row.get("估算涨跌幅", 0)
-                        elif hasattr(row, '__getitem__'):
-                            # pandas Series
-                            if "基金代码" in row.index:
-                                fund_code = row["基金代码"]
-                            if "估算涨跌幅" in row.index:
-                                increase_rate_val = row["估算涨跌幅"]
-
-                        if not fund_code:
-                            continue
-
-                        # 处理涨跌幅
-                        if increase_rate_val is None or pd.isna(increase_rate_val):
-                            increase_rate = Decimal("0")
-                        else:
-                            if isinstance(increase_rate_val, str):
-                                increase_rate_val = increase_rate_val.replace("%", "").strip()
-                            # efinance返回的涨跌幅可能是小数形式（如0.025）或百分比形式（如2.5）
-                            # 如果值小于1，说明是小数形式，需要转换为百分比
-                            increase_rate_float = float(increase_rate_val)
-                            if abs(increase_rate_float) < 1:
-                                # 小数形式，转换为百分比
-                                increase_rate = Decimal(str(increase_rate_float * 100))
-                            else:
-                                # 已经是百分比形式
-                                increase_rate = Decimal(str(increase_rate_float))
-
-                        valuations.append({
-                            "fund_code": fund_code,
-                            "increase_rate": float(increase_rate),
-                            "data_source": "estimate",
-                            "is_listed_fund": False,
-                            "estimate_time": datetime.now(),
-                            "latest_nav_date": row.get("最新净值公开日期") if hasattr(row, 'get') else None
-                        })
+                estimates = FundDataFetcher.get_realtime_estimates(offshore_fund_codes)
+                valuations.extend(estimates[code] for code in dict.fromkeys(offshore_fund_codes) if code in estimates)
 
             return valuations
 
@@ -0,0 +1,195 @@
+"""
+日内估值时间序列记录器
+
+交易时间内定时对所有持仓基金的实时估值采样，追加写入 Redis Stream：
+    fund:intraday:{YYYYMMDD}:{fund_code}          原始采样（按日分区的环形缓冲区）
+收盘后按 INTRADAY_COMPACT_BUCKET（默认 5 分钟）降采样为列式 JSON：
+    fund:intraday:compact:{YYYYMMDD}:{fund_code}  {"t": [...], "nav": [...], "rate": [...]}
+
+读取接口只访问 Redis，不触发任何外部 API 调用。
+"""
+import json
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from .. import crud
+from ..config import settings
+from ..database import SessionLocal
+from ..utils.redis_client import redis_client
+from .fund_fetcher import FundDataFetcher
+from .realtime_valuation import build_batch_stock_valuations
+
+logger = logging.getLogger(__name__)
+
+
+class IntradayRecorder:
+    """日内估值记录器"""
+
+    @staticmethod
+    def _stream_key(day: date, fund_code: str) -> str:
+        return f"fund:intraday:{day.strftime('%Y%m%d')}:{fund_code}"
+
+    @staticmethod
+    def _compact_key(day: date, fund_code: str) -> str:
+        return f"fund:intraday:compact:{day.strftime('%Y%m%d')}:{fund_code}"
+
+    @staticmethod
+    def _estimated_nav(item) -> Optional[float]:
+        """根据估值项计算估算净值（场内基金为实时股价）"""
+        if item.is_listed_fund and item.current_price:
+            return item.current_price
+        if item.latest_nav_unit_nav and item.increase_rate is not None:
+            return round(item.latest_nav_unit_nav * (1 + item.increase_rate / 100), 4)
+        return None
+
+    def sample(self) -> int:
+        """
+        对所有持仓基金采样一次
+
+        Returns:
+            写入的采样点数量
+        """
+        if not FundDataFetcher.is_trading_time():
+            return 0
+        if not redis_client.is_available():
+            logger.warning("[日内估值] Redis 不可用，跳过采样")
+            return 0
+
+        db = SessionLocal()
+        try:
+            fund_codes = crud.get_held_fund_codes(db)
+            if not fund_codes:
+                return 0
+            response = build_batch_stock_valuations(db, fund_codes)
+        finally:
+            db.close()
+
+        now = datetime.now()
+        today = now.date()
+        timestamp = int(now.timestamp())
+        written = 0
+
+        for item in response.valuations:
+            # 降级为正式净值的数据不是盘中估值，不记录
+            if item.data_source == "nav":
+                continue
+            estimated_nav = self._estimated_nav(item)
+            if estimated_nav is None:
+                continue
+
+            entry_id = redis_client.xadd(
+                self._stream_key(today, item.fund_code),
+                {
+                    "t": timestamp,
+                    "nav": estimated_nav,
+                    "rate": item.increase_rate if item.increase_rate is not None else "",
+                    "src": item.data_source or "",
+                },
+                maxlen=settings.INTRADAY_STREAM_MAXLEN,
+                ttl=settings.INTRADAY_STREAM_TTL,
+            )
+            if entry_id:
+                written += 1
+
+        logger.info(f"[日内估值] 已采样 {written}/{len(fund_codes)} 只基金")
+        return written
+
+    @staticmethod
+    def _read_stream(key: str) -> Dict[str, list]:
+        """读取原始采样流为列式数据"""
+        series = {"t": [], "nav": [], "rate": []}
+        for _, fields in redis_client.xrange(key):
+            try:
+                series["t"].append(int(fields["t"]))
+                series["nav"].append(float(fields["nav"]))
+                series["rate"].append(float(fields["rate"]) if fields.get("rate") not in (None, "") else None)
+            except (KeyError, ValueError):
+                continue
+        return series
+
+    @staticmethod
+    def _downsample(series: Dict[str, list], bucket: int) -> Dict[str, list]:
+        """按时间区间降采样，每个区间保留最后一个采样点"""
+        compact = {"t": [], "nav": [], "rate": []}
+        last_bucket = None
+        for t, nav, rate in zip(series["t"], series["nav"], series["rate"]):
+            current_bucket = t // bucket
+            if current_bucket == last_bucket:
+                compact["t"][-1], compact["nav"][-1], compact["rate"][-1] = t, nav, rate
+            else:
+                compact["t"].append(t)
+                compact["nav"].append(nav)
+                compact["rate"].append(rate)
+                last_bucket = current_bucket
+        return compact
+
+    def compact(self, day: Optional[date] = None) -> int:
+        """
+        收盘后压缩指定日期的原始采样流
+
+        Args:
+            day: 日期（默认今天）
+
+        Returns:
+            压缩的基金数量
+        """
+        day = day or date.today()
+        prefix = f"fund:intraday:{day.strftime('%Y%m%d')}:"
+        compacted = 0
+
+        for key in redis_client.scan_keys(f"{prefix}*"):
+            fund_code = key[len(prefix):]
+            series = self._read_stream(key)
+            if series["t"]:
+                compact = self._downsample(series, settings.INTRADAY_COMPACT_BUCKET)
+                redis_client.set(
+                    self._compact_key(day, fund_code),
+                    json.dumps(compact, separators=(",", ":")),
+                    ttl=settings.INTRADAY_COMPACT_TTL,
+                )
+                compacted += 1
+            redis_client.delete(key)
+
+        logger.info(f"[日内估值] {day.isoformat()} 压缩完成: {compacted} 只基金")
+        return compacted
+
+    def get_series(self, fund_code: str, day: Optional[date] = None) -> dict:
+        """
+        读取日内估值曲线（只读 Redis）
+
+        Args:
+            fund_code: 基金代码
+            day: 日期（默认今天）
+
+        Returns:
+            {"date", "compacted", "points": [{"time", "estimated_nav", "increase_rate"}]}
+        """
+        day = day or date.today()
+        compacted = False
+
+        cached = redis_client.get(self._compact_key(day, fund_code))
+        series = None
+        if cached:
+            try:
+                series = json.loads(cached)
+                compacted = True
+            except json.JSONDecodeError:
+                logger.warning(f"[日内估值] 压缩数据格式错误: {fund_code} {day}")
+
+        if series is None:
+            series = self._read_stream(self._stream_key(day, fund_code))
+
+        points: List[dict] = [
+            {
+                "time": datetime.fromtimestamp(t),
+                "estimated_nav": nav,
+                "increase_rate": rate,
+            }
+            for t, nav, rate in zip(series["t"], series["nav"], series["rate"])
+        ]
+        return {"date": day, "compacted": compacted, "points": points}
+
+
+# 全局单例实例
+intraday_recorder = IntradayRecorder()
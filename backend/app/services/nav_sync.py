@@ -0,0 +1,268 @@
+"""
+净值历史增量同步
+
+每只基金在 fund_sync_state 表中记录水位线（已完整同步的最新净值日期）和失败退避状态：
+- 水位线已达到预期净值日期（最近一个已发布净值的交易日）的基金直接跳过，不调用接口
+- 处于退避期（next_eligible_at 未到）的基金跳过
+- 其余基金只请求水位线之后的增量：pz = 水位线到预期日期之间的交易日数 + NAV_SYNC_PAGE_MARGIN；
+  没有同步状态的基金以 nav_history 中已有的最新净值日期作为初始水位线（上线前已同步过的基金不再重新下载），
+  没有任何净值记录的基金首次同步时下载全部历史作为基线
+- 接口失败时连续失败次数 +1，按指数退避推迟下次同步；
+  尚未发布新净值时不计为失败，NAV_SYNC_RECHECK_MINUTES 后再检查
+
+接口请求并发执行（FUND_NAV_FETCH_CONCURRENCY，每个任务在调用方上下文的副本中运行，遵守请求截止时间），
+数据库写入按基金顺序执行，每只基金单独提交。
+交易日只排除周末（与 FundDataFetcher.is_trading_day 一致），节假日会让预期日期偏早，
+对应基金按"尚未发布"处理。
+
+每日任务（run_nightly_sync）在 NAV_SYNC_WINDOW_START_HOUR ~ NAV_SYNC_WINDOW_END_HOUR 之间每小时执行一次，
+直到所有持仓基金都有预期日期的净值，进度记录在 sync_job_runs 表中。
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import crud, models, schemas
+from ..config import settings
+from .fund_fetcher import FundDataFetcher
+
+logger = logging.getLogger(__name__)
+
+
+def expected_nav_date(now: Optional[datetime] = None) -> date:
+    """最近一个应已发布净值的交易日（当天 NAV_PUBLISH_HOUR 之前取上一个交易日）"""
+    now = now or datetime.now()
+    day = now.date() if now.hour >= settings.NAV_PUBLISH_HOUR else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def trading_days_between(start: date, end: date) -> int:
+    """(start, end] 区间内的交易日数（只排除周末）"""
+    if end <= start:
+        return 0
+    weeks, rest = divmod((end - start).days, 7)
+    return weeks * 5 + sum(1 for i in range(1, rest + 1) if (start + timedelta(days=i)).weekday() < 5)
+
+
+def delta_page_size(watermark: Optional[date], expected: date) -> Optional[int]:
+    """增量请求条数；没有水位线时返回 None（下载全部历史）"""
+    if watermark is None:
+        return None
+    return trading_days_between(watermark, expected) + settings.NAV_SYNC_PAGE_MARGIN
+
+
+def backoff_delay(failures: int) -> timedelta:
+    """连续失败 failures 次后的退避时间：NAV_SYNC_BACKOFF_BASE_MINUTES × 2^(failures-1)，不超过上限"""
+    minutes = settings.NAV_SYNC_BACKOFF_BASE_MINUTES * 2 ** max(0, failures - 1)
+    return min(timedelta(minutes=minutes), timedelta(hours=settings.NAV_SYNC_BACKOFF_MAX_HOURS))
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """数据库返回的时间统一为 UTC aware（SQLite 不保存时区）"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def fetch_nav_delta(fund_code: str, watermark: Optional[date], pz: Optional[int]) -> List[dict]:
+    """
+    获取水位线之后的净值记录
+
+    返回的 pz 条记录都比水位线新时，说明缺口比估计的大（例如水位线之后数据被修订），
+    改为下载全部历史，保证水位线之前没有遗漏
+
+    Raises:
+        APICallError: 当所有重试都失败时
+    """
+    rows = FundDataFetcher.fetch_nav_history(fund_code, pz=pz)
+    if watermark is None:
+        return rows
+    if pz is not None and len(rows) >= pz and min(row["date"] for row in rows) > watermark:
+        logger.info(f"[净值同步] {fund_code} 增量超过 {pz} 条，下载全部历史")
+        rows = FundDataFetcher.fetch_nav_history(fund_code)
+    return [row for row in rows if row["date"] > watermark]
+
+
+def _fetch(request: Tuple[str, Optional[date], Optional[int]]):
+    """线程池任务：只接收普通值，不在工作线程中访问 ORM 对象"""
+    try:
+        return fetch_nav_delta(*request), None
+    except Exception as e:
+        return None, getattr(e, "message", None) or str(e)
+
+
+def sync_nav_history(
+    db: Session,
+    fund_ids: Optional[List[int]] = None,
+    force: bool = False,
+    now: Optional[datetime] = None
+) -> schemas.NavHistorySyncResponse:
+    """
+    增量同步净值历史，并为写入了新净值且有持仓的基金计算当日收益
+
+    Args:
+        fund_ids: 只同步这些基金（默认全部基金）
+        force: 忽略"已是最新"和退避状态，全部请求一次
+        now: 当前本地时间（默认 datetime.now()，用于确定预期净值日期）
+    """
+    now = now or datetime.now()
+    now_utc = datetime.now(timezone.utc)
+    expected = expected_nav_date(now)
+
+    query = db.query(models.Fund)
+    if fund_ids is not None:
+        query = query.filter(models.Fund.id.in_(fund_ids))
+    funds = query.order_by(models.Fund.id).all()
+    states = crud.get_fund_sync_states(db, [fund.id for fund in funds])
+    seed_dates = crud.get_latest_nav_dates(db, [fund.id for fund in funds if fund.id not in states])
+
+    plan = []
+    skipped = backed_off = pending = 0
+    for fund in funds:
+        state = states.get(fund.id)
+        if state is None:
+            state = models.FundSyncState(
+                fund_id=fund.id, last_nav_date=seed_dates.get(fund.id), consecutive_failures=0
+            )
+            db.add(state)
+        if not force and state.last_nav_date and state.last_nav_date >= expected:
+            skipped += 1
+            continue
+        if not force and state.next_eligible_at and _as_utc(state.next_eligible_at) > now_utc:
+            # 失败退避中，或尚未发布新净值、等待下次检查
+            if state.consecutive_failures:
+                backed_off += 1
+            else:
+                pending += 1
+            continue
+        plan.append((fund, state, delta_page_size(state.last_nav_date, expected)))
+
+    logger.info(
+        f"[净值同步] 预期净值日期 {expected}：{len(funds)} 只基金，需同步 {len(plan)}，"
+        f"已是最新 {skipped}，退避中 {backed_off}，等待发布 {pending}"
+    )
+
+    requests = [(fund.fund_code, state.last_nav_date, pz) for fund, state, pz in plan]
+    results = []
+    if requests:
+        workers = max(1, min(settings.FUND_NAV_FETCH_CONCURRENCY, len(requests)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nav-sync") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _fetch, request) for request in requests]
+            results = [future.result() for future in futures]
+
+    updated_ids = []
+    rows_written = 0
+    errors = []
+    for (fund, state, _), (fund_code, _, _), (rows, error) in zip(plan, requests, results):
+        state.last_attempt_at = now_utc
+        if error is not None:
+            state.consecutive_failures = (state.consecutive_failures or 0) + 1
+            state.next_eligible_at = now_utc + backoff_delay(state.consecutive_failures)
+            state.last_error = error[:500]
+            errors.append(f"基金 {fund_code}: {error}")
+            logger.warning(
+                f"[净值同步] {fund_code} 失败（连续 {state.consecutive_failures} 次），"
+                f"{state.next_eligible_at:%Y-%m-%d %H:%M} 后重试: {error}"
+            )
+            db.commit()
+            continue
+
+        state.consecutive_failures = 0
+        state.last_error = None
+        if rows:
+            rows_written += crud.upsert_nav_history_rows(db, fund.id, rows)
+            state.last_nav_date = max(row["date"] for row in rows)
+            state.last_success_at = now_utc
+            updated_ids.append(fund.id)
+
+        if state.last_nav_date and state.last_nav_date >= expected:
+            state.next_eligible_at = None
+        else:
+            # 尚未发布预期日期的净值：稍后再检查，不计为失败
+            pending += 1
+            state.next_eligible_at = now_utc + timedelta(minutes=settings.NAV_SYNC_RECHECK_MINUTES)
+        db.commit()
+
+    # 写入了新净值的持仓基金重新计算当日收益
+    for fund_id in updated_ids:
+        holding = crud.get_holding(db, fund_id)
+        if holding and holding.shares > 0:
+            crud.calculate_daily_pnl(db, fund_id, holding)
+
+    logger.info(
+        f"[净值同步] 完成：更新 {len(updated_ids)} 只基金，写入 {rows_written} 条净值，"
+        f"待发布 {pending}，失败 {len(errors)}"
+    )
+    return schemas.NavHistorySyncResponse(
+        success=not errors,
+        message=f"同步 {len(updated_ids)} 只基金，写入 {rows_written} 条净值",
+        funds_updated=len(updated_ids),
+        errors=errors,
+        total=len(funds),
+        skipped=skipped,
+        backed_off=backed_off,
+        pending=pending,
+        rows_written=rows_written,
+    )
+
+
+# ========== 每日同步任务（断点续跑） ==========
+
+NIGHTLY_JOB = "daily_nav_update"
+
+
+def run_nightly_sync(
+    db: Session,
+    now: Optional[datetime] = None
+) -> Tuple[models.SyncJobRun, Optional[schemas.NavHistorySyncResponse]]:
+    """
+    执行一次每日净值同步（重试窗口内每次轮询调用）
+
+    每只基金的完成情况以 fund_sync_state 水位线为检查点（逐只提交），
+    再次执行或进程重启后只会请求未完成和失败的基金；
+    运行记录 sync_job_runs 汇总该预期净值日期的进度，所有持仓基金都同步到预期日期后标记为 completed，
+    之后的轮询直接返回。
+
+    Returns:
+        (运行记录, 同步结果)；运行记录已完成、本次未执行同步时结果为 None
+    """
+    now = now or datetime.now()
+    now_utc = datetime.now(timezone.utc)
+    expected = expected_nav_date(now)
+
+    run = crud.get_or_create_sync_job_run(db, NIGHTLY_JOB, expected)
+    if run.status == "completed":
+        db.commit()
+        return run, None
+
+    run.attempts = (run.attempts or 0) + 1
+    run.last_attempt_at = now_utc
+    run.status = "running"
+    db.commit()
+
+    result = sync_nav_history(db, now=now)
+
+    held_ids = [fund_id for (fund_id,) in db.query(models.Holding.fund_id).filter(models.Holding.shares > 0)]
+    states = crud.get_fund_sync_states(db, held_ids)
+    done = [fund_id for fund_id, state in states.items() if state.last_nav_date and state.last_nav_date >= expected]
+    run.funds_total = len(held_ids)
+    run.funds_done = len(done)
+    run.funds_failed = sum(1 for fund_id, state in states.items() if fund_id not in done and state.consecutive_failures)
+    if run.funds_done >= run.funds_total:
+        run.status = "completed"
+        run.finished_at = now_utc
+    else:
+        run.status = "partial"
+    db.commit()
+
+    logger.info(
+        f"[净值同步] 每日任务 {expected} 第 {run.attempts} 次执行：持仓基金完成 {run.funds_done}/{run.funds_total}，"
+        f"失败 {run.funds_failed}，状态 {run.status}"
+    )
+    return run, result
@@ -0,0 +1,231 @@
+"""
+基金 ↔ 股票持仓反向索引
+
+从 fund_stock_positions（各基金最新报告期）构建内存中的二部图：
+
+    股票 -> {基金代码: 权重}
+    基金 -> {股票代码: 权重}
+
+并为每只基金维护加权涨跌幅 Σ 权重 × 股票涨跌幅。行情更新时（apply_quotes）
+只对涨跌幅发生变化的股票，按差值调整持有这些股票的基金，
+工作量与行情变化数 × 持有基金数成正比，而不是与基金总数成正比。
+
+持仓同步提交后，缓存失效总线的 "positions" 事件把对应基金标记为过期，
+下次读取时只重新加载这些基金（通配失效或首次使用时全量构建）；
+重新加载时按已记录的股票涨跌幅重新计算该基金的加权和，同时消除累积的浮点误差。
+
+重新加载串行执行，并发读取等待正在进行的加载完成，不会读到尚未构建的索引；
+加载期间到达的失效不会被这次加载清除，下次读取时再加载一次。
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .. import crud
+from ..database import SessionLocal
+from ..utils.cache_invalidation import invalidation_bus
+from .tushare_service import tushare_service
+
+logger = logging.getLogger(__name__)
+
+
+class PositionIndex:
+    """持仓反向索引和增量维护的基金估算涨跌幅"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 串行化重新加载（数据库查询期间不持有 _lock，行情更新不被阻塞）
+        self._build_lock = threading.Lock()
+        self._fund_stocks: Dict[str, Dict[str, float]] = {}
+        self._stock_funds: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # 股票最新涨跌幅（%），与索引是否构建无关，构建时用于计算基金加权和
+        self._changes: Dict[str, float] = {}
+        # 基金加权涨跌幅（小数，Σ 权重 × 涨跌幅 / 100）和有行情的持仓股票数
+        self._fund_change: Dict[str, float] = {}
+        self._fund_quoted: Dict[str, int] = {}
+        self._stale_all = True
+        self._stale_funds: Set[str] = set()
+        # 每次失效加一：加载完成时据此判断查询期间是否有新的失效
+        self._generation = 0
+        self.quotes_updated_at: Optional[datetime] = None
+
+    # ========== 构建 / 失效 ==========
+
+    def invalidate(self, fund_codes: Optional[Set[str]] = None) -> None:
+        """标记基金持仓已变化（None 表示全部），下次读取时重新加载"""
+        with self._lock:
+            if fund_codes is None:
+                self._stale_all = True
+            else:
+                self._stale_funds.update(fund_codes)
+            self._generation += 1
+
+    def ensure_fresh(self) -> None:
+        """重新加载过期的基金持仓（需要访问数据库）"""
+        with self._build_lock:
+            # 过期标记在加载完成后才清除：等待期间其他线程已完成的加载在这里直接返回
+            with self._lock:
+                if not self._stale_all and not self._stale_funds:
+                    return
+                fund_codes = None if self._stale_all else sorted(self._stale_funds)
+                generation = self._generation
+
+            db = SessionLocal()
+            try:
+                rows = crud.get_latest_stock_weights(db, fund_codes)
+            finally:
+                db.close()
+            self.load(rows, fund_codes, generation)
+
+    def load(
+        self,
+        rows: Iterable[Tuple[str, str, float]],
+        fund_codes: Optional[Iterable[str]] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        用 (基金代码, 股票代码, 权重) 替换索引中的基金持仓
+
+        Args:
+            rows: 持仓权重（权重为小数，如 0.0482）
+            fund_codes: 被替换的基金（None 表示重建整个索引）；其中没有出现在 rows 中的基金会被移除
+            generation: 读取 rows 之前的失效计数；之后又有失效时保留过期标记（None 表示不检查）
+        """
+        positions: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for fund_code, stock_code, weight in rows:
+            positions[fund_code][stock_code] = weight
+
+        with self._lock:
+            if fund_codes is None:
+                self._fund_stocks.clear()
+                self._stock_funds.clear()
+                self._fund_change.clear()
+                self._fund_quoted.clear()
+                targets = list(positions)
+            else:
+                targets = list(dict.fromkeys([*fund_codes, *positions]))
+                for fund_code in targets:
+                    self._remove_fund(fund_code)
+
+            for fund_code in targets:
+                stocks = positions.get(fund_code)
+                if stocks:
+                    self._add_fund(fund_code, stocks)
+
+            # 只清除这次实际加载的部分；读取 rows 期间到达的失效留给下次加载
+            if generation is None or generation == self._generation:
+                if fund_codes is None:
+                    self._stale_all = False
+                    self._stale_funds.clear()
+                else:
+                    self._stale_funds.difference_update(targets)
+
+        logger.info(
+            f"[持仓索引] {'全量构建' if fund_codes is None else f'重新加载 {len(targets)} 只基金'}："
+            f"{len(self._fund_stocks)} 只基金，{len(self._stock_funds)} 只股票"
+        )
+
+    def _remove_fund(self, fund_code: str):
+        for stock_code in self._fund_stocks.pop(fund_code, {}):
+            holders = self._stock_funds.get(stock_code)
+            if holders is not None:
+                holders.pop(fund_code, None)
+                if not holders:
+                    del self._stock_funds[stock_code]
+        self._fund_change.pop(fund_code, None)
+        self._fund_quoted.pop(fund_code, None)
+
+    def _add_fund(self, fund_code: str, stocks: Dict[str, float]):
+        self._fund_stocks[fund_code] = stocks
+        change = 0.0
+        quoted = 0
+        for stock_code, weight in stocks.items():
+            self._stock_funds[stock_code][fund_code] = weight
+            change_pct = self._changes.get(stock_code)
+            if change_pct is not None:
+                change += weight * change_pct / 100
+                quoted += 1
+        self._fund_change[fund_code] = change
+        self._fund_quoted[fund_code] = quoted
+
+    # ========== 行情增量更新 ==========
+
+    def apply_quotes(self, quotes: Mapping[str, dict]) -> Set[str]:
+        """
+        应用股票行情（get_stock_realtime 的返回格式），按涨跌幅差值调整持有这些股票的基金
+
+        Returns:
+            Set[str]: 估算涨跌幅发生变化的基金代码
+        """
+        affected: Set[str] = set()
+        with self._lock:
+            for stock_code, quote in quotes.items():
+                change_pct = quote.get("change_pct") if quote else None
+                if change_pct is None:
+                    continue
+                change_pct = float(change_pct)
+                previous = self._changes.get(stock_code)
+                if previous == change_pct:
+                    continue
+                self._changes[stock_code] = change_pct
+
+                delta = change_pct - (previous or 0.0)
+                for fund_code, weight in self._stock_funds.get(stock_code, {}).items():
+                    self._fund_change[fund_code] += weight * delta / 100
+                    if previous is None:
+                        self._fund_quoted[fund_code] += 1
+                    affected.add(fund_code)
+            self.quotes_updated_at = datetime.now()
+        return affected
+
+    def refresh_quotes(self) -> Set[str]:
+        """获取索引中所有持仓股票的行情（走实时行情缓存）并应用，返回估算发生变化的基金"""
+        stock_codes = self.stock_codes()
+        if not stock_codes:
+            return set()
+        return self.apply_quotes(tushare_service.get_stock_realtime(stock_codes))
+
+    # ========== 查询 ==========
+
+    def stock_codes(self) -> List[str]:
+        """索引中所有持仓股票（构建过期部分后返回）"""
+        self.ensure_fresh()
+        with self._lock:
+            return sorted(self._stock_funds)
+
+    def funds_holding(self, stock_code: str) -> Dict[str, float]:
+        """持有某只股票的基金及权重"""
+        self.ensure_fresh()
+        with self._lock:
+            return dict(self._stock_funds.get(stock_code, {}))
+
+    def stocks_of(self, fund_code: str) -> Dict[str, float]:
+        """基金的持仓股票及权重"""
+        self.ensure_fresh()
+        with self._lock:
+            return dict(self._fund_stocks.get(fund_code, {}))
+
+    def estimates(self, fund_codes: Optional[Iterable[str]] = None) -> Dict[str, Tuple[float, int]]:
+        """
+        基金估算涨跌幅
+
+        Returns:
+            基金代码 -> (加权涨跌幅 %, 有行情的持仓股票数)；没有持仓的基金不包含在内
+        """
+        self.ensure_fresh()
+        with self._lock:
+            codes = self._fund_stocks.keys() if fund_codes is None else fund_codes
+            return {
+                code: (self._fund_change[code] * 100, self._fund_quoted[code])
+                for code in codes
+                if code in self._fund_stocks
+            }
+
+
+# 全局单例
+position_index = PositionIndex()
+
+# 持仓写入提交后标记对应基金过期（包括其他工作进程的写入）
+invalidation_bus.subscribe("positions", position_index.invalidate)
@@ -0,0 +1,328 @@
+"""
+共享内存行情看板
+
+行情采集进程（python -m app.services.quote_feed，QUOTE_BOARD_ENABLED=true）每个周期请求一次全市场行情
+（沪深京 A 股、ETF、LOF），写入固定布局的内存映射文件；同一台机器上的所有 uvicorn 工作进程
+映射同一个文件，按代码直接读取，不再各自请求和缓存行情 DataFrame。
+
+文件布局（小端）：
+
+    头部 64 字节: magic "QBRD" | 版本 u32 | 序号 u64 | 代码版本 u64 | 代码数 u32 | 容量 u32 | 更新时间 f64
+    代码区:      容量 × 8 字节（不带交易所后缀的代码，如 b"000001"）
+    数值区:      price / change_pct / volume / amount 各为 容量 × f64（缺失为 NaN）
+
+并发控制使用 seqlock：写入前序号 +1（奇数表示写入中），写完再 +1；
+读取方在前后两次读到相同的偶数序号时才采用读到的值，否则重试。
+代码一旦分配槽位就不再移动，新代码追加在末尾并增加代码版本，读取方据此重建代码索引。
+写入方持有文件锁（fcntl.flock），同一个看板只会有一个采集进程。
+采集进程重启会原子替换文件；读取方在锁内换用新映射，旧映射不主动关闭，
+仍在读取旧映射的线程读完后由垃圾回收释放。numpy 在首次映射时才导入。
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from ..config import settings
+from ..utils.swr_cache import record_data_age
+from .quote_feed import NUMERIC_FIELDS, QUOTE_COLUMNS, bare_code
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"QBRD"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIQQIId")
+_HEADER_SIZE = 64
+_CODE_SIZE = 8
+_FIELDS = NUMERIC_FIELDS
+
+# 头部字段偏移
+_SEQ_OFFSET = 8
+_READ_RETRIES = 100
+
+
+def _default_path() -> str:
+    """默认放在 /dev/shm（内存文件系统），不存在时使用系统临时目录"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "fund_tracker_quote_board")
+
+
+def _layout_size(capacity: int) -> int:
+    return _HEADER_SIZE + capacity * _CODE_SIZE + len(_FIELDS) * capacity * 8
+
+
+class _Segment:
+    """
+    映射后的看板文件和其上的 numpy 视图（不复制数据）
+
+    mmap 持有自己的文件描述符，映射后即关闭文件对象。读取方的代码索引随映射保存，
+    换用新映射时不会与旧映射的槽位混用。
+    """
+
+    def __init__(self, fileobj, capacity: int, writable: bool):
+        import numpy as np
+
+        self.capacity = capacity
+        self.inode = os.fstat(fileobj.fileno()).st_ino
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.mm = mmap.mmap(fileobj.fileno(), _layout_size(capacity), access=access)
+        fileobj.close()
+        self.seq = np.frombuffer(self.mm, dtype="<u8", count=1, offset=_SEQ_OFFSET)
+        self.codes = np.frombuffer(self.mm, dtype=f"S{_CODE_SIZE}", count=capacity, offset=_HEADER_SIZE)
+        offset = _HEADER_SIZE + capacity * _CODE_SIZE
+        self.arrays: Dict[str, Any] = {}
+        for field in _FIELDS:
+            self.arrays[field] = np.frombuffer(self.mm, dtype="<f8", count=capacity, offset=offset)
+            offset += capacity * 8
+        # 读取方：代码 -> 槽位索引及其对应的代码版本
+        self.index: Dict[str, int] = {}
+        self.codes_gen = -1
+
+    def header(self):
+        return _HEADER.unpack_from(self.mm, 0)
+
+    def rebuild_index(self, count: int, codes_gen: int):
+        self.index = {code.decode(): slot for slot, code in enumerate(self.codes[:count].tolist())}
+        self.codes_gen = codes_gen
+
+    def close(self):
+        """关闭映射（只用于写入方；读取方的旧映射可能仍被其他线程使用，交给垃圾回收释放）"""
+        # numpy 视图引用着 mmap，先释放视图再关闭
+        self.seq = self.codes = None
+        self.arrays = {}
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+
+
+class QuoteBoardWriter:
+    """看板写入方（只在行情采集进程中使用，作为 quote_feed 的写入目标）"""
+
+    name = "quote_board"
+
+    def __init__(self, path: Optional[str] = None, capacity: Optional[int] = None):
+        self.path = path or settings.QUOTE_BOARD_PATH or _default_path()
+        self.capacity = capacity or settings.QUOTE_BOARD_CAPACITY
+        self._slots: Dict[str, int] = {}
+        self._codes_gen = 0
+        self._lock_file = None
+        self._segment: Optional[_Segment] = None
+
+    def open(self) -> None:
+        """获取写入锁并创建看板文件（已有其他采集进程时抛出 RuntimeError）"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise RuntimeError(f"行情看板 {self.path} 已有采集进程在写入")
+
+        # 每次启动写入新文件再原子替换，读取方发现文件变化后重新映射
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.truncate(_layout_size(self.capacity))
+        os.replace(tmp_path, self.path)
+        import numpy as np
+
+        self._segment = _Segment(open(self.path, "r+b"), self.capacity, writable=True)
+        self._segment.codes[:] = b""
+        for array in self._segment.arrays.values():
+            array[:] = np.nan
+        self._write_header(seq=0, count=0, updated_at=0.0)
+        logger.info(f"[行情看板] 已创建 {self.path}（容量 {self.capacity}，{_layout_size(self.capacity) / 1024:.0f} KB）")
+
+    def close(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _write_header(self, seq: int, count: int, updated_at: float):
+        _HEADER.pack_into(
+            self._segment.mm, 0, _MAGIC, _VERSION, seq, self._codes_gen, count, self.capacity, updated_at
+        )
+
+    def publish(self, codes: Sequence[str], values: Dict[str, Sequence[float]]) -> int:
+        """
+        写入一批行情
+
+        Args:
+            codes: 代码（可带交易所后缀）
+            values: 字段 -> 与 codes 对齐的数值（字段见 _FIELDS，缺少的字段写入 NaN）
+
+        Returns:
+            int: 写入的代码数（超出容量的新代码被丢弃）
+        """
+        import numpy as np
+
+        segment = self._segment
+        slots = []
+        rows = []
+        for row, code in enumerate(codes):
+            code = bare_code(str(code))
+            slot = self._slots.get(code)
+            if slot is None:
+                if len(self._slots) >= self.capacity:
+                    continue
+                slot = len(self._slots)
+                self._slots[code] = slot
+                segment.codes[slot] = code.encode()[:_CODE_SIZE]
+                self._codes_gen += 1
+            slots.append(slot)
+            rows.append(row)
+        if len(rows) < len(codes):
+            logger.warning(f"[行情看板] 容量 {self.capacity} 已满，丢弃 {len(codes) - len(rows)} 个新代码")
+
+        slots = np.asarray(slots, dtype=np.intp)
+        rows = np.asarray(rows, dtype=np.intp)
+        seq = int(segment.seq[0])
+        segment.seq[0] = seq + 1  # 奇数：写入中
+        for field in _FIELDS:
+            column = values.get(field)
+            if column is None:
+                segment.arrays[field][slots] = np.nan
+            else:
+                segment.arrays[field][slots] = np.asarray(column, dtype=np.float64)[rows]
+        self._write_header(seq=seq + 2, count=len(self._slots), updated_at=time.time())
+        return len(slots)
+
+    def publish_frame(self, df) -> int:
+        """写入 efinance get_realtime_quotes 返回的 DataFrame"""
+        import numpy as np
+        import pandas as pd
+
+        values = {
+            field: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+            for column, field in QUOTE_COLUMNS.items()
+            if field in _FIELDS and column in df.columns
+        }
+        return self.publish(df["股票代码"].astype(str).tolist(), values)
+
+    def publish_quotes(self, quotes: Dict[str, dict]) -> int:
+        """写入标准化行情（quote_feed 采集结果，缺失值写入 NaN）"""
+        codes = list(quotes)
+        values = {
+            field: [float("nan") if quotes[code].get(field) is None else quotes[code][field] for code in codes]
+            for field in _FIELDS
+        }
+        return self.publish(codes, values)
+
+
+class QuoteBoard:
+    """看板读取方（API 工作进程共享同一个映射文件，按需读取单个代码的数值）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.QUOTE_BOARD_PATH or _default_path()
+        self._segment: Optional[_Segment] = None
+        self._lock = threading.Lock()
+
+    def _ensure_segment(self) -> Optional[_Segment]:
+        """映射看板文件；文件被采集进程重新创建后在锁内换用新映射（旧映射不关闭）"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+        segment = self._segment
+        if segment is not None and segment.inode == inode:
+            return segment
+
+        with self._lock:
+            segment = self._segment
+            if segment is not None and segment.inode == inode:
+                return segment
+            self._segment = self._map()
+            return self._segment
+
+    def _map(self) -> Optional[_Segment]:
+        try:
+            fileobj = open(self.path, "rb")
+        except OSError as e:
+            logger.warning(f"[行情看板] 打开 {self.path} 失败: {e}")
+            return None
+        try:
+            magic, version, _, _, _, capacity, _ = _HEADER.unpack(fileobj.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                fileobj.close()
+                return None
+            return _Segment(fileobj, capacity, writable=False)
+        except (OSError, ValueError, struct.error) as e:
+            fileobj.close()
+            logger.warning(f"[行情看板] 映射 {self.path} 失败: {e}")
+            return None
+
+    def age(self) -> Optional[float]:
+        """看板数据年龄（秒），看板不存在时返回 None"""
+        segment = self._ensure_segment()
+        if segment is None:
+            return None
+        updated_at = segment.header()[6]
+        return max(0.0, time.time() - updated_at) if updated_at else None
+
+    def read(self, codes: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """
+        读取行情
+
+        Args:
+            codes: 代码（可带交易所后缀，返回的键与传入一致）
+            max_age: 看板数据超过该年龄（秒）时视为不可用，返回空字典
+
+        Returns:
+            代码 -> {"code", "price", "change_pct", "volume", "amount", "update_time", "data_source"}；
+            看板中没有的代码不包含在内
+        """
+        segment = self._ensure_segment()
+        codes = list(codes)
+        if segment is None or not codes:
+            return {}
+
+        import numpy as np
+
+        for _ in range(_READ_RETRIES):
+            seq_before = int(segment.seq[0])
+            if seq_before % 2:
+                time.sleep(0)
+                continue
+            _, _, _, codes_gen, count, _, updated_at = segment.header()
+            if not updated_at or (max_age is not None and time.time() - updated_at > max_age):
+                return {}
+            if codes_gen != segment.codes_gen:
+                segment.rebuild_index(count, codes_gen)
+
+            index = segment.index
+            found = [(code, index.get(bare_code(code))) for code in codes]
+            found = [(code, slot) for code, slot in found if slot is not None]
+            slots = np.fromiter((slot for _, slot in found), dtype=np.intp, count=len(found))
+            columns = {field: segment.arrays[field][slots] for field in _FIELDS}  # 只复制请求的代码
+            if int(segment.seq[0]) == seq_before:
+                break
+        else:
+            logger.warning("[行情看板] 读取时看板持续在写入，放弃本次读取")
+            return {}
+
+        record_data_age(max(0.0, time.time() - updated_at))
+        update_time = datetime.fromtimestamp(updated_at)
+        result = {}
+        for i, (code, _) in enumerate(found):
+            quote = {field: (None if np.isnan(columns[field][i]) else float(columns[field][i])) for field in _FIELDS}
+            if quote["price"] is None and quote["change_pct"] is None:
+                continue
+            if quote["volume"] is not None:
+                quote["volume"] = int(quote["volume"])
+            result[code] = {"code": code, **quote, "update_time": update_time, "data_source": "quote_board"}
+        return result
+
+
+# 全局单例（API 工作进程使用）
+quote_board = QuoteBoard()
+
@@ -0,0 +1,234 @@
+"""
+行情采集（单一采集进程，多个写入目标）
+
+每台机器只运行一个采集进程（python -m app.services.quote_feed），按交易时间定时轮询一次行情源，
+把同一份标准化行情写入所有启用的目标，API 请求处理不再直接依赖上游行情接口的延迟：
+
+    共享内存看板   QUOTE_BOARD_ENABLED=true 时写入（见 quote_board，本机工作进程按代码直接读取）
+    Redis         QUOTE_SOURCE=stream 时写入最新行情哈希和变化 Stream（见 quote_stream，多台机器共享）
+
+行情源可替换：EfinanceQuoteProducer 请求 efinance 全市场行情，FakeQuoteProducer 对固定代码做随机游走，
+不访问网络，用于离线运行整个采集 → 看板 / Redis → API 链路（--fake）。
+
+标准化行情：不带交易所后缀的代码 -> {"name", "price", "change_pct", "volume", "amount"}（缺失为 None）。
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Protocol
+
+from ..config import settings
+from ..utils.encoding import clean_stock_name
+
+logger = logging.getLogger(__name__)
+
+# 行情 DataFrame 列 -> 标准化字段
+QUOTE_COLUMNS = {"股票名称": "name", "最新价": "price", "涨跌幅": "change_pct", "成交量": "volume", "成交额": "amount"}
+NUMERIC_FIELDS = ("price", "change_pct", "volume", "amount")
+
+QuoteProducer = Callable[[], Dict[str, dict]]
+
+
+class QuoteSink(Protocol):
+    """采集结果的写入目标"""
+
+    name: str
+
+    def publish_quotes(self, quotes: Dict[str, dict]) -> int:
+        """写入一次采集的全部行情，返回实际写入（或发生变化）的代码数"""
+
+
+def bare_code(code: str) -> str:
+    """去掉交易所后缀（000001.SZ -> 000001）"""
+    return code.split(".")[0]
+
+
+def parse_markets(markets: str) -> List[Optional[str]]:
+    """逗号分隔的市场类型，A股 表示 efinance 默认的沪深京 A 股"""
+    return [None if m.strip() == "A股" else m.strip() for m in markets.split(",") if m.strip()]
+
+
+def normalize_frame(df) -> Dict[str, dict]:
+    """efinance get_realtime_quotes 返回的 DataFrame -> 代码 -> 标准化行情"""
+    import pandas as pd
+
+    frame = df[[column for column in ["股票代码", *QUOTE_COLUMNS] if column in df.columns]].rename(columns=QUOTE_COLUMNS)
+    for field in NUMERIC_FIELDS:
+        if field in frame.columns:
+            frame[field] = pd.to_numeric(frame[field], errors="coerce")
+
+    quotes = {}
+    for row in frame.to_dict("records"):
+        quote = {
+            "name": clean_stock_name(str(row.get("name") or "")),
+            **{field: (None if pd.isna(row.get(field)) else float(row[field])) for field in NUMERIC_FIELDS},
+        }
+        if quote["price"] is None and quote["change_pct"] is None:
+            continue
+        if quote["volume"] is not None:
+            quote["volume"] = int(quote["volume"])
+        quotes[str(row["股票代码"])] = quote
+    return quotes
+
+
+class EfinanceQuoteProducer:
+    """efinance 全市场行情（沪深京 A 股、ETF、LOF），单个市场失败时跳过"""
+
+    def __init__(self, markets: List[Optional[str]]):
+        self.markets = markets
+
+    def __call__(self) -> Dict[str, dict]:
+        from .efinance_client import efinance_client
+
+        quotes: Dict[str, dict] = {}
+        for market in self.markets:
+            try:
+                df = efinance_client.get_realtime_quotes(market)
+            except Exception as e:
+                logger.error(f"[行情采集] 获取 {market or 'A股'} 行情失败: {e}")
+                continue
+            if df is not None and not df.empty:
+                quotes.update(normalize_frame(df))
+        return quotes
+
+
+class FakeQuoteProducer:
+    """离线行情：对固定代码做随机游走（每次只有部分代码变化），不访问网络"""
+
+    def __init__(self, codes: Iterable[str], seed: int = 0, change_ratio: float = 0.3):
+        self._random = random.Random(seed)
+        self.change_ratio = change_ratio
+        self._quotes: Dict[str, dict] = {}
+        self._prev_close: Dict[str, float] = {}
+        for code in dict.fromkeys(bare_code(code) for code in codes):
+            price = round(self._random.uniform(2, 200), 2)
+            self._prev_close[code] = price
+            self._quotes[code] = {
+                "name": f"模拟{code}", "price": price, "change_pct": 0.0, "volume": 0, "amount": 0.0
+            }
+
+    def __call__(self) -> Dict[str, dict]:
+        codes = list(self._quotes)
+        if not codes:
+            return {}
+        for code in self._random.sample(codes, max(1, int(len(codes) * self.change_ratio))):
+            quote = self._quotes[code]
+            prev_close = self._prev_close[code]
+            price = min(prev_close * 1.1, max(prev_close * 0.9, quote["price"] * (1 + self._random.gauss(0, 0.003))))
+            volume = self._random.randint(100, 100000)
+            self._quotes[code] = {
+                **quote,
+                "price": round(price, 2),
+                "change_pct": round((price / prev_close - 1) * 100, 2),
+                "volume": quote["volume"] + volume,
+                "amount": round(quote["amount"] + volume * price, 2),
+            }
+        return dict(self._quotes)
+
+
+class QuoteIngestion:
+    """采集循环：每个周期调用一次行情源，把结果写入所有目标（单个目标失败不影响其他目标）"""
+
+    def __init__(self, producer: QuoteProducer, sinks: List[QuoteSink]):
+        self.producer = producer
+        self.sinks = sinks
+
+    def poll_once(self) -> Dict[str, int]:
+        """采集一次，返回 目标名称 -> 写入的代码数（行情源没有返回数据时为空字典）"""
+        quotes = self.producer()
+        if not quotes:
+            logger.warning("[行情采集] 行情源没有返回数据")
+            return {}
+        written = {}
+        for sink in self.sinks:
+            try:
+                written[sink.name] = sink.publish_quotes(quotes)
+            except Exception as e:
+                logger.error(f"[行情采集] 写入 {sink.name} 失败: {e}")
+                written[sink.name] = 0
+        return written
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """采集循环：交易时间每 QUOTE_INGEST_INTERVAL_TRADING 秒，其余时间每 QUOTE_INGEST_INTERVAL_NON_TRADING 秒"""
+        from .fund_fetcher import FundDataFetcher
+
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            start = time.monotonic()
+            try:
+                written = self.poll_once()
+                logger.info(f"[行情采集] 已写入 {written}，耗时 {time.monotonic() - start:.2f}s")
+            except Exception as e:
+                logger.error(f"[行情采集] 采集失败: {e}")
+            interval = (
+                settings.QUOTE_INGEST_INTERVAL_TRADING
+                if FundDataFetcher.is_trading_time()
+                else settings.QUOTE_INGEST_INTERVAL_NON_TRADING
+            )
+            stop.wait(max(0.0, interval - (time.monotonic() - start)))
+
+
+def build_sinks() -> List[QuoteSink]:
+    """按配置创建写入目标：QUOTE_BOARD_ENABLED -> 共享内存看板，QUOTE_SOURCE=stream -> Redis"""
+    from .quote_board import QuoteBoardWriter
+    from .quote_stream import RedisQuoteSink
+
+    sinks: List[QuoteSink] = []
+    if settings.QUOTE_BOARD_ENABLED:
+        writer = QuoteBoardWriter()
+        writer.open()
+        sinks.append(writer)
+    if settings.QUOTE_SOURCE == "stream":
+        sinks.append(RedisQuoteSink())
+    return sinks
+
+
+def _held_stock_codes() -> List[str]:
+    """数据库中各基金最新报告期的持仓股票（离线模拟行情使用的默认代码）"""
+    from .. import crud
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return sorted({stock_code for _, stock_code, _ in crud.get_latest_stock_weights(db)})
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情采集进程：把行情写入共享内存看板和 / 或 Redis")
+    parser.add_argument("--markets", default=settings.QUOTE_INGEST_MARKETS,
+                        help="逗号分隔的 efinance 市场类型，A股 表示默认的沪深京 A 股")
+    parser.add_argument("--fake", action="store_true", help="使用离线模拟行情（不访问网络）")
+    parser.add_argument("--fake-codes", default="",
+                        help="模拟行情的代码（逗号分隔，默认使用数据库中的持仓股票）")
+    parser.add_argument("--once", action="store_true", help="只采集一次")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sinks = build_sinks()
+    if not sinks:
+        parser.error("没有启用的写入目标：设置 QUOTE_BOARD_ENABLED=true 和 / 或 QUOTE_SOURCE=stream")
+
+    if args.fake:
+        codes = [code.strip() for code in args.fake_codes.split(",") if code.strip()] or _held_stock_codes()
+        producer: QuoteProducer = FakeQuoteProducer(codes)
+        logger.info(f"[行情采集] 使用模拟行情，{len(codes)} 个代码")
+    else:
+        producer = EfinanceQuoteProducer(parse_markets(args.markets))
+
+    ingestion = QuoteIngestion(producer, sinks)
+    try:
+        if args.once:
+            logger.info(f"[行情采集] 已写入 {ingestion.poll_once()}")
+        else:
+            ingestion.run()
+    finally:
+        for sink in sinks:
+            getattr(sink, "close", lambda: None)()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+实时行情对冲请求（hedged requests）
+
+按优先级排列多个行情源（efinance → Tushare）：
+先请求主数据源，若在对冲延迟内没有返回，再并行请求下一个数据源，
+取最先返回有效数据（非空字典）的结果；某个数据源失败或返回空数据时立即启动下一个。
+
+对冲延迟取主数据源最近成功调用耗时的 p95（限制在 QUOTE_HEDGE_DELAY_MIN/MAX 之间），
+样本不足时使用 QUOTE_HEDGE_DELAY_DEFAULT。每个数据源的每次调用（包括落后被丢弃的）
+都记录到 LatencyTracker 和 quote_source_latency_seconds 指标中，用于调整对冲延迟。
+
+数据源在共享线程池中以调用方上下文的副本执行（copy_context），
+请求截止时间（retry_helper.deadline）、指标和 SQL 分析器等 ContextVar 对每个数据源都可见。
+
+数据源是普通的 callable(stock_codes) -> Dict，可以直接传入本地桩函数测试：
+    hedger = QuoteHedger([("slow", slow_stub), ("fast", fast_stub)], tracker=LatencyTracker())
+    source, quotes = hedger.fetch(["600519.SH"])
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ..config import settings
+from ..utils.metrics import QUOTE_HEDGE_OUTCOMES, QUOTE_SOURCE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+QuoteSource = Callable[[List[str]], Dict]
+
+
+class LatencyTracker:
+    """按数据源保存最近 window 次成功调用的耗时，计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, source: str, seconds: float, ok: bool) -> None:
+        QUOTE_SOURCE_LATENCY.labels(source, "success" if ok else "empty").observe(seconds)
+        if not ok:
+            return
+        with self._lock:
+            self._samples.setdefault(source, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, source: str, pct: float, min_samples: int = 20) -> Optional[float]:
+        """最近成功调用耗时的 pct 分位数，样本少于 min_samples 时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(source, ()))
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def measure(self, source: str, func: QuoteSource, stock_codes: List[str]) -> Dict:
+        """调用数据源并记录耗时（异常视为空结果）"""
+        start = time.perf_counter()
+        result: Dict = {}
+        try:
+            result = func(stock_codes) or {}
+        except Exception as e:
+            logger.error(f"[行情对冲] 数据源 {source} 调用异常: {e}")
+        self.record(source, time.perf_counter() - start, bool(result))
+        return result
+
+
+# 进程内共享的耗时统计（顺序模式和对冲模式都会记录）
+latency_tracker = LatencyTracker()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.QUOTE_HEDGE_MAX_WORKERS, thread_name_prefix="quote-hedge"
+                )
+    return _executor
+
+
+class QuoteHedger:
+    """
+    按优先级对冲请求多个行情源
+
+    Args:
+        sources: [(数据源名称, callable(stock_codes) -> Dict)]，按优先级排列
+        tracker: 耗时统计，默认使用进程内共享的 latency_tracker
+        executor: 执行数据源调用的线程池，默认使用模块级共享线程池
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[Tuple[str, QuoteSource]],
+        tracker: Optional[LatencyTracker] = None,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.sources = list(sources)
+        self.tracker = tracker or latency_tracker
+        self._executor = executor
+
+    def hedge_delay(self, source: str) -> float:
+        """启动下一个数据源前等待的时间：该数据源成功耗时的 p95，限制在配置的上下限之间"""
+        p95 = self.tracker.percentile(source, 95)
+        if p95 is None:
+            return settings.QUOTE_HEDGE_DELAY_DEFAULT
+        return min(settings.QUOTE_HEDGE_DELAY_MAX, max(settings.QUOTE_HEDGE_DELAY_MIN, p95))
+
+    def fetch(self, stock_codes: List[str]) -> Tuple[Optional[str], Dict]:
+        """
+        获取行情，返回 (胜出的数据源名称, 行情字典)
+
+        所有数据源都失败或返回空数据时返回 (None, {})
+        """
+        executor = self._executor or _get_executor()
+        pending: Dict[Future, str] = {}
+        next_index = 0
+
+        def launch_next() -> bool:
+            nonlocal next_index
+            if next_index >= len(self.sources):
+                return False
+            name, func = self.sources[next_index]
+            next_index += 1
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, self.tracker.measure, name, func, stock_codes)] = name
+            return True
+
+        launch_next()
+        while pending:
+            # 还有后备数据源时，最多等待当前最后启动的数据源的对冲延迟
+            timeout = None
+            if next_index < len(self.sources):
+                timeout = self.hedge_delay(self.sources[next_index - 1][0])
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged_after = self.sources[next_index - 1][0]
+                launch_next()
+                logger.info(f"[行情对冲] {hedged_after} 超过 {timeout:.2f}s 未返回，启动 {self.sources[next_index - 1][0]}")
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                result = future.result()
+                if result:
+                    QUOTE_HEDGE_OUTCOMES.labels(name, "hedged" if next_index > 1 else "primary").inc()
+                    return name, result
+            # 完成的数据源都没有有效数据：立即启动下一个
+            if not pending:
+                launch_next()
+
+        QUOTE_HEDGE_OUTCOMES.labels("none", "failed").inc()
+        return None, {}
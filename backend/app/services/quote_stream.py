@@ -0,0 +1,117 @@
+"""
+Redis Streams 行情
+
+行情采集进程（python -m app.services.quote_feed，QUOTE_SOURCE=stream）把标准化后的行情写入 Redis，
+API 请求处理不再直接依赖上游行情接口的延迟：
+
+    stock:quotes:latest   哈希：不带交易所后缀的代码 -> {"name", "price", "change_pct", "volume", "amount"} 的 JSON；
+                          字段 "_updated_at" 为最近一次成功采集的时间戳
+    stock:quotes:stream   Stream：每次采集中发生变化的行情 {"ts", "count", "quotes"}（近似裁剪为环形缓冲区）
+
+QUOTE_SOURCE=stream 时 get_stock_realtime 与场内基金股价只读取最新行情哈希，缓存未命中也不再请求上游；
+哈希超过实时行情缓存 TTL 未更新（采集 worker 停止）时视为没有行情，不把旧价格当作实时行情返回。
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.redis_client import redis_client
+from ..utils.swr_cache import record_data_age
+from .quote_feed import bare_code
+
+logger = logging.getLogger(__name__)
+
+_UPDATED_AT_FIELD = "_updated_at"
+
+
+class RedisQuoteSink:
+    """quote_feed 的写入目标：把采集快照写入最新行情哈希，并把发生变化的行情追加到 Stream"""
+
+    name = "redis"
+
+    def __init__(self):
+        # 已写入 Redis 的行情，用于只发布发生变化的代码
+        self._published: Dict[str, dict] = {}
+
+    def publish_quotes(self, quotes: Dict[str, dict]) -> int:
+        """
+        写入一次采集的行情
+
+        Returns:
+            发生变化的代码数；Redis 写入失败时为 0（不更新 _updated_at）
+        """
+        changed = {code: quote for code, quote in quotes.items() if self._published.get(code) != quote}
+        now = time.time()
+        mapping = {code: json.dumps(quote, ensure_ascii=False) for code, quote in changed.items()}
+        mapping[_UPDATED_AT_FIELD] = repr(now)
+        if not redis_client.hset_many(settings.QUOTE_LATEST_KEY, mapping):
+            return 0
+        if changed:
+            redis_client.xadd(
+                settings.QUOTE_STREAM_KEY,
+                {"ts": repr(now), "count": len(changed), "quotes": json.dumps(changed, ensure_ascii=False)},
+                maxlen=settings.QUOTE_STREAM_MAXLEN
+            )
+        self._published.update(changed)
+        return len(changed)
+
+
+class QuoteStream:
+    """API 侧读取采集 worker 写入的行情（只访问 Redis）"""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.QUOTE_SOURCE == "stream"
+
+    def read(self, codes: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """
+        读取最新行情
+
+        Args:
+            codes: 代码（可带交易所后缀，返回的键与传入一致）
+            max_age: 最新行情哈希超过该年龄（秒）未更新时视为不可用，返回空字典
+
+        Returns:
+            与 get_stock_realtime 相同格式的行情（data_source 为 "quote_stream"）；哈希中没有的代码不包含在内
+        """
+        codes = list(codes)
+        if not codes:
+            return {}
+        values = redis_client.hmget(settings.QUOTE_LATEST_KEY, [*(bare_code(code) for code in codes), _UPDATED_AT_FIELD])
+        updated_at = float(values[-1]) if values[-1] else None
+        if updated_at is None:
+            logger.warning("[行情采集] Redis 中没有最新行情，采集 worker 可能未运行")
+            return {}
+
+        age = max(0.0, time.time() - updated_at)
+        record_data_age(age)
+        if max_age is not None and age > max_age:
+            logger.warning(f"[行情采集] Redis 最新行情已 {age:.0f}s 未更新（上限 {max_age}s），采集 worker 可能已停止")
+            return {}
+        update_time = datetime.fromtimestamp(updated_at)
+        result = {}
+        for code, value in zip(codes, values):
+            if value:
+                result[code] = {"code": code, **json.loads(value), "update_time": update_time, "data_source": "quote_stream"}
+        return result
+
+    def read_updates(self, last_id: str = "-") -> List[Tuple[str, Dict[str, dict]]]:
+        """
+        读取 last_id 之后发布的行情变化（last_id 为 "-" 时从最早的快照开始）
+
+        Returns:
+            [(记录 ID, 代码 -> 标准化行情), ...]
+        """
+        start = last_id if last_id == "-" else f"({last_id}"
+        return [
+            (entry_id, json.loads(fields["quotes"]))
+            for entry_id, fields in redis_client.xrange(settings.QUOTE_STREAM_KEY, start=start)
+        ]
+
+
+# 全局单例（API 工作进程使用）
+quote_stream = QuoteStream()
+
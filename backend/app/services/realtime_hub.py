@@ -0,0 +1,207 @@
+"""
+盘中实时估值推送中心
+
+所有 WebSocket 订阅者共享一个服务端刷新循环：
+每个周期只对所有订阅基金的并集计算一次估值，
+再按订阅者各自的基金集合做差异比较，只推送发生变化的估值。
+"""
+import asyncio
+import itertools
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..config import settings
+from ..database import SessionLocal
+from .fund_fetcher import FundDataFetcher
+from .realtime_valuation import build_batch_stock_valuations
+
+logger = logging.getLogger(__name__)
+
+# 比较估值是否变化时忽略的字段（每次计算都会变化）
+_VOLATILE_FIELDS = ("estimate_time",)
+
+
+class Subscriber:
+    """单个推送订阅者（一个 WebSocket 连接）"""
+
+    def __init__(self, subscriber_id: int):
+        self.id = subscriber_id
+        self.fund_codes: Set[str] = set()
+        # 容量为 1：消费慢的连接只保留最新一条待发送消息，未发送的差异在下个周期重新计算
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        # 已推送给该订阅者的估值（fund_code -> 估值字典），用于差异比较
+        self.last_sent: Dict[str, dict] = {}
+
+
+class RealtimeHub:
+    """
+    实时估值推送中心
+
+    - 有订阅者时启动刷新循环，订阅者全部断开后自动停止
+    - 每个周期对订阅基金并集只计算一次（复用 build_batch_stock_valuations）
+    - 交易时间与非交易时间使用不同刷新间隔
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+        # 在事件循环内创建（见 _ensure_running），避免绑定到导入时的事件循环
+        self._wakeup: Optional[asyncio.Event] = None
+        # 最近一次计算结果（fund_code -> 估值字典）
+        self._latest: Dict[str, dict] = {}
+        self._latest_meta: dict = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, fund_codes: Iterable[str] = ()) -> Subscriber:
+        """注册订阅者，必要时启动刷新循环"""
+        subscriber = Subscriber(next(self._ids))
+        self._subscribers[subscriber.id] = subscriber
+        logger.info(f"[实时推送] 新订阅者 #{subscriber.id}，当前 {self.subscriber_count} 个连接")
+
+        self._ensure_running()
+        self.update_subscription(subscriber, fund_codes)
+        return subscriber
+
+    def update_subscription(self, subscriber: Subscriber, fund_codes: Iterable[str]):
+        """更新订阅者的基金集合"""
+        new_codes = set(fund_codes)
+        added = new_codes - subscriber.fund_codes
+        subscriber.fund_codes = new_codes
+        for code in list(subscriber.last_sent):
+            if code not in new_codes:
+                del subscriber.last_sent[code]
+
+        self._push_snapshot(subscriber)
+        # 新增了尚未计算过的基金，立即触发一次刷新
+        if added and any(code not in self._latest for code in added):
+            self._wakeup.set()
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """注销订阅者"""
+        self._subscribers.pop(subscriber.id, None)
+        logger.info(f"[实时推送] 订阅者 #{subscriber.id} 断开，当前 {self.subscriber_count} 个连接")
+        if not self._subscribers and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        """停止刷新循环（应用关闭时调用）"""
+        self._subscribers.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _union_codes(self) -> List[str]:
+        codes: Set[str] = set()
+        for subscriber in self._subscribers.values():
+            codes |= subscriber.fund_codes
+        return sorted(codes)
+
+    async def _run(self):
+        """刷新循环：计算并集估值 → 按订阅者推送差异 → 等待下个周期"""
+        logger.info("[实时推送] 刷新循环已启动")
+        try:
+            while self._subscribers:
+                self._wakeup.clear()
+                fund_codes = self._union_codes()
+
+                if fund_codes:
+                    try:
+                        await asyncio.to_thread(self._refresh, fund_codes)
+                        self._broadcast()
+                    except Exception as e:
+                        logger.error(f"[实时推送] 计算估值失败: {e}")
+
+                interval = (
+                    settings.REALTIME_PUSH_INTERVAL_TRADING
+                    if FundDataFetcher.is_trading_time()
+                    else settings.REALTIME_PUSH_INTERVAL_NON_TRADING
+                )
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("[实时推送] 刷新循环已停止")
+
+    def _refresh(self, fund_codes: List[str]):
+        """计算一次所有订阅基金的估值（在线程池中执行）"""
+        db = SessionLocal()
+        try:
+            response = build_batch_stock_valuations(db, fund_codes)
+        finally:
+            db.close()
+
+        self._latest = {
+            item.fund_code: item.model_dump(mode="json")
+            for item in response.valuations
+        }
+        self._latest_meta = {
+            "update_time": response.update_time.isoformat(),
+            "is_trading_time": response.is_trading_time,
+        }
+        logger.info(f"[实时推送] 已计算 {len(self._latest)}/{len(fund_codes)} 只基金估值")
+
+    @staticmethod
+    def _changed(old: Optional[dict], new: dict) -> bool:
+        if old is None:
+            return True
+        return any(
+            old.get(key) != value
+            for key, value in new.items()
+            if key not in _VOLATILE_FIELDS
+        )
+
+    def _broadcast(self):
+        for subscriber in list(self._subscribers.values()):
+            self._push_diff(subscriber, message_type="update")
+
+    def _push_snapshot(self, subscriber: Subscriber):
+        """向订阅者推送其订阅范围内的全部已知估值"""
+        subscriber.last_sent.clear()
+        self._push_diff(subscriber, message_type="snapshot")
+
+    def _push_diff(self, subscriber: Subscriber, message_type: str):
+        # 丢弃尚未发送的旧消息：其中的估值视为未送达，合并到本条消息中重新下发
+        if subscriber.queue.full():
+            stale = subscriber.queue.get_nowait()
+            for item in stale["valuations"]:
+                subscriber.last_sent.pop(item["fund_code"], None)
+            if stale["type"] == "snapshot":
+                message_type = "snapshot"
+
+        changed = []
+        for code in subscriber.fund_codes:
+            item = self._latest.get(code)
+            if item is not None and self._changed(subscriber.last_sent.get(code), item):
+                changed.append(item)
+
+        if not changed and message_type == "update":
+            return
+
+        for item in changed:
+            subscriber.last_sent[item["fund_code"]] = item
+
+        subscriber.queue.put_nowait({
+            "type": message_type,
+            "valuations": changed,
+            "update_time": self._latest_meta.get("update_time") or datetime.now().isoformat(),
+            "is_trading_time": self._latest_meta.get("is_trading_time", FundDataFetcher.is_trading_time()),
+        })
+
+
+# 全局单例实例
+realtime_hub = RealtimeHub()
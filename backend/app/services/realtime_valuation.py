@@ -0,0 +1,196 @@
+"""
+批量实时估值计算服务
+
+POST /api/nav/realtime/batch-stock 与盘中推送通道（/ws/realtime）共用的估值计算逻辑
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from datetime import datetime
+import logging
+
+from .. import crud, models, schemas
+from .fund_fetcher import FundDataFetcher
+from .efinance_client import efinance_client
+from .quote_stream import quote_stream
+from ..utils.retry_helper import APICallError
+
+logger = logging.getLogger(__name__)
+
+
+def build_batch_stock_valuations(db: Session, fund_codes: List[str]) -> schemas.BatchRealtimeNavResponse:
+    """
+    批量计算多只基金实时估值
+
+    优先级：
+    1. 场内基金（ETF/LOF）：使用实时股价
+    2. 场外基金：使用 efinance 估算涨跌幅
+    3. 降级方案：使用最新正式净值的日增长率
+
+    Args:
+        db: 数据库会话
+        fund_codes: 基金代码列表
+
+    Returns:
+        批量实时估值数据
+    """
+    fetcher = FundDataFetcher()
+    is_trading = fetcher.is_trading_time()
+
+    valuations = []
+
+    # 获取基金信息
+    funds = crud.get_funds_by_codes(db, fund_codes)
+    fund_id_map = {f.fund_code: f.id for f in funds}
+    fund_types = {f.fund_code: f.fund_type for f in funds}
+    # 最新正式净值（一条批量查询，各分支共用）
+    latest_navs = crud.get_latest_navs(db, list(fund_id_map.values()))
+
+    if is_trading:
+        # ========== 交易时间处理 ==========
+
+        # 1. 分离场内和场外基金
+        listed_funds = []
+        offshore_funds = []
+
+        for fund_code in fund_codes:
+            fund_type = fund_types.get(fund_code)
+            if FundDataFetcher.is_listed_fund(fund_type):
+                listed_funds.append(fund_code)
+            else:
+                offshore_funds.append(fund_code)
+
+        # 2. 处理场内基金（实时股价：先读采集进程写入的行情，未命中的再请求 ETF/LOF 行情，带重试）
+        ingested_quotes = FundDataFetcher.get_ingested_listed_quotes(listed_funds)
+        for code in listed_funds:
+            quote = ingested_quotes.get(code)
+            if quote is None:
+                continue
+            fund_id = fund_id_map.get(code)
+            latest_nav = latest_navs.get(fund_id)
+            valuations.append(schemas.RealtimeNavItem(
+                fund_code=code,
+                data_source="stock",
+                is_listed_fund=True,
+                current_price=quote["current_price"],
+                increase_rate=quote["increase_rate"],
+                estimate_time=quote["estimate_time"],
+                latest_nav_date=latest_nav.date if latest_nav else None,
+                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
+            ))
+        listed_funds = [code for code in listed_funds if code not in ingested_quotes]
+
+        if listed_funds and quote_stream.enabled:
+            # 只读 Redis 模式：没有行情的场内基金直接降级到场外处理
+            offshore_funds.extend(listed_funds)
+        elif listed_funds:
+            try:
+                etf_data = efinance_client.get_realtime_quotes('ETF')
+                lof_data = efinance_client.get_realtime_quotes('LOF')
+
+                # 合并数据
+                listed_data = None
+                if etf_data is not None and not etf_data.empty:
+                    if lof_data is not None and not lof_data.empty:
+                        import pandas as pd
+                        listed_data = pd.concat([etf_data, lof_data], ignore_index=True)
+                    else:
+                        listed_data = etf_data
+                elif lof_data is not None and not lof_data.empty:
+                    listed_data = lof_data
+
+                if listed_data is not None:
+                    for code in listed_funds:
+                        fund_row = listed_data[listed_data['股票代码'] == code]
+                        if not fund_row.empty:
+                            row = fund_row.iloc[0]
+                            fund_id = fund_id_map.get(code)
+                            latest_nav = latest_navs.get(fund_id)
+                            valuations.append(schemas.RealtimeNavItem(
+                                fund_code=code,
+                                data_source="stock",
+                                is_listed_fund=True,
+                                current_price=float(row['最新价']),
+                                increase_rate=float(row['涨跌幅']),
+                                estimate_time=datetime.now(),
+                                latest_nav_date=latest_nav.date if latest_nav else None,
+                                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
+                            ))
+                        else:
+                            # 场内基金未找到，降级到场外处理
+                            offshore_funds.append(code)
+            except APICallError as e:
+                logger.error(f"获取场内基金实时股价失败: {e.message}, error_type={e.error_type}")
+                offshore_funds.extend(listed_funds)
+            except Exception as e:
+                logger.error(f"获取场内基金实时股价失败: {e}")
+                offshore_funds.extend(listed_funds)
+
+        # 3. 处理场外基金（基于股票持仓）
+        # v1.7.3: 股票实时估值功能已禁用（efinance API 不可用）
+        # 直接跳过股票持仓估值，使用 efinance 降级方案（所有场外基金分批并发请求）
+        offshore_funds = [code for code in dict.fromkeys(offshore_funds) if fund_id_map.get(code) is not None]
+        _append_efinance_fallback(offshore_funds, fund_id_map, latest_navs, valuations)
+    else:
+        # ========== 非交易时间处理 ==========
+        # 返回最新正式净值的日增长率
+        for fund in funds:
+            latest_nav = latest_navs.get(fund.id)
+            valuations.append(schemas.RealtimeNavItem(
+                fund_code=fund.fund_code,
+                data_source="nav",
+                is_listed_fund=False,
+                increase_rate=float(latest_nav.daily_growth * 100) if latest_nav and latest_nav.daily_growth else None,
+                estimate_time=None,
+                latest_nav_date=latest_nav.date if latest_nav else None,
+                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
+            ))
+
+    return schemas.BatchRealtimeNavResponse(
+        valuations=valuations,
+        update_time=datetime.now(),
+        is_trading_time=is_trading
+    )
+
+
+def _append_efinance_fallback(
+    fund_codes: List[str],
+    fund_id_map: Dict[str, int],
+    latest_navs: Dict[int, models.NavHistory],
+    valuations: List
+):
+    """efinance 降级方案：批量获取估算涨跌幅，没有估值的基金使用正式净值"""
+    if not fund_codes:
+        return
+
+    try:
+        estimates = FundDataFetcher.get_realtime_estimates(fund_codes)
+    except Exception as e:
+        logger.error(f"efinance 降级失败 {fund_codes[:5]}: {e}")
+        estimates = {}
+
+    for fund_code in fund_codes:
+        latest_nav = latest_navs.get(fund_id_map[fund_code])
+        realtime_data = estimates.get(fund_code)
+
+        if realtime_data and realtime_data.get("increase_rate") is not None:
+            valuations.append(schemas.RealtimeNavItem(
+                fund_code=fund_code,
+                data_source=realtime_data.get("data_source", "estimate"),
+                is_listed_fund=False,
+                current_price=realtime_data.get("current_price"),
+                increase_rate=realtime_data.get("increase_rate"),
+                estimate_time=realtime_data.get("estimate_time"),
+                latest_nav_date=realtime_data.get("latest_nav_date") or (latest_nav.date if latest_nav else None),
+                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
+            ))
+        else:
+            # efinance也失败，使用正式净值
+            valuations.append(schemas.RealtimeNavItem(
+                fund_code=fund_code,
+                data_source="nav",
+                is_listed_fund=False,
+                increase_rate=float(latest_nav.daily_growth * 100) if latest_nav and latest_nav.daily_growth else None,
+                estimate_time=None,
+                latest_nav_date=latest_nav.date if latest_nav else None,
+                latest_nav_unit_nav=float(latest_nav.unit_nav) if latest_nav else None
+            ))
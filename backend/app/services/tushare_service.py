@@ -3,19 +3,30 @@ Tushare Pro 数据获取服务
 
 提供基金股票持仓查询和股票实时行情获取功能
 使用新浪财经源获取实时股票数据
+
+tushare / pandas 在首次使用时才导入，模块级单例 tushare_service 也是延迟创建的，
+未配置 TUSHARE_TOKEN 时导入本模块不会报错，只有真正调用时才会抛出异常。
 """
-import tushare as ts
-from typing import List, Dict, Optional
+from __future__ import annotations
+
+from typing import Callable, List, Dict, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
-import pandas as pd
 import logging
 import time
 import json
 from ..config import get_settings
-from ..utils.encoding import clean_stock_name, validate_chinese_name
+from ..utils.encoding import clean_stock_name, clean_stock_name_series, validate_chinese_name_series
 from ..services.efinance_client import efinance_client
+from ..services.quote_hedging import QuoteHedger, latency_tracker
 from ..utils.retry_helper import APICallError
+from ..utils.metrics import track_external_call
 from ..utils.redis_client import redis_client
+from ..utils.swr_cache import record_data_age, soft_ttl_for, swr_cache
+from .quote_board import quote_board
+from .quote_stream import quote_stream
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -28,10 +39,16 @@ class TushareService:
         """初始化 Tushare Pro 客户端"""
         if not settings.TUSHARE_TOKEN or settings.TUSHARE_TOKEN == "":
             raise ValueError("TUSHARE_TOKEN 未配置，请在 .env 文件中设置 TUSHARE_TOKEN")
+        import tushare as ts
+
         ts.set_token(settings.TUSHARE_TOKEN)
         self.pro = ts.pro_api()
         self.last_call_time = None  # 上次调用时间
 
+        # 进程内已验证的股票名称（代码 → 名称），与 Redis 名称缓存同样按 STOCK_NAME_CACHE_TTL 过期
+        self._name_memo: Dict[str, str] = {}
+        self._name_memo_expires_at = 0.0
+
         # 检查 Redis 缓存是否可用
         if redis_client.is_available():
             logger.info("[TushareService] Redis 缓存已启用")
@@ -62,6 +79,8 @@ class TushareService:
         Returns:
             DataFrame: 持仓明细数据
         """
+        import pandas as pd
+
         try:
             # 自动添加 .OF 后缀（如果还没有）
             if not fund_code.endswith('.OF'):
@@ -75,11 +94,12 @@ class TushareService:
             self.last_call_time = time.time()
 
             # 如果没有指定 period，获取最新季度的数据
-            if period is None:
-                # 默认使用空字符串，Tushare 会返回最新的数据
-                df = self.pro.fund_portfolio(ts_code=fund_code)
-            else:
-                df = self.pro.fund_portfolio(ts_code=fund_code, period=period)
+            with track_external_call("TushareService", "get_fund_portfolio"):
+                if period is None:
+                    # 默认使用空字符串，Tushare 会返回最新的数据
+                    df = self.pro.fund_portfolio(ts_code=fund_code)
+                else:
+                    df = self.pro.fund_portfolio(ts_code=fund_code, period=period)
 
             # 检查返回数据
             if df.empty:
@@ -124,35 +144,12 @@ class TushareService:
         try:
             logger.info(f"[Tushare] 正在批量查询 {len(stock_codes)} 只股票的名称")
 
-            # 调用 Tushare stock_basic API
             # 注意：stock_basic API 不支持一次查询多个股票，需要分批查询或使用其他方式
             # 这里使用单个调用查询所有股票列表，然后在内存中过滤
-            df = self.pro.stock_basic(
-                exchange='',
-                list_status='L',
-                fields='ts_code,name,area,industry,list_date'
-            )
-
-            if df.empty:
-                logger.warning(f"[Tushare] stock_basic 返回空数据")
+            name_mapping = self._load_stock_master()
+            if not name_mapping:
                 return {}
 
-            # 构建股票代码到名称的映射，应用编码清理
-            name_mapping = {}
-            for _, row in df.iterrows():
-                stock_code = row['ts_code']
-                raw_name = row['name']
-
-                # ✅ 编码处理：清理可能的乱码
-                clean_name = clean_stock_name(str(raw_name))
-
-                # 验证名称有效性
-                if not clean_name or not validate_chinese_name(clean_name):
-                    logger.debug(f"[Tushare] 股票 {stock_code} 名称无效: {raw_name}")
-                    clean_name = f"股票{stock_code.split('.')[0]}"  # 使用备用名称
-
-                name_mapping[stock_code] = clean_name
-
             # 过滤出我们需要的股票
             result = {code: name_mapping.get(code, '') for code in stock_codes}
             found_count = sum(1 for name in result.values() if name)
@@ -166,6 +163,102 @@ class TushareService:
             logger.error(traceback.format_exc())
             return {}
 
+    def _load_stock_master(self) -> Dict[str, str]:
+        """
+        拉取全市场上市股票列表（stock_basic），构建股票代码到名称的映射
+
+        Returns:
+            Dict[str, str]: 股票代码到清理后名称的映射，接口返回空数据时为空字典
+        """
+        with track_external_call("TushareService", "stock_basic"):
+            df = self.pro.stock_basic(
+                exchange='',
+                list_status='L',
+                fields='ts_code,name,area,industry,list_date'
+            )
+
+        if df.empty:
+            logger.warning(f"[Tushare] stock_basic 返回空数据")
+            return {}
+
+        # 构建股票代码到名称的映射，整列做编码清理和校验
+        names = clean_stock_name_series(df['name'])
+        valid = validate_chinese_name_series(names)
+        if not valid.all():
+            # 名称无效的使用备用名称
+            logger.debug(f"[Tushare] {int((~valid).sum())} 只股票名称无效，使用备用名称")
+            names = names.where(valid, '股票' + df['ts_code'].str.split('.').str[0])
+
+        return dict(zip(df['ts_code'], names))
+
+    def warm_stock_name_cache(self) -> int:
+        """
+        预热股票名称缓存：一次 stock_basic 调用写入全市场股票名称
+
+        Returns:
+            int: 写入 Redis 的股票数量（Redis 不可用或接口失败时为 0）
+        """
+        if not redis_client.is_available():
+            return 0
+
+        name_mapping = self._load_stock_master()
+        if not name_mapping:
+            return 0
+
+        cache_data = {
+            self._get_cache_key(code): name
+            for code, name in name_mapping.items()
+        }
+        redis_client.mset(cache_data, ttl=settings.STOCK_NAME_CACHE_TTL)
+        logger.info(f"[名称缓存] 预热完成，写入 {len(cache_data)} 只股票名称")
+        return len(cache_data)
+
+    def _get_name_memo(self) -> Dict[str, str]:
+        """返回进程内名称缓存，过期时整体清空"""
+        now = time.monotonic()
+        if now >= self._name_memo_expires_at:
+            self._name_memo = {}
+            self._name_memo_expires_at = now + settings.STOCK_NAME_CACHE_TTL
+        return self._name_memo
+
+    def lookup_stock_names(self, stock_codes: List[str]) -> Dict[str, str]:
+        """
+        按代码集合查询股票名称
+
+        依次查询：进程内缓存 → 一次 Redis MGET → 一次 stock_basic（结果回写 Redis 和进程内缓存）
+
+        Args:
+            stock_codes: 股票代码列表（可重复，内部去重）
+
+        Returns:
+            Dict[str, str]: 查到有效名称的股票代码到名称的映射
+        """
+        memo = self._get_name_memo()
+        codes = list(dict.fromkeys(code for code in stock_codes if code))
+        names = {code: memo[code] for code in codes if code in memo}
+        missing_codes = [code for code in codes if code not in names]
+        if not missing_codes:
+            return names
+
+        cached_values = redis_client.mget([self._get_cache_key(code) for code in missing_codes])
+        cached = {code: name for code, name in zip(missing_codes, cached_values) if name}
+        names.update(cached)
+        memo.update(cached)
+        missing_codes = [code for code in missing_codes if code not in cached]
+
+        if missing_codes:
+            logger.info(f"[名称补充] 缓存未命中 {len(missing_codes)}/{len(codes)} 只股票，查询 Tushare")
+            fetched = {code: name for code, name in self.get_stock_names_batch(missing_codes).items() if name}
+            if fetched:
+                redis_client.mset(
+                    {self._get_cache_key(code): name for code, name in fetched.items()},
+                    ttl=settings.STOCK_NAME_CACHE_TTL
+                )
+            names.update(fetched)
+            memo.update(fetched)
+
+        return names
+
     def ensure_stock_names(
         self,
         positions: List[Dict],
@@ -176,9 +269,8 @@ class TushareService:
         确保持仓数据中的股票名称完整且有效
 
         检查每个持仓记录的股票名称：
-        1. 如果为空，查询 Tushare 补充
-        2. 如果是乱码，使用编码工具修复
-        3. 使用 Redis 缓存避免重复查询
+        1. 名称有效则保留；乱码先用编码工具本地修复（相同名称只处理一次）
+        2. 为空或无法本地修复的，按去重后的代码统一查询（进程内缓存 → Redis MGET → Tushare）
 
         Args:
             positions: 持仓记录列表
@@ -188,88 +280,39 @@ class TushareService:
         Returns:
             修复后的持仓记录列表（不修改原列表）
         """
-        from ..utils.encoding import fix_gbk_mojibake
+        from ..utils.encoding import repair_stock_name
 
-        # 第一遍遍历：收集需要查询的股票代码
-        missing_codes = []
+        local_names: Dict[str, str] = {}
         for pos in positions:
-            stock_code = pos.get(code_field, '')
-            stock_name = pos.get(name_field, '')
-
-            # 检查名称是否有效
-            if not stock_name or not validate_chinese_name(stock_name):
-                if stock_code:
-                    # 检查 Redis 缓存
-                    cache_key = self._get_cache_key(stock_code)
-                    cached_name = redis_client.get(cache_key)
+            stock_name = pos.get(name_field) or ''
+            if stock_name not in local_names:
+                local_names[stock_name] = repair_stock_name(stock_name)
 
-                    if not cached_name:
-                        missing_codes.append(stock_code)
+        unresolved_codes = [
+            pos.get(code_field, '') for pos in positions
+            if not local_names[pos.get(name_field) or '']
+        ]
+        lookup_names = self.lookup_stock_names(unresolved_codes) if unresolved_codes else {}
 
-        # 批量查询缺失的名称
-        if missing_codes:
-            logger.info(f"[名称补充] 正在查询 {len(missing_codes)} 只股票的名称")
-            name_mapping = self.get_stock_names_batch(missing_codes)
-
-            # 更新 Redis 缓存
-            if name_mapping and redis_client.is_available():
-                cache_data = {
-                    self._get_cache_key(code): name
-                    for code, name in name_mapping.items()
-                    if name  # 只缓存有效名称
-                }
-                redis_client.mset(cache_data, ttl=settings.STOCK_NAME_CACHE_TTL)
-                logger.info(f"[名称补充] 已缓存 {len(cache_data)} 只股票名称到 Redis")
-
-            logger.info(
-                f"[名称补充] 成功获取 {len([n for n in name_mapping.values() if n])}/"
-                f"{len(missing_codes)} 只股票的名称"
-            )
-
-        # 第二遍遍历：修复或补充名称
         result = []
+        repaired = 0
         for pos in positions:
             pos_copy = pos.copy()  # 避免修改原数据
-            stock_code = pos_copy.get(code_field, '')
-            stock_name = pos_copy.get(name_field, '')
-
-            # 策略 1：名称为空，从 Redis 缓存获取
-            if not stock_name:
-                cache_key = self._get_cache_key(stock_code)
-                cached_name = redis_client.get(cache_key)
-                if cached_name:
-                    pos_copy[name_field] = cached_name
-                    logger.debug(f"[名称补充] {stock_code}: 使用 Redis 缓存")
-
-            # 策略 2：名称存在但可能是乱码，尝试修复
-            elif not validate_chinese_name(stock_name):
-                logger.debug(f"[名称修复] {stock_code}: 检测到乱码 '{stock_name}'")
-
-                # 尝试修复 GBK 乱码
-                fixed_name = fix_gbk_mojibake(stock_name)
-                if validate_chinese_name(fixed_name):
-                    pos_copy[name_field] = fixed_name
-                    logger.info(f"[名称修复] {stock_code}: '{stock_name}' → '{fixed_name}'")
-                else:
-                    # 修复失败，尝试清理
-                    cleaned = clean_stock_name(stock_name)
-                    if validate_chinese_name(cleaned):
-                        pos_copy[name_field] = cleaned
-                        logger.info(f"[名称修复] {stock_code}: 清理后 '{cleaned}'")
-                    else:
-                        # 仍然无效，从 Redis 缓存获取
-                        cache_key = self._get_cache_key(stock_code)
-                        cached_name = redis_client.get(cache_key)
-                        if cached_name:
-                            pos_copy[name_field] = cached_name
-                            logger.info(f"[名称修复] {stock_code}: 使用 Redis 缓存名称替换乱码")
-
+            stock_name = pos_copy.get(name_field) or ''
+            new_name = local_names[stock_name] or lookup_names.get(pos_copy.get(code_field, ''))
+            if new_name and new_name != stock_name:
+                pos_copy[name_field] = new_name
+                repaired += 1
             result.append(pos_copy)
 
+        if repaired:
+            logger.info(f"[名称修复] 补充或修复 {repaired}/{len(positions)} 条股票名称")
+
         return result
 
     def clear_name_cache(self) -> None:
-        """清空股票名称缓存（Redis）"""
+        """清空股票名称缓存（进程内 + Redis）"""
+        self._name_memo = {}
         if redis_client.is_available():
             deleted_count = redis_client.clear_pattern("stock:name:*")
             logger.info(f"[名称缓存] 已清空 Redis 缓存，删除 {deleted_count} 个键")
@@ -288,36 +331,54 @@ class TushareService:
         Returns:
             Dict: 实时行情数据，key 为股票代码
         """
-        import json
         from ..config import settings
 
         # 判断是否为交易时间
         is_trading = self._is_trading_time()
         ttl = settings.STOCK_REALTIME_CACHE_TTL_TRADING if is_trading else settings.STOCK_REALTIME_CACHE_TTL_NON_TRADING
+        soft_ttl = soft_ttl_for(ttl)
+
+        results = {}
+
+        # 共享内存看板（由行情采集进程写入）中足够新的行情直接使用，其余走 Redis 缓存
+        if settings.QUOTE_BOARD_ENABLED:
+            results = quote_board.read(stock_codes, max_age=ttl)
+            if len(results) == len(stock_codes):
+                return results
+            stock_codes = [code for code in stock_codes if code not in results]
+
+        # 行情由采集 worker 写入 Redis：只读最新行情哈希，未命中也不请求上游
+        if quote_stream.enabled:
+            results.update(quote_stream.read(stock_codes, max_age=ttl))
+            return results
 
         # 尝试从Redis批量获取
         cache_keys = [self._get_realtime_cache_key(code) for code in stock_codes]
-        cached_values = redis_client.mget(cache_keys)
+        entries = swr_cache.read_many(cache_keys)
 
-        results = {}
         missed_codes = []
+        stale_codes = []
 
-        # 检查缓存命中情况
-        for idx, code in enumerate(stock_codes):
-            cached_value = cached_values[idx]
-            if cached_value:
-                if cached_value == "NULL":
-                    logger.debug(f"[实时行情缓存] 空值命中: {code}")
-                    continue
-                try:
-                    # 反序列化JSON
-                    results[code] = json.loads(cached_value)
-                    logger.debug(f"[实时行情缓存] 命中: {code}")
-                except json.JSONDecodeError:
-                    logger.warning(f"[实时行情缓存] 反序列化失败: {code}")
-                    missed_codes.append(code)
-            else:
+        # 检查缓存命中情况（过期但未超过 hard TTL 的数据先返回，后台刷新）
+        for code, entry in zip(stock_codes, entries):
+            if entry is None:
                 missed_codes.append(code)
+                continue
+            record_data_age(entry.age)
+            if entry.value is None:
+                logger.debug(f"[实时行情缓存] 空值命中: {code}")
+            else:
+                results[code] = entry.value
+            if entry.age >= (soft_ttl_for(settings.STOCK_REALTIME_CACHE_NULL_TTL) if entry.value is None else soft_ttl):
+                stale_codes.append(code)
+
+        if stale_codes:
+            logger.info(f"[实时行情缓存] {len(stale_codes)} 只股票数据过期，后台刷新")
+            keys_to_codes = {self._get_realtime_cache_key(code): code for code in stale_codes}
+            swr_cache.refresh_in_background(
+                keys_to_codes,
+                lambda keys: self._refresh_realtime_cache([keys_to_codes[key] for key in keys], ttl)
+            )
 
         # 如果全部命中，直接返回
         if not missed_codes:
@@ -326,36 +387,67 @@ class TushareService:
 
         # 缓存未命中的股票，调用API获取
         logger.info(f"[实时行情缓存] 未命中 {len(missed_codes)}/{len(stock_codes)} 只股票，调用API")
+        record_data_age(0)
+        fresh_data = self._fetch_realtime_quotes(missed_codes)
+        self._cache_realtime_quotes(fresh_data, ttl)
+
+        # 空值缓存（防止穿透）：只在同步加载时写入，后台刷新失败不覆盖旧值
+        no_data_codes = [code for code in missed_codes if code not in fresh_data]
+        if no_data_codes:
+            swr_cache.write_many(
+                {self._get_realtime_cache_key(code): None for code in no_data_codes},
+                ttl=settings.STOCK_REALTIME_CACHE_NULL_TTL
+            )
+
+        # 合并缓存和新鲜数据
+        results.update(fresh_data)
+        return results
+
+    def _fetch_realtime_quotes(self, stock_codes: List[str]) -> Dict:
+        """按数据源优先级获取实时行情（对冲或顺序降级）"""
+        from ..config import settings
+
+        if settings.QUOTE_HEDGING_ENABLED:
+            # 对冲模式：efinance 超过对冲延迟未返回时并行请求 Tushare，取先返回者
+            _, fresh_data = QuoteHedger(self._quote_sources()).fetch(stock_codes)
+            return fresh_data
 
         # 优先使用 efinance
-        fresh_data = self._get_efinance_realtime(missed_codes)
+        fresh_data = latency_tracker.measure("efinance", self._get_efinance_realtime, stock_codes)
         if not fresh_data:
             # 降级到 Tushare
             logger.warning("[数据源切换] efinance 失败，切换到 Tushare 爬虫接口")
-            fresh_data = self._get_tushare_realtime(missed_codes)
-
-        # 更新Redis缓存
-        if fresh_data and redis_client.is_available():
-            cache_data = {}
-            for code, quote_data in fresh_data.items():
-                cache_key = self._get_realtime_cache_key(code)
-                # 序列化为JSON（包含 datetime 对象需要自定义序列化器）
-                cache_data[cache_key] = json.dumps(
-                    quote_data,
-                    default=self._json_serializer,
-                    ensure_ascii=False
-                )
-
-            if cache_data:
-                redis_client.mset(cache_data, ttl=ttl)
-                logger.info(f"[实时行情缓存] 已更新 {len(cache_data)} 只股票到 Redis")
-
-        # 合并缓存和新鲜数据
-        results.update(fresh_data)
-        return results
+            fresh_data = latency_tracker.measure("tushare", self._get_tushare_realtime, stock_codes)
+        return fresh_data
+
+    def _cache_realtime_quotes(self, quotes: Dict, ttl: int):
+        """写入实时行情缓存（datetime 等对象先转换为 JSON 兼容的值）"""
+        if not quotes:
+            return
+        swr_cache.write_many(
+            {
+                self._get_realtime_cache_key(code): json.loads(json.dumps(quote_data, default=self._json_serializer))
+                for code, quote_data in quotes.items()
+            },
+            ttl=ttl
+        )
+        logger.info(f"[实时行情缓存] 已更新 {len(quotes)} 只股票到 Redis")
+
+    def _refresh_realtime_cache(self, stock_codes: List[str], ttl: int):
+        """后台刷新过期的实时行情（获取失败时保留旧值）"""
+        self._cache_realtime_quotes(self._fetch_realtime_quotes(stock_codes), ttl)
+
+    def _quote_sources(self) -> List[Tuple[str, Callable[[List[str]], Dict]]]:
+        """实时行情数据源，按优先级排列（Tushare 内部再降级到 daily 接口）"""
+        return [
+            ("efinance", self._get_efinance_realtime),
+            ("tushare", self._get_tushare_realtime),
+        ]
 
     def _get_efinance_realtime(self, stock_codes: List[str]) -> Dict:
         """使用 efinance 获取实时行情（带重试）"""
+        import pandas as pd
+
         try:
             logger.info(f"[Efinance] 正在获取 {len(stock_codes)} 只股票的实时行情")
             logger.debug(f"[Efinance] 股票代码列表: {stock_codes}")
@@ -372,14 +464,6 @@ class TushareService:
 
             if all_stocks_df is None or all_stocks_df.empty:
                 logger.warning(f"[Efinance] 获取股票实时行情失败：返回空数据")
-                # 空值缓存（防止穿透）
-                if redis_client.is_available():
-                    from ..config import settings
-                    null_cache_data = {
-                        self._get_realtime_cache_key(code): "NULL"
-                        for code in stock_codes
-                    }
-                    redis_client.mset(null_cache_data, ttl=settings.STOCK_REALTIME_CACHE_NULL_TTL)
                 return {}
 
             # 构建股票代码映射（去除交易所后缀进行匹配）
@@ -428,6 +512,9 @@ class TushareService:
 
         从新浪财经爬取实时股票数据
         """
+        import pandas as pd
+        import tushare as ts
+
         try:
             logger.info(f"[Tushare] 正在爬取 {len(stock_codes)} 只股票的实时行情")
 
@@ -439,7 +526,8 @@ class TushareService:
                 logger.warning(f"[Tushare] 当前是非交易时间（{now.hour}点）")
 
             # 使用 Tushare realtime_quote 接口
-            df = ts.realtime_quote(ts_code=','.join(stock_codes))
+            with track_external_call("TushareService", "realtime_quote"):
+                df = ts.realtime_quote(ts_code=','.join(stock_codes))
 
             if df.empty:
                 logger.warning(f"[Tushare] realtime_quote 返回空数据")
@@ -486,11 +574,12 @@ class TushareService:
             # 使用 daily 接口获取最新交易日数据
             today = datetime.now().strftime("%Y%m%d")
 
-            df = self.pro.daily(
-                ts_code=','.join(stock_codes),
-                trade_date=today,
-                fields='ts_code,close,open,high,low,vol,amount,pct_chg'
-            )
+            with track_external_call("TushareService", "daily"):
+                df = self.pro.daily(
+                    ts_code=','.join(stock_codes),
+                    trade_date=today,
+                    fields='ts_code,close,open,high,low,vol,amount,pct_chg'
+                )
 
             if df.empty:
                 logger.warning(f"[Tushare] 降级方案：今天还没有交易数据")
@@ -622,5 +711,25 @@ class TushareService:
         raise TypeError(f"Type {type(obj)} not serializable")
 
 
-# 全局单例实例
-tushare_service = TushareService()
+class _LazyTushareService:
+    """
+    TushareService 的延迟代理
+
+    首次访问属性时才创建真正的 TushareService（导入 tushare、校验 Token），
+    之后所有属性访问都转发给该实例。
+    """
+
+    def __init__(self):
+        self._instance: Optional[TushareService] = None
+
+    def _get_instance(self) -> TushareService:
+        if self._instance is None:
+            self._instance = TushareService()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get_instance(), name)
+
+
+# 全局单例实例（延迟初始化）
+tushare_service = _LazyTushareService()
@@ -0,0 +1,79 @@
+"""
+启动预热服务
+
+在应用启动阶段（lifespan）预先加载常用缓存，避免首批请求冷启动：
+1. latest_nav: 持仓基金的最新净值（fund:nav:latest:*）
+2. fund_info: 持仓基金的基本信息（fund:info:*）
+3. stock_master: 全市场股票名称（stock:name:*）
+
+每个阶段独立计时、独立容错，单个阶段失败不影响应用启动。
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from .. import crud
+from ..config import settings
+from ..database import SessionLocal
+from ..utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_per_fund(fund_codes: List[str], loader: Callable[[str], object]) -> int:
+    """并发地对每只基金调用 loader（loader 内部负责写缓存），返回调用数量"""
+    if not fund_codes:
+        return 0
+    workers = max(1, min(settings.STARTUP_WARMUP_CONCURRENCY, len(fund_codes)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(loader, fund_codes))
+    return len(fund_codes)
+
+
+def run_warmup() -> Dict[str, float]:
+    """
+    执行启动预热（同步函数，由 lifespan 放到线程中运行）
+
+    Returns:
+        Dict[str, float]: 各阶段耗时（秒），失败的阶段同样记录耗时
+    """
+    from .fund_fetcher import FundDataFetcher
+    from .tushare_service import tushare_service
+
+    if not redis_client.is_available():
+        logger.warning("[Warmup] Redis 不可用，跳过缓存预热")
+        return {}
+
+    db = SessionLocal()
+    try:
+        fund_codes = crud.get_held_fund_codes(db)
+    except Exception as e:
+        # 数据库不可用时跳过按基金预热的阶段，股票名称阶段照常执行
+        logger.error(f"[Warmup] 读取持仓基金失败，跳过基金相关预热: {e}")
+        fund_codes = []
+    finally:
+        db.close()
+
+    phases = [
+        ("latest_nav", lambda: _warm_per_fund(fund_codes, FundDataFetcher.get_fund_nav)),
+        ("fund_info", lambda: _warm_per_fund(fund_codes, FundDataFetcher.get_fund_info)),
+        # 在阶段内部访问 tushare_service：延迟代理首次访问时才创建客户端（如 TUSHARE_TOKEN 未配置时抛出），
+        # 需要由下面的逐阶段容错捕获
+        ("stock_master", lambda: tushare_service.warm_stock_name_cache()),
+    ]
+
+    timings: Dict[str, float] = {}
+    total_start = time.perf_counter()
+    for name, phase in phases:
+        start = time.perf_counter()
+        try:
+            count = phase()
+            timings[name] = time.perf_counter() - start
+            logger.info(f"[Warmup] 阶段 {name} 完成: {count} 项，耗时 {timings[name]:.2f}s")
+        except Exception as e:
+            timings[name] = time.perf_counter() - start
+            logger.error(f"[Warmup] 阶段 {name} 失败（耗时 {timings[name]:.2f}s）: {e}")
+
+    logger.info(f"[Warmup] 缓存预热结束，总耗时 {time.perf_counter() - total_start:.2f}s")
+    return timings
@@ -0,0 +1,284 @@
+"""
+数据库写入驱动的缓存失效
+
+在 SQLAlchemy Session 事件上收集写入涉及的缓存标签，事务提交后统一失效：
+- after_flush：ORM 对象的新增 / 修改 / 删除
+- do_orm_execute：session.execute() 执行的批量 INSERT / UPDATE / DELETE
+  （从参数或 WHERE fund_id = ... 条件中取基金 ID，funds 表为 id；取不到时失效该类数据的全部标签）
+- after_commit：发布收集到的标签；after_rollback：丢弃
+
+缓存标签格式为 "<类别>:<基金代码>"，类别按数据表划分：
+
+    funds               -> fund
+    nav_history         -> nav
+    holdings            -> holding
+    transactions        -> transactions
+    daily_pnl           -> pnl
+    fund_stock_positions -> positions
+
+失效分两层：
+- Redis：写缓存时用 track_keys() 把缓存键登记到标签集合 cache:tag:<标签>，失效时删除集合内的键；
+  依赖某类别全部基金的缓存（如首页看板）登记在通配标签 <类别>:* 下，该类别任一基金的标签失效时一并删除
+- 进程内缓存：模块用 invalidation_bus.subscribe(类别, handler) 注册清理函数；
+  失效消息同时通过 Redis 频道广播，其他工作进程的监听线程收到后执行各自的 handler
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import column, event, select, table
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from ..config import settings
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 数据表 -> 缓存标签类别
+TRACKED_TABLES: Dict[str, str] = {
+    "funds": "fund",
+    "nav_history": "nav",
+    "holdings": "holding",
+    "transactions": "transactions",
+    "daily_pnl": "pnl",
+    "fund_stock_positions": "positions",
+}
+
+# 基金 ID 所在的列（默认 fund_id；funds 表为主键 id）
+_FUND_ID_COLUMNS: Dict[str, str] = {"funds": "id"}
+
+# 通配标签：无法确定基金时失效该类别的全部缓存
+ALL_FUNDS = "*"
+
+_TAG_KEY_PREFIX = "cache:tag:"
+_CHANNEL = "cache:invalidate"
+_SESSION_INFO_KEY = "cache_invalidation_tags"
+
+_funds = table("funds", column("id"), column("fund_code"))
+
+# handler(fund_codes)：fund_codes 为 None 表示该类别的全部基金
+InvalidationHandler = Callable[[Optional[Set[str]]], None]
+
+
+def cache_tag(kind: str, fund_code: str) -> str:
+    """缓存标签，如 cache_tag("positions", "000001") -> "positions:000001" """
+    return f"{kind}:{fund_code}"
+
+
+def track_keys(tags: Iterable[str], keys: Iterable[str]) -> None:
+    """把缓存键登记到标签下（写缓存后调用），标签失效时这些键会被删除"""
+    keys = list(keys)
+    mapping = {f"{_TAG_KEY_PREFIX}{tag}": keys for tag in tags}
+    if mapping and keys:
+        redis_client.sadd_many(mapping, ttl=settings.CACHE_TAG_INDEX_TTL)
+
+
+class InvalidationBus:
+    """缓存失效总线：按标签清理 Redis 缓存键并通知进程内缓存"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[InvalidationHandler]] = defaultdict(list)
+        # 基金 ID -> 基金代码（基金代码不会变化，进程内缓存）
+        self._fund_codes: Dict[int, str] = {}
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, kind: str, handler: InvalidationHandler) -> None:
+        """注册进程内缓存的清理函数"""
+        self._handlers[kind].append(handler)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """失效标签：删除登记的 Redis 缓存键，执行本进程 handler，并广播给其他进程"""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+
+        self._purge_redis(tags)
+        self._run_handlers(tags)
+        redis_client.publish(_CHANNEL, json.dumps({"origin": self._origin, "tags": tags}))
+        logger.info(f"[缓存失效] {len(tags)} 个标签: {tags[:10]}")
+
+    def _purge_redis(self, tags: List[str]):
+        tag_keys = []
+        for tag in tags:
+            if tag.endswith(f":{ALL_FUNDS}"):
+                tag_keys.extend(redis_client.scan_keys(f"{_TAG_KEY_PREFIX}{tag[:-len(ALL_FUNDS)]}*"))
+            else:
+                kind, _, _ = tag.partition(":")
+                tag_keys.append(f"{_TAG_KEY_PREFIX}{tag}")
+                tag_keys.append(f"{_TAG_KEY_PREFIX}{cache_tag(kind, ALL_FUNDS)}")
+        tag_keys = list(dict.fromkeys(tag_keys))
+        if not tag_keys:
+            return
+
+        cache_keys = set().union(*redis_client.smembers_many(tag_keys))
+        redis_client.delete(*cache_keys, *tag_keys)
+
+    def _run_handlers(self, tags: Iterable[str]):
+        by_kind: Dict[str, Optional[Set[str]]] = {}
+        for tag in tags:
+            kind, _, fund_code = tag.partition(":")
+            if fund_code == ALL_FUNDS or by_kind.get(kind, set()) is None:
+                by_kind[kind] = None
+            else:
+                by_kind.setdefault(kind, set()).add(fund_code)
+
+        for kind, fund_codes in by_kind.items():
+            for handler in self._handlers.get(kind, ()):
+                try:
+                    handler(fund_codes)
+                except Exception as e:
+                    logger.warning(f"[缓存失效] 进程内缓存清理失败: kind={kind}, error={e}")
+
+    # ========== 跨进程广播 ==========
+
+    def start_listener(self) -> None:
+        """启动监听线程，执行其他进程发布的失效消息（Redis 不可用时跳过）"""
+        if self._listener is not None:
+            return
+        pubsub = redis_client.pubsub()
+        if pubsub is None:
+            return
+        pubsub.subscribe(_CHANNEL)
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen, args=(pubsub,), name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self) -> None:
+        if self._listener is None:
+            return
+        self._stop.set()
+        self._listener.join(timeout=2)
+        self._listener = None
+
+    def _listen(self, pubsub):
+        try:
+            while not self._stop.is_set():
+                try:
+                    message = pubsub.get_message(timeout=1.0)
+                except Exception as e:
+                    logger.warning(f"[缓存失效] 监听失败: {e}")
+                    self._stop.wait(5)
+                    continue
+                if not message or message.get("type") != "message":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("origin") != self._origin:
+                    self._run_handlers(payload.get("tags", []))
+        finally:
+            pubsub.close()
+
+    # ========== Session 事件 ==========
+
+    def install(self, session_class=Session) -> None:
+        """在 Session 类上注册事件（对所有会话生效，包括后台任务创建的会话）"""
+        if event.contains(session_class, "after_commit", self._after_commit):
+            return
+        event.listen(session_class, "after_flush", self._after_flush)
+        event.listen(session_class, "do_orm_execute", self._on_execute)
+        event.listen(session_class, "after_commit", self._after_commit)
+        event.listen(session_class, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session, flush_context):
+        fund_ids: Dict[str, Set] = defaultdict(set)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            kind = TRACKED_TABLES.get(getattr(obj, "__tablename__", None))
+            if kind is None or (obj in session.dirty and not session.is_modified(obj)):
+                continue
+            fund_ids[kind].update(_fund_ids_of(obj, _FUND_ID_COLUMNS.get(obj.__tablename__, "fund_id")))
+        if fund_ids:
+            self._collect(session, fund_ids)
+
+    def _on_execute(self, state):
+        if not (state.is_insert or state.is_update or state.is_delete):
+            return
+        target = getattr(state.statement, "table", None)
+        kind = TRACKED_TABLES.get(getattr(target, "name", None))
+        if kind is None:
+            return
+        id_column = _FUND_ID_COLUMNS.get(target.name, "fund_id")
+        ids = _fund_ids_from_params(state.parameters, id_column) or _fund_ids_from_criteria(state.statement, id_column)
+        self._collect(state.session, {kind: ids or {ALL_FUNDS}})
+
+    def _after_commit(self, session):
+        tags = session.info.pop(_SESSION_INFO_KEY, None)
+        if tags:
+            try:
+                self.invalidate(tags)
+            except Exception as e:
+                logger.error(f"[缓存失效] 失效失败: {sorted(tags)[:10]}, error={e}")
+
+    def _after_rollback(self, session):
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+    def _collect(self, session, fund_ids: Dict[str, Set]):
+        """把 {类别: 基金 ID} 转换为标签，暂存到会话中，提交后发布"""
+        self._resolve_fund_codes(session, {i for ids in fund_ids.values() for i in ids if i != ALL_FUNDS})
+        pending = session.info.setdefault(_SESSION_INFO_KEY, set())
+        for kind, ids in fund_ids.items():
+            for fund_id in ids:
+                fund_code = ALL_FUNDS if fund_id == ALL_FUNDS else self._fund_codes.get(fund_id)
+                pending.add(cache_tag(kind, fund_code or ALL_FUNDS))
+
+    def _resolve_fund_codes(self, session, fund_ids: Set[int]):
+        missing = [fund_id for fund_id in fund_ids if fund_id not in self._fund_codes]
+        if not missing:
+            return
+        # 直接使用会话的连接（不经过 Session.execute，不会再次触发 do_orm_execute）
+        rows = session.connection().execute(
+            select(_funds.c.id, _funds.c.fund_code).where(_funds.c.id.in_(missing))
+        )
+        self._fund_codes.update({row.id: row.fund_code for row in rows})
+
+
+def _fund_ids_of(obj, id_column: str = "fund_id") -> Set:
+    """ORM 对象当前和修改前的基金 ID（未加载时视为未知）"""
+    history = attributes.get_history(obj, id_column, passive=attributes.PASSIVE_NO_FETCH)
+    ids = {i for i in (*history.added, *history.unchanged, *history.deleted) if i is not None}
+    return ids or {ALL_FUNDS}
+
+
+def _fund_ids_from_params(parameters, id_column: str = "fund_id") -> Set[int]:
+    if isinstance(parameters, dict):
+        parameters = [parameters]
+    if not parameters:
+        return set()
+    ids = set()
+    for params in parameters:
+        if id_column not in params:
+            return set()
+        ids.add(params[id_column])
+    return ids
+
+
+def _fund_ids_from_criteria(statement, id_column: str = "fund_id") -> Set[int]:
+    """从 WHERE fund_id = :id / fund_id IN (...) 条件中提取基金 ID（id_column 为基金 ID 所在的列）"""
+    where = getattr(statement, "whereclause", None)
+    if where is None:
+        return set()
+    ids = set()
+    for element in visitors.iterate(where):
+        if not isinstance(element, BinaryExpression) or getattr(element.left, "key", None) != id_column:
+            continue
+        if not isinstance(element.right, BindParameter):
+            continue
+        value = element.right.effective_value
+        if element.operator is operators.eq:
+            ids.add(value)
+        elif element.operator is operators.in_op:
+            ids.update(value or ())
+    return ids
+
+
+# 全局单例
+invalidation_bus = InvalidationBus()
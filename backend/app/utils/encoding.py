@@ -2,12 +2,37 @@
 编码转换工具函数
 
 处理系统 GBK 编码与项目 UTF-8 编码之间的转换
+
+正则在模块加载时预编译；股票名称的取值集合很小（全市场约 5000 个），
+校验和本地修复结果按名称缓存在进程内。DataFrame 列请使用 *_series 版本，
+在 pandas 字符串方法中一次性处理整列。
 """
 import logging
 import re
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# 控制字符和 C1 控制字符
+_CONTROL_CHARS = r'[\x00-\x1f\x7f-\x9f]'
+
+# 常见乱码模式：替换字符 / 常见的乱码字符（Latin-1 补充）/ 十六进制转义序列
+_MOJIBAKE = r'[\ufffdÂÃÀÅÆÇÈÉÊË]|\\x[0-9a-fA-F]{2}'
+
+# 有效中文字符
+_CHINESE = r'[\u4e00-\u9fff]'
+
+_CONTROL_CHARS_RE = re.compile(_CONTROL_CHARS)
+_MOJIBAKE_RE = re.compile(_MOJIBAKE)
+_CHINESE_RE = re.compile(_CHINESE)
+
+# 名称校验 / 修复缓存容量（覆盖全市场股票名称及常见乱码变体）
+_NAME_CACHE_SIZE = 16384
+
 
 def clean_stock_name(name: str) -> str:
     """
@@ -23,7 +48,7 @@ def clean_stock_name(name: str) -> str:
         return ""
 
     # 去除控制字符和非法字符
-    name = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', str(name))
+    name = _CONTROL_CHARS_RE.sub('', str(name))
 
     # 去除首尾空格
     name = name.strip()
@@ -31,6 +56,7 @@ def clean_stock_name(name: str) -> str:
     return name
 
 
+@lru_cache(maxsize=_NAME_CACHE_SIZE)
 def validate_chinese_name(name: str) -> bool:
     """
     验证中文名称是否有效（没有乱码）
@@ -45,19 +71,11 @@ def validate_chinese_name(name: str) -> bool:
         return False
 
     # 检查是否包含常见乱码模式
-    mojibake_patterns = [
-        r'[\ufffd]',  # 替换字符
-        r'[ÂÃÀÅÆÇÈÉÊË]',  # 常见的乱码字符（Latin-1 补充）
-        r'\\x[0-9a-fA-F]{2}',  # 十六进制转义序列
-    ]
-
-    for pattern in mojibake_patterns:
-        if re.search(pattern, name):
-            return False
+    if _MOJIBAKE_RE.search(name):
+        return False
 
     # 检查是否包含有效中文字符
-    has_chinese = bool(re.search(r'[\u4e00-\u9fff]', name))
-    return has_chinese
+    return _CHINESE_RE.search(name) is not None
 
 
 def fix_gbk_mojibake(text: str) -> str:
@@ -115,3 +133,59 @@ def ensure_utf8(text: str) -> str:
             # 无法修复，返回原字符串
             logger.warning(f"无法修复字符串编码，可能存在乱码: {text[:50]}...")
             return text
+
+
+@lru_cache(maxsize=_NAME_CACHE_SIZE)
+def repair_stock_name(name: str) -> str:
+    """
+    只用本地规则修复股票名称（不查询缓存和接口）
+
+    依次尝试：原名称有效 → GBK 乱码修复 → 清理非法字符
+
+    Args:
+        name: 股票名称
+
+    Returns:
+        str: 有效的股票名称，本地无法修复（或名称为空）时返回空字符串
+    """
+    if not name:
+        return ""
+    if validate_chinese_name(name):
+        return name
+
+    fixed = fix_gbk_mojibake(name)
+    if validate_chinese_name(fixed):
+        return fixed
+
+    cleaned = clean_stock_name(name)
+    if validate_chinese_name(cleaned):
+        return cleaned
+
+    return ""
+
+
+def clean_stock_name_series(names: "pd.Series") -> "pd.Series":
+    """
+    clean_stock_name 的整列版本
+
+    Args:
+        names: 股票名称列（缺失值视为空字符串）
+
+    Returns:
+        pd.Series: 清理后的名称列
+    """
+    return names.fillna('').astype(str).str.replace(_CONTROL_CHARS, '', regex=True).str.strip()
+
+
+def validate_chinese_name_series(names: "pd.Series") -> "pd.Series":
+    """
+    validate_chinese_name 的整列版本
+
+    Args:
+        names: 股票名称列
+
+    Returns:
+        pd.Series: 布尔列，名称有效（无乱码且包含中文）为 True
+    """
+    names = names.fillna('').astype(str)
+    return names.str.contains(_CHINESE, regex=True) & ~names.str.contains(_MOJIBAKE, regex=True)
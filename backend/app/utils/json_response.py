@@ -0,0 +1,110 @@
+"""
+JSON 响应渲染
+
+默认响应类使用 orjson 渲染（C 实现，原生支持 datetime/date/UUID 和 numpy 标量），
+仅 Decimal 需要经过 default 回调转换为 float。
+未安装 orjson 时回退到标准库 json + CustomJSONEncoder。
+
+与改动前的标准库渲染（allow_nan=False）的差异：NaN / Infinity 不再抛出 ValueError（接口返回 500），
+orjson 输出为 null。未安装 orjson 的回退路径仍然抛出。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from json import JSONEncoder
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为 requirements 中的依赖
+    orjson = None
+
+
+class CustomJSONEncoder(JSONEncoder):
+    """自定义 JSON 编码器，将 Decimal 转换为 float，日期转换为 ISO 格式"""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    """标准库 json 序列化（每个 Decimal 都会回调一次 Python 层 default）"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        cls=CustomJSONEncoder,
+    ).encode("utf-8")
+
+
+class CustomJSONResponse(JSONResponse):
+    """自定义 JSON Response，使用标准库 json + 自定义编码器"""
+    def render(self, content) -> bytes:
+        return _stdlib_dumps(content)
+
+
+def _orjson_default(obj: Any) -> Any:
+    """orjson 不支持的类型回调（与 CustomJSONEncoder 行为一致）"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if orjson is not None else 0
+)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    序列化为 UTF-8 JSON 字节串
+
+    orjson 可用时走快速路径，否则使用 CustomJSONEncoder
+
+    Args:
+        content: 待序列化内容
+
+    Returns:
+        bytes: JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTIONS)
+    return _stdlib_dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    高吞吐 JSON Response（默认响应类）
+
+    与 CustomJSONResponse 输出兼容：紧凑分隔符、非 ASCII 字符不转义、Decimal 转 float；
+    例外是 NaN / Infinity 输出为 null（CustomJSONResponse 抛出 ValueError）
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def prebuilt_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """
+    直接渲染已按响应模型结构组装好的数据
+
+    跳过 FastAPI 对 response_model 的二次校验，用于只读列表接口的轻量路径。
+    先经 pydantic_core.to_jsonable_python 转换（Rust 实现），
+    Decimal/datetime 的输出格式与 response_model 序列化保持一致。
+
+    Args:
+        content: 字典或字典列表
+        status_code: HTTP 状态码
+
+    Returns:
+        FastJSONResponse
+    """
+    return FastJSONResponse(content=to_jsonable_python(content), status_code=status_code)
@@ -0,0 +1,330 @@
+"""
+Prometheus 指标采集
+
+提供进程内指标注册表和各类埋点工具，由 /metrics 端点以 Prometheus 文本格式导出：
+- HTTP 请求延迟（按路由模板）
+- 每个请求的数据库查询次数和耗时
+- 外部 API 调用（EfinanceClient / TushareService）的延迟、错误和重试次数
+- Redis 缓存命中/未命中（按键族）
+- 定时任务执行耗时
+"""
+import asyncio
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, List, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# 独立注册表，避免与第三方库默认注册表中的指标混在一起
+registry = CollectorRegistry(auto_describe=True)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 请求处理耗时（秒）",
+    ["method", "route", "status"],
+    registry=registry,
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "单个 HTTP 请求执行的 SQL 语句数",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+    registry=registry,
+)
+
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "单个 HTTP 请求的 SQL 执行总耗时（秒）",
+    ["route"],
+    registry=registry,
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "单条 SQL 语句执行耗时（秒），包含请求外（定时任务等）的查询",
+    registry=registry,
+)
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "外部 API 调用耗时（秒），包含重试等待",
+    ["service", "method", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    registry=registry,
+)
+
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors",
+    "外部 API 调用最终失败次数",
+    ["service", "method", "error_type"],
+    registry=registry,
+)
+
+EXTERNAL_CALL_RETRIES = Counter(
+    "external_call_retries",
+    "外部 API 调用重试次数",
+    ["service", "method"],
+    registry=registry,
+)
+
+EXTERNAL_CALL_RETRIES_DENIED = Counter(
+    "external_call_retries_denied",
+    "外部 API 调用放弃重试次数（deadline：请求时间预算不足；budget：重试预算耗尽；event_loop：在事件循环线程中）",
+    ["service", "method", "reason"],
+    registry=registry,
+)
+
+QUOTE_SOURCE_LATENCY = Histogram(
+    "quote_source_latency_seconds",
+    "实时行情数据源单次调用耗时（秒），包含对冲中被丢弃的调用",
+    ["source", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30),
+    registry=registry,
+)
+
+QUOTE_HEDGE_OUTCOMES = Counter(
+    "quote_hedge_outcomes",
+    "实时行情对冲请求结果（winner：胜出的数据源；mode：primary 主数据源直接返回 / hedged 启动了后备数据源 / failed 全部失败）",
+    ["winner", "mode"],
+    registry=registry,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Redis 缓存读取次数（按键族和结果）",
+    ["family", "result"],
+    registry=registry,
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "定时任务执行耗时（秒）",
+    ["job", "status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800),
+    registry=registry,
+)
+
+
+# ========== 数据库查询 ==========
+
+class RequestDBStats:
+    """单个请求内的 SQL 执行统计（通过 ContextVar 在线程池中共享）"""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_db_stats() -> Optional[RequestDBStats]:
+    """获取当前请求的 SQL 统计（请求外返回 None）"""
+    return _request_db_stats.get()
+
+
+# 每条 SQL 执行后的回调 (statement, 耗时)：在同一组游标事件上做额外分析（如 sql_profiler），不再重复计时
+QueryListener = Callable[[str, float], None]
+_query_listeners: List[QueryListener] = []
+
+
+def add_query_listener(listener: QueryListener) -> None:
+    """注册 SQL 执行回调（重复注册只生效一次）"""
+    if listener not in _query_listeners:
+        _query_listeners.append(listener)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERY_DURATION.observe(elapsed)
+
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    for listener in _query_listeners:
+        try:
+            listener(statement, elapsed)
+        except Exception as e:
+            logger.warning(f"[Metrics] SQL 执行回调失败: {e}")
+
+
+def instrument_engine(engine) -> None:
+    """
+    在 SQLAlchemy Engine 上注册游标执行事件，统计 SQL 次数和耗时，并调用 add_query_listener 注册的回调
+
+    每个 Engine 只注册一次（重复调用无效）；异步引擎传入 async_engine.sync_engine。
+    """
+    from sqlalchemy import event
+
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ========== HTTP 请求 ==========
+
+def _route_template(app, scope) -> str:
+    """解析请求对应的路由模板（如 /api/funds/{fund_id}），避免按原始路径产生高基数标签"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "<unknown>")
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件：记录每个 HTTP 请求的耗时和 SQL 统计
+
+    WebSocket 等非 HTTP 连接直接透传。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestDBStats()
+        token = _request_db_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db_stats.reset(token)
+
+            route = _route_template(scope["app"], scope) if "app" in scope else "<unknown>"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.duration)
+
+
+# ========== 外部 API 调用 ==========
+
+@contextmanager
+def track_external_call(service: str, method: str):
+    """
+    记录一次外部 API 调用的耗时和错误
+
+    Example:
+        with track_external_call("TushareService", "fund_portfolio"):
+            df = self.pro.fund_portfolio(ts_code=fund_code)
+    """
+    from .retry_helper import APICallError, classify_error
+
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        error_type = e.error_type if isinstance(e, APICallError) else classify_error(e)
+        EXTERNAL_CALL_DURATION.labels(service, method, "error").observe(time.perf_counter() - start)
+        EXTERNAL_CALL_ERRORS.labels(service, method, error_type).inc()
+        raise
+    EXTERNAL_CALL_DURATION.labels(service, method, "success").observe(time.perf_counter() - start)
+
+
+def record_external_retry(service: str, method: str) -> None:
+    """记录一次外部 API 调用重试"""
+    EXTERNAL_CALL_RETRIES.labels(service, method).inc()
+
+
+def record_external_retry_denied(service: str, method: str, reason: str) -> None:
+    """记录一次被放弃的重试（reason: deadline / budget / event_loop）"""
+    EXTERNAL_CALL_RETRIES_DENIED.labels(service, method, reason).inc()
+
+
+def split_qualname(func: Callable) -> tuple:
+    """把函数限定名拆成 (service, method)，如 EfinanceClient.get_base_info"""
+    qualname = getattr(func, "__qualname__", func.__name__)
+    if "." in qualname:
+        service, method = qualname.rsplit(".", 1)
+        return service, method
+    return func.__module__.rsplit(".", 1)[-1], qualname
+
+
+# ========== 缓存 ==========
+
+_CACHE_FAMILY_SEGMENT = re.compile(r"^[a-z_]+$")
+
+
+def cache_family(key: str) -> str:
+    """
+    提取缓存键族：取键开头的纯字母段（最多 3 段）
+
+    fund:nav:latest:000001 → fund:nav:latest
+    stock:name:600519.SH → stock:name
+    """
+    family = []
+    for segment in key.split(":")[:3]:
+        if not _CACHE_FAMILY_SEGMENT.match(segment):
+            break
+        family.append(segment)
+    return ":".join(family) or "<other>"
+
+
+def record_cache_lookup(key: str, hit: bool) -> None:
+    """记录一次缓存读取结果"""
+    CACHE_REQUESTS.labels(cache_family(key), "hit" if hit else "miss").inc()
+
+
+# ========== 定时任务 ==========
+
+def track_job_duration(job: str):
+    """定时任务装饰器：记录任务执行耗时（支持同步和异步函数）"""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                status = "error"
+                try:
+                    result = await func(*args, **kwargs)
+                    status = "success"
+                    return result
+                finally:
+                    SCHEDULER_JOB_DURATION.labels(job, status).observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = func(*args, **kwargs)
+                status = "success"
+                return result
+            finally:
+                SCHEDULER_JOB_DURATION.labels(job, status).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -4,9 +4,11 @@ Redis client wrapper with connection pooling and error handling
 提供 Redis 连接管理和缓存操作工具
 """
 import logging
+import threading
 import redis
-from typing import Optional, Any, List
+from typing import Optional, Any, Dict, Iterable, List, Set
 from ..config import settings
+from .metrics import record_cache_lookup
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +26,23 @@ class RedisClient:
     """
 
     def __init__(self):
-        """初始化 Redis 客户端连接池"""
+        """初始化 Redis 客户端（连接延迟到首次使用时建立）"""
         self._pool: Optional[redis.ConnectionPool] = None
         self._client: Optional[redis.Redis] = None
-        self._initialize()
+        self._initialized = False
+        self._init_lock = threading.Lock()
 
     def _initialize(self):
-        """初始化 Redis 连接"""
+        """
+        初始化 Redis 连接（在 _init_lock 内调用）
+
+        连接池和客户端先在局部变量中创建并 PING，成功后才赋给 self._client；
+        _initialized 最后设置，其他线程看到 _initialized 为 True 时 _client 已是最终状态
+        """
+        pool = None
         try:
             # 创建连接池
-            self._pool = redis.ConnectionPool(
+            pool = redis.ConnectionPool(
                 host=settings.REDIS_HOST,
                 port=settings.REDIS_PORT,
                 db=settings.REDIS_DB,
@@ -45,12 +54,12 @@ class RedisClient:
                 health_check_interval=30,
             )
 
-            # 创建 Redis 客户端
-            self._client = redis.Redis(connection_pool=self._pool)
-
-            # 测试连接
-            self._client.ping()
+            # 创建 Redis 客户端并测试连接
+            client = redis.Redis(connection_pool=pool)
+            client.ping()
 
+            self._pool = pool
+            self._client = client
             logger.info(
                 f"[RedisClient] 成功连接到 Redis: {settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
             )
@@ -58,20 +67,27 @@ class RedisClient:
         except redis.ConnectionError as e:
             logger.error(f"[RedisClient] Redis 连接失败: {e}")
             logger.warning("[RedisClient] 缓存功能将被禁用")
-            self._client = None
+            if pool is not None:
+                pool.disconnect()
         except Exception as e:
             logger.error(f"[RedisClient] Redis 初始化失败: {e}")
-            self._client = None
+            if pool is not None:
+                pool.disconnect()
+        finally:
+            self._initialized = True
 
     def is_available(self) -> bool:
-        """检查 Redis 是否可用"""
-        if self._client is None:
-            return False
-        try:
-            self._client.ping()
-            return True
-        except Exception:
-            return False
+        """
+        检查 Redis 是否可用
+
+        只在首次调用时建立连接并 PING；之后不再逐次 PING，
+        连接健康由连接池的 health_check_interval 负责，单次命令失败由各方法自行降级
+        """
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._initialize()
+        return self._client is not None
 
     def get(self, key: str) -> Optional[str]:
         """
@@ -88,6 +104,7 @@ class RedisClient:
 
         try:
             value = self._client.get(key)
+            record_cache_lookup(key, value is not None)
             return value
         except Exception as e:
             logger.error(f"[RedisClient] 获取缓存失败: key={key}, error={e}")
@@ -138,6 +155,8 @@ class RedisClient:
 
         try:
             values = self._client.mget(keys)
+            for key, value in zip(keys, values):
+                record_cache_lookup(key, value is not None)
             return list(values)  # 转换为列表
         except Exception as e:
             logger.error(f"[RedisClient] 批量获取缓存失败: keys={keys}, error={e}")
@@ -158,41 +177,64 @@ class RedisClient:
             return False
 
         try:
-            # 批量设置
-            self._client.mset(mapping)
-
-            # 如果需要设置过期时间
             if ttl:
-                pipe = self._client.pipeline()
-                for key in mapping.keys():
-                    pipe.expire(key, ttl)
+                # 带过期时间：SET EX 放在同一个管道里，一次往返
+                pipe = self._client.pipeline(transaction=False)
+                for key, value in mapping.items():
+                    pipe.set(key, value, ex=ttl)
                 pipe.execute()
+            else:
+                self._client.mset(mapping)
 
             return True
         except Exception as e:
             logger.error(f"[RedisClient] 批量设置缓存失败: error={e}")
             return False
 
-    def delete(self, key: str) -> bool:
+    def delete(self, *keys: str) -> bool:
         """
         删除缓存
 
         Args:
-            key: 缓存键
+            keys: 缓存键（可传入多个）
 
         Returns:
             是否删除成功
         """
-        if not self.is_available():
+        if not self.is_available() or not keys:
             return False
 
         try:
-            self._client.delete(key)
+            self._client.delete(*keys)
             return True
         except Exception as e:
-            logger.error(f"[RedisClient] 删除缓存失败: key={key}, error={e}")
+            logger.error(f"[RedisClient] 删除缓存失败: keys={keys}, error={e}")
             return False
 
+    def set_nx_many(self, keys: List[str], ttl: int, value: str = "1") -> List[bool]:
+        """
+        批量 SET NX（一个管道），用作短期锁
+
+        Args:
+            keys: 键列表
+            ttl: 过期时间（秒）
+            value: 写入的值
+
+        Returns:
+            每个键是否设置成功；Redis 不可用时全部视为成功（退化为进程内去重）
+        """
+        if not self.is_available() or not keys:
+            return [True] * len(keys)
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(key, value, nx=True, ex=ttl)
+            return [bool(ok) for ok in pipe.execute()]
+        except Exception as e:
+            logger.error(f"[RedisClient] 批量 SET NX 失败: keys={keys[:5]}, error={e}")
+            return [True] * len(keys)
+
     def exists(self, key: str) -> bool:
         """
         检查键是否存在
@@ -234,6 +276,213 @@ class RedisClient:
             logger.error(f"[RedisClient] 批量删除失败: pattern={pattern}, error={e}")
             return 0
 
+    def expire(self, key: str, ttl: int) -> bool:
+        """
+        设置键的过期时间
+
+        Args:
+            key: 缓存键
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否设置成功
+        """
+        if not self.is_available():
+            return False
+
+        try:
+            return bool(self._client.expire(key, ttl))
+        except Exception as e:
+            logger.error(f"[RedisClient] 设置过期时间失败: key={key}, error={e}")
+            return False
+
+    def scan_keys(self, pattern: str) -> List[str]:
+        """
+        增量扫描匹配模式的键（SCAN，不阻塞 Redis）
+
+        Args:
+            pattern: 键模式（如 "fund:intraday:*"）
+
+        Returns:
+            匹配的键列表
+        """
+        if not self.is_available():
+            return []
+
+        try:
+            return list(self._client.scan_iter(match=pattern, count=500))
+        except Exception as e:
+            logger.error(f"[RedisClient] 扫描键失败: pattern={pattern}, error={e}")
+            return []
+
+    def xadd(
+        self,
+        key: str,
+        fields: dict[str, Any],
+        maxlen: Optional[int] = None,
+        ttl: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        向 Stream 追加一条记录
+
+        Args:
+            key: Stream 键
+            fields: 字段字典
+            maxlen: 最大长度（近似裁剪，作为环形缓冲区使用）
+            ttl: 过期时间（秒）
+
+        Returns:
+            记录 ID，失败返回 None
+        """
+        if not self.is_available():
+            return None
+
+        try:
+            pipe = self._client.pipeline()
+            pipe.xadd(key, fields, maxlen=maxlen, approximate=True)
+            if ttl:
+                pipe.expire(key, ttl)
+            return pipe.execute()[0]
+        except Exception as e:
+            logger.error(f"[RedisClient] Stream 追加失败: key={key}, error={e}")
+            return None
+
+    def xrange(self, key: str, start: str = "-", end: str = "+") -> List[tuple]:
+        """
+        读取 Stream 区间记录
+
+        Args:
+            key: Stream 键
+            start: 起始 ID（默认最早）
+            end: 结束 ID（默认最新）
+
+        Returns:
+            [(记录 ID, 字段字典), ...]
+        """
+        if not self.is_available():
+            return []
+
+        try:
+            return self._client.xrange(key, min=start, max=end)
+        except Exception as e:
+            logger.error(f"[RedisClient] Stream 读取失败: key={key}, error={e}")
+            return []
+
+    def hset_many(self, key: str, mapping: Dict[str, str]) -> bool:
+        """
+        批量设置哈希字段
+
+        Args:
+            key: 哈希键
+            mapping: 字段到值的映射
+
+        Returns:
+            是否设置成功
+        """
+        if not self.is_available() or not mapping:
+            return False
+
+        try:
+            self._client.hset(key, mapping=mapping)
+            return True
+        except Exception as e:
+            logger.error(f"[RedisClient] 批量设置哈希字段失败: key={key}, error={e}")
+            return False
+
+    def hmget(self, key: str, fields: List[str]) -> List[Optional[str]]:
+        """
+        批量读取哈希字段
+
+        Args:
+            key: 哈希键
+            fields: 字段列表
+
+        Returns:
+            字段值列表，顺序与 fields 一致，不存在的字段为 None
+        """
+        if not self.is_available() or not fields:
+            return [None] * len(fields)
+
+        try:
+            return list(self._client.hmget(key, fields))
+        except Exception as e:
+            logger.error(f"[RedisClient] 批量读取哈希字段失败: key={key}, error={e}")
+            return [None] * len(fields)
+
+    def sadd_many(self, mapping: Dict[str, Iterable[str]], ttl: Optional[int] = None) -> bool:
+        """
+        批量向集合添加成员（一个管道）
+
+        Args:
+            mapping: 集合键到成员列表的映射
+            ttl: 集合的过期时间（秒），每次添加时刷新
+
+        Returns:
+            是否执行成功
+        """
+        if not self.is_available() or not mapping:
+            return False
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, members in mapping.items():
+                members = list(members)
+                if not members:
+                    continue
+                pipe.sadd(key, *members)
+                if ttl:
+                    pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"[RedisClient] 批量添加集合成员失败: keys={list(mapping)[:5]}, error={e}")
+            return False
+
+    def smembers_many(self, keys: List[str]) -> List[Set[str]]:
+        """
+        批量读取集合成员（一个管道）
+
+        Args:
+            keys: 集合键列表
+
+        Returns:
+            与 keys 顺序一致的成员集合列表，失败时返回空集合
+        """
+        if not self.is_available() or not keys:
+            return [set() for _ in keys]
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.smembers(key)
+            return [set(members) for members in pipe.execute()]
+        except Exception as e:
+            logger.error(f"[RedisClient] 批量读取集合失败: keys={keys[:5]}, error={e}")
+            return [set() for _ in keys]
+
+    def publish(self, channel: str, message: str) -> bool:
+        """
+        发布消息到频道
+
+        Returns:
+            是否发布成功
+        """
+        if not self.is_available():
+            return False
+
+        try:
+            self._client.publish(channel, message)
+            return True
+        except Exception as e:
+            logger.error(f"[RedisClient] 发布消息失败: channel={channel}, error={e}")
+            return False
+
+    def pubsub(self):
+        """创建 PubSub 对象（忽略订阅确认消息），Redis 不可用时返回 None"""
+        if not self.is_available():
+            return None
+        return self._client.pubsub(ignore_subscribe_messages=True)
+
     def close(self):
         """关闭 Redis 连接"""
         if self._pool:
@@ -1,15 +1,34 @@
 """
 Retry utility for API calls with exponential backoff and error classification
 
-提供带指数退避的重试装饰器，用于处理外部 API 调用的临时故障。
+提供带指数退避的重试装饰器，用于处理外部 API 调用的临时故障：
+- 按错误类型的重试策略（RetryPolicy）：超时 / 连接错误重试，限流少量重试，其余直接失败
+- 请求时间预算（deadline）：通过 ContextVar 从请求入口传递到每次调用，
+  剩余时间不足以等待下一次退避时放弃重试
+- 重试预算（RetryBudget）：按服务统计最近窗口内的调用量，重试次数不超过调用量的一定比例，
+  外部服务整体故障时不会因重试把请求量放大数倍
+- 协程函数使用 asyncio.sleep 等待；同步函数在事件循环线程中被调用时不做阻塞等待
 """
+import asyncio
+import inspect
 import time
 import logging
 import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from functools import wraps
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Dict, Optional
 import requests
-from requests.exceptions import Timeout, ConnectionError, RequestException
+from requests.exceptions import Timeout, ConnectionError, RequestException, HTTPError
+
+from ..config import settings
+from .metrics import (
+    EXTERNAL_CALL_DURATION, EXTERNAL_CALL_ERRORS,
+    record_external_retry, record_external_retry_denied, split_qualname,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +43,7 @@ class APICallError(Exception):
         original_error: Optional[Exception] = None
     ):
         self.message = message
-        self.error_type = error_type  # 'timeout', 'connection', 'http_error', 'other'
+        self.error_type = error_type  # 'timeout', 'connection', 'rate_limit', 'http_error', 'other'
         self.original_error = original_error
         super().__init__(self.message)
 
@@ -61,6 +80,22 @@ def is_connection_error(error: Exception) -> bool:
     return isinstance(error, ConnectionError) or 'connection' in str(error).lower()
 
 
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check if error is a rate limit (HTTP 429) error
+
+    Args:
+        error: Exception to check
+
+    Returns:
+        True if error is a rate limit error
+    """
+    response = getattr(error, 'response', None)
+    if isinstance(error, HTTPError) and response is not None and response.status_code == 429:
+        return True
+    return 'too many requests' in str(error).lower()
+
+
 def classify_error(error: Exception) -> str:
     """
     Classify error type for appropriate handling
@@ -69,10 +104,12 @@ def classify_error(error: Exception) -> str:
         error: Exception to classify
 
     Returns:
-        Error type string: 'timeout', 'connection', 'http_error', 'other'
+        Error type string: 'timeout', 'connection', 'rate_limit', 'http_error', 'other'
     """
     if is_timeout_error(error):
         return 'timeout'
+    elif is_rate_limit_error(error):
+        return 'rate_limit'
     elif is_connection_error(error):
         return 'connection'
     elif isinstance(error, RequestException):
@@ -81,22 +118,212 @@ def classify_error(error: Exception) -> str:
         return 'other'
 
 
+# ========== Deadline budget ==========
+
+_deadline: ContextVar[Optional[float]] = ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Bound retries of all API calls made in this context to `seconds` from now
+
+    Nested deadlines can only shrink the budget. `None` or a non-positive value
+    leaves the current deadline unchanged.
+
+    Example:
+        with deadline(3):
+            efinance_client.get_realtime_increase_rate(codes)
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current deadline, None if no deadline is set"""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+class RequestDeadlineMiddleware:
+    """
+    ASGI middleware: give every HTTP request a retry deadline of REQUEST_DEADLINE_SECONDS
+
+    The deadline is a ContextVar, so it follows the request into the threadpool
+    where sync endpoints run. The first attempt of every call is always made;
+    only retries are skipped once the budget can no longer cover the backoff.
+    """
+
+    def __init__(self, app, seconds: Optional[float] = None):
+        self.app = app
+        self.seconds = settings.REQUEST_DEADLINE_SECONDS if seconds is None else seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.seconds):
+            await self.app(scope, receive, send)
+
+
+# ========== Retry policies ==========
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry behaviour for one error type
+
+    Args:
+        max_retries: Maximum number of retry attempts (0 = fail immediately)
+        backoff_base: Base backoff time in seconds, doubled on every attempt
+        backoff_max: Upper bound of a single backoff in seconds
+        jitter: Add random jitter (0 to 50% of backoff_base) to avoid thundering herd
+    """
+    max_retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 8.0
+    jitter: bool = True
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff before retry number `attempt + 1`"""
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        if self.jitter:
+            backoff += random.uniform(0, 0.5 * self.backoff_base)
+        return backoff
+
+
+NO_RETRY = RetryPolicy(max_retries=0)
+
+
+def default_policies(
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    backoff_max: float = 8.0,
+    jitter: bool = True
+) -> Dict[str, RetryPolicy]:
+    """
+    Default per-error-type policies
+
+    - timeout / connection: transient, retried with exponential backoff
+    - rate_limit: retried once with a doubled backoff (more retries only deepen throttling)
+    - http_error / other: not retried
+    """
+    transient = RetryPolicy(max_retries, backoff_base, backoff_max, jitter)
+    return {
+        'timeout': transient,
+        'connection': transient,
+        'rate_limit': RetryPolicy(min(1, max_retries), backoff_base * 2, backoff_max, jitter),
+        'http_error': NO_RETRY,
+        'other': NO_RETRY,
+    }
+
+
+# ========== Retry budget ==========
+
+class RetryBudget:
+    """
+    Sliding-window retry budget shared by all calls to one service
+
+    Within the last `window` seconds, retries may not exceed
+    `ratio` × calls + `min_per_second` × window. When the upstream service is
+    down every call fails, the budget runs out and calls fail after the first
+    attempt instead of multiplying the load by max_retries + 1.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window: int = 10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._buckets: deque = deque()  # [second, calls, retries]
+        self._lock = threading.Lock()
+
+    def _bucket(self) -> list:
+        now = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_call(self) -> None:
+        """Count one call (first attempt)"""
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def try_spend(self) -> bool:
+        """Reserve one retry, False if the budget is exhausted"""
+        with self._lock:
+            bucket = self._bucket()
+            calls = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries >= self.ratio * calls + self.min_per_second * self.window:
+                return False
+            bucket[2] += 1
+            return True
+
+
+_budgets: Dict[str, RetryBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_retry_budget(service: str) -> RetryBudget:
+    """Retry budget for a service, created from settings on first use"""
+    budget = _budgets.get(service)
+    if budget is None:
+        with _budgets_lock:
+            budget = _budgets.setdefault(service, RetryBudget(
+                ratio=settings.RETRY_BUDGET_RATIO,
+                min_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND,
+                window=settings.RETRY_BUDGET_WINDOW,
+            ))
+    return budget
+
+
+def _on_event_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+# ========== Decorator ==========
+
 def retry_with_backoff(
     max_retries: int = 3,
     backoff_base: float = 1.0,
     retry_on_timeout: bool = True,
     retry_on_connection_error: bool = True,
-    jitter: bool = True
+    jitter: bool = True,
+    backoff_max: float = 8.0,
+    policies: Optional[Dict[str, RetryPolicy]] = None,
+    use_budget: bool = True
 ):
     """
     Decorator for retrying API calls with exponential backoff
 
+    Works on both plain and coroutine functions (the latter sleep with asyncio.sleep).
+    A retry is skipped when the error type's policy is exhausted, the current
+    deadline cannot cover the backoff, or the service's retry budget is spent.
+
     Args:
-        max_retries: Maximum number of retry attempts (default: 3)
+        max_retries: Maximum number of retry attempts for transient errors (default: 3)
         backoff_base: Base backoff time in seconds (default: 1.0)
         retry_on_timeout: Whether to retry on timeout errors (default: True)
         retry_on_connection_error: Whether to retry on connection errors (default: True)
         jitter: Add random jitter to backoff to avoid thundering herd (default: True)
+        backoff_max: Upper bound of a single backoff in seconds (default: 8.0)
+        policies: Per-error-type overrides of the default policies
+        use_budget: Whether retries draw from the service's shared RetryBudget
 
     Returns:
         Decorated function with retry logic
@@ -106,48 +333,105 @@ def retry_with_backoff(
         def fetch_data(url):
             return requests.get(url)
     """
+    resolved = default_policies(max_retries, backoff_base, backoff_max, jitter)
+    if not retry_on_timeout:
+        resolved['timeout'] = NO_RETRY
+    if not retry_on_connection_error:
+        resolved['connection'] = NO_RETRY
+    resolved.update(policies or {})
+
     def decorator(func: Callable) -> Callable:
+        service, method = split_qualname(func)
+        budget = get_retry_budget(service) if use_budget else None
+
+        def next_backoff(error: Exception, error_type: str, attempt: int, blocking: bool) -> Optional[float]:
+            """Backoff before the next attempt, or None to give up"""
+            policy = resolved.get(error_type, NO_RETRY)
+            if attempt >= policy.max_retries:
+                return None
+
+            backoff = policy.backoff(attempt)
+            denied = None
+            remaining = remaining_time()
+            if blocking and _on_event_loop_thread():
+                denied = 'event_loop'
+            elif remaining is not None and remaining < backoff:
+                denied = 'deadline'
+            elif budget is not None and not budget.try_spend():
+                denied = 'budget'
+
+            if denied:
+                record_external_retry_denied(service, method, denied)
+                logger.warning(
+                    f"[Retry] {func.__name__} attempt {attempt + 1} failed ({error_type}): {str(error)}. "
+                    f"Not retrying: {denied}"
+                    + (f" (remaining {remaining:.2f}s < backoff {backoff:.2f}s)" if denied == 'deadline' else "")
+                )
+                return None
+
+            logger.warning(
+                f"[Retry] {func.__name__} attempt {attempt + 1}/{policy.max_retries + 1} "
+                f"failed ({error_type}): {str(error)}. "
+                f"Retrying in {backoff:.2f}s..."
+            )
+            record_external_retry(service, method)
+            return backoff
+
+        def give_up(error: Exception, error_type: str, attempt: int, start: float) -> APICallError:
+            EXTERNAL_CALL_DURATION.labels(service, method, "error").observe(time.perf_counter() - start)
+            EXTERNAL_CALL_ERRORS.labels(service, method, error_type).inc()
+
+            # Log final error and raise
+            logger.error(
+                f"[Retry] {func.__name__} failed after {attempt + 1} attempts: "
+                f"error_type={error_type}, error={str(error)}"
+            )
+            return APICallError(
+                message=f"{func.__name__} failed: {str(error)}",
+                error_type=error_type,
+                original_error=error
+            )
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                start = time.perf_counter()
+                if budget is not None:
+                    budget.record_call()
+                attempt = 0
+                while True:
+                    try:
+                        result = await func(*args, **kwargs)
+                        EXTERNAL_CALL_DURATION.labels(service, method, "success").observe(time.perf_counter() - start)
+                        return result
+                    except Exception as e:
+                        error_type = classify_error(e)
+                        backoff = next_backoff(e, error_type, attempt, blocking=False)
+                        if backoff is None:
+                            raise give_up(e, error_type, attempt, start) from e
+                        await asyncio.sleep(backoff)
+                        attempt += 1
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            for attempt in range(max_retries + 1):
+            start = time.perf_counter()
+            if budget is not None:
+                budget.record_call()
+            attempt = 0
+            while True:
                 try:
-                    return func(*args, **kwargs)
-
+                    result = func(*args, **kwargs)
+                    EXTERNAL_CALL_DURATION.labels(service, method, "success").observe(time.perf_counter() - start)
+                    return result
                 except Exception as e:
                     error_type = classify_error(e)
-
-                    # Determine if we should retry
-                    should_retry = False
-                    if attempt < max_retries:
-                        if error_type == 'timeout' and retry_on_timeout:
-                            should_retry = True
-                        elif error_type == 'connection' and retry_on_connection_error:
-                            should_retry = True
-
-                    if not should_retry:
-                        # Log final error and raise
-                        logger.error(
-                            f"[Retry] {func.__name__} failed after {attempt + 1} attempts: "
-                            f"error_type={error_type}, error={str(e)}"
-                        )
-                        raise APICallError(
-                            message=f"{func.__name__} failed: {str(e)}",
-                            error_type=error_type,
-                            original_error=e
-                        ) from e
-
-                    # Calculate backoff with exponential increase and optional jitter
-                    backoff = backoff_base * (2 ** attempt)
-                    if jitter:
-                        # Add random jitter: 0 to 50% of base backoff
-                        backoff += random.uniform(0, 0.5 * backoff_base)
-
-                    logger.warning(
-                        f"[Retry] {func.__name__} attempt {attempt + 1}/{max_retries + 1} "
-                        f"failed ({error_type}): {str(e)}. "
-                        f"Retrying in {backoff:.2f}s..."
-                    )
+                    backoff = next_backoff(e, error_type, attempt, blocking=True)
+                    if backoff is None:
+                        raise give_up(e, error_type, attempt, start) from e
                     time.sleep(backoff)
+                    attempt += 1
 
         return wrapper
     return decorator
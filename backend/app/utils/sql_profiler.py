@@ -0,0 +1,149 @@
+"""
+SQL 查询分析中间件（按需开启：SQL_PROFILER_ENABLED）
+
+复用 metrics.instrument_engine 注册的游标执行事件（每条语句只计时一次），统计每个请求执行的语句：
+- 语句数和总耗时
+- 按语句形状（参数和 IN 列表归一化后的 SQL）分组，执行次数达到阈值的形状标记为重复（疑似 N+1）
+- 请求总耗时超过 SQL_PROFILER_SLOW_REQUEST_MS 或存在重复形状时，记录包含查询明细的告警日志
+- DEBUG 模式下通过响应头 X-DB-Queries / X-DB-Time 返回统计结果
+"""
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from .metrics import add_query_listener
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\?|:\w+|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER_LITERAL = re.compile(r"\b\d+\b")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    归一化 SQL 语句：参数占位符和字面量替换为 ?，IN 列表折叠为 (?)
+
+    SELECT ... WHERE id = %(id_1)s      → SELECT ... WHERE id = ?
+    SELECT ... WHERE id IN (?, ?, ?)    → SELECT ... WHERE id IN (?)
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class QueryProfile:
+    """单个请求的 SQL 统计"""
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, List[float]] = {}  # shape → [次数, 总耗时]
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.duration += elapsed
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int, float]]:
+        """执行次数达到 threshold 的语句形状，按次数降序"""
+        repeated = [(shape, int(n), t) for shape, (n, t) in self.shapes.items() if n >= threshold]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def top_shapes(self, limit: int) -> List[Tuple[str, int, float]]:
+        """总耗时最高的语句形状"""
+        ranked = [(shape, int(n), t) for shape, (n, t) in self.shapes.items()]
+        return sorted(ranked, key=lambda item: item[2], reverse=True)[:limit]
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_query_profile", default=None)
+
+
+def _record_statement(statement: str, elapsed: float) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+
+
+def install_sql_profiler() -> None:
+    """把语句计入当前请求的 QueryProfile（Engine 需经 metrics.instrument_engine 注册游标执行事件）"""
+    add_query_listener(_record_statement)
+
+
+_SELECT_COLUMNS = re.compile(r"^SELECT .+? FROM ")
+
+
+def _truncate(shape: str, width: int = 200) -> str:
+    """日志展示用：省略 SELECT 列清单，保留 FROM / WHERE 部分"""
+    shape = _SELECT_COLUMNS.sub("SELECT … FROM ", shape, count=1)
+    return shape if len(shape) <= width else shape[:width - 3] + "..."
+
+
+class SQLProfilerMiddleware:
+    """
+    ASGI 中间件：为每个 HTTP 请求建立 QueryProfile，请求结束后输出慢请求 / 重复语句告警
+
+    Configuration:
+        - SQL_PROFILER_SLOW_REQUEST_MS: 慢请求阈值（毫秒）
+        - SQL_PROFILER_REPEAT_THRESHOLD: 同一语句形状执行次数达到该值时标记为重复
+        - DEBUG: 开启时在响应头中返回 X-DB-Queries / X-DB-Time
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.slow_request_seconds = settings.SQL_PROFILER_SLOW_REQUEST_MS / 1000
+        self.repeat_threshold = settings.SQL_PROFILER_REPEAT_THRESHOLD
+        self.expose_headers = settings.DEBUG
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.expose_headers:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.count).encode()))
+                headers.append((b"x-db-time", f"{profile.duration * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_profile.reset(token)
+            self._report(scope, profile, elapsed)
+
+    def _report(self, scope, profile: QueryProfile, elapsed: float):
+        repeated = profile.repeated_shapes(self.repeat_threshold)
+        is_slow = elapsed >= self.slow_request_seconds
+        if not repeated and not is_slow:
+            return
+
+        request = f"{scope['method']} {scope['path']}"
+        lines = [
+            f"[SQLProfiler] {'慢请求' if is_slow else '重复查询'} {request}: "
+            f"总耗时 {elapsed * 1000:.1f}ms，SQL {profile.count} 条 / {profile.duration * 1000:.1f}ms"
+        ]
+        for shape, count, total in repeated:
+            lines.append(f"  重复 ×{count} ({total * 1000:.1f}ms): {_truncate(shape)}")
+        if is_slow:
+            for shape, count, total in profile.top_shapes(5):
+                lines.append(f"  耗时 {total * 1000:.1f}ms ×{count}: {_truncate(shape)}")
+        logger.warning("\n".join(lines))
@@ -0,0 +1,264 @@
+"""
+Stale-while-revalidate 缓存
+
+Redis 中保存 {"at": 写入时间戳, "value": 值}，键的过期时间为 hard TTL，
+soft TTL 默认取 hard TTL × CACHE_SOFT_TTL_RATIO：
+- 数据年龄 < soft TTL：直接返回
+- soft TTL ≤ 年龄 < hard TTL：立即返回旧值，同时在后台线程刷新
+  （同一个键在进程内和跨进程都只会有一个刷新任务，跨进程通过 Redis SET NX 锁去重）
+- 键不存在（超过 hard TTL 或从未缓存）：调用方同步加载
+
+value 为 None 表示"没有数据"的空值缓存，使用单独的（较短的）TTL，只在同步加载时写入。
+后台刷新失败或加载结果为 None 时保留旧值，直到 hard TTL 过期。
+
+每个请求读取到的缓存数据年龄汇总在 ContextVar 中，
+FreshnessMiddleware 把其中最大的年龄写入响应头 X-Data-Age（秒）。
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from ..config import settings
+from .cache_invalidation import track_keys
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    """缓存条目：值和写入时间（Unix 时间戳）"""
+    value: Any
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.stored_at)
+
+
+def soft_ttl_for(hard_ttl: float) -> float:
+    """按 CACHE_SOFT_TTL_RATIO 计算 soft TTL"""
+    return hard_ttl * settings.CACHE_SOFT_TTL_RATIO
+
+
+# ========== 响应数据年龄 ==========
+
+class Freshness:
+    """单个请求读取到的缓存数据的最大年龄"""
+
+    __slots__ = ("max_age",)
+
+    def __init__(self):
+        self.max_age: Optional[float] = None
+
+    def record(self, age: float):
+        if self.max_age is None or age > self.max_age:
+            self.max_age = age
+
+
+_request_freshness: ContextVar[Optional[Freshness]] = ContextVar("request_freshness", default=None)
+
+
+def record_data_age(age: float) -> None:
+    """把本次读取的数据年龄计入当前请求（不在请求内时忽略）"""
+    freshness = _request_freshness.get()
+    if freshness is not None:
+        freshness.record(age)
+
+
+class FreshnessMiddleware:
+    """ASGI 中间件：响应头 X-Data-Age 返回本次请求使用的缓存数据的最大年龄（秒；新加载的数据为 0，未读取缓存时不返回）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        freshness = Freshness()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and freshness.max_age is not None:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-data-age", str(int(freshness.max_age)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_freshness.set(freshness)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_freshness.reset(token)
+
+
+# ========== 缓存读写 ==========
+
+class SWRCache:
+    """基于 RedisClient 的 stale-while-revalidate 缓存"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[CacheEntry]:
+        """解析缓存值；旧格式（无时间戳）的值视为未命中"""
+        if not raw:
+            return None
+        try:
+            payload = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        if not isinstance(payload, dict) or "at" not in payload:
+            return None
+        return CacheEntry(payload.get("value"), payload["at"])
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps({"at": time.time(), "value": value}, ensure_ascii=False, default=str)
+
+    def read(self, key: str) -> Optional[CacheEntry]:
+        if not redis_client.is_available():
+            return None
+        return self._decode(redis_client.get(key))
+
+    def read_many(self, keys: List[str]) -> List[Optional[CacheEntry]]:
+        if not redis_client.is_available():
+            return [None] * len(keys)
+        return [self._decode(raw) for raw in redis_client.mget(keys)]
+
+    def write(self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()) -> None:
+        """写入缓存；tags 为失效标签（见 cache_invalidation），对应数据库写入提交后删除该键"""
+        if redis_client.is_available():
+            redis_client.set(key, self._encode(value), ttl=ttl)
+            track_keys(tags, [key])
+
+    def write_many(self, mapping: Dict[str, Any], ttl: int) -> None:
+        if mapping and redis_client.is_available():
+            redis_client.mset({key: self._encode(value) for key, value in mapping.items()}, ttl=ttl)
+
+    def refresh_in_background(self, keys: Iterable[str], refresh: Callable[[List[str]], None]) -> List[str]:
+        """
+        在后台线程中刷新 keys（只刷新当前没有刷新任务的键）
+
+        Args:
+            keys: 需要刷新的缓存键
+            refresh: 刷新函数，接收实际需要刷新的键列表，负责加载并写回缓存
+
+        Returns:
+            List[str]: 本次实际提交刷新的键
+        """
+        with self._lock:
+            candidates = [key for key in dict.fromkeys(keys) if key not in self._inflight]
+            self._inflight.update(candidates)
+        if not candidates:
+            return []
+
+        # 跨进程去重：其他进程正在刷新的键跳过
+        acquired = redis_client.set_nx_many(
+            [f"swr:refresh:{key}" for key in candidates], ttl=settings.SWR_REFRESH_LOCK_TTL
+        )
+        claimed = [key for key, ok in zip(candidates, acquired) if ok]
+        skipped = [key for key, ok in zip(candidates, acquired) if not ok]
+        if skipped:
+            self._release(skipped, redis_lock=False)
+        if not claimed:
+            return []
+
+        def run():
+            try:
+                refresh(claimed)
+            except Exception as e:
+                logger.warning(f"[SWR缓存] 后台刷新失败，保留旧值: {claimed[:5]}, error={e}")
+            finally:
+                self._release(claimed, redis_lock=True)
+
+        self._get_executor().submit(run)
+        return claimed
+
+    def _release(self, keys: List[str], redis_lock: bool):
+        with self._lock:
+            self._inflight.difference_update(keys)
+        if redis_lock:
+            redis_client.delete(*[f"swr:refresh:{key}" for key in keys])
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.SWR_REFRESH_WORKERS, thread_name_prefix="swr-refresh"
+                    )
+        return self._executor
+
+    def get(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int,
+        null_ttl: Optional[int] = None,
+        soft_ttl: Optional[float] = None,
+        background_loader: Optional[Callable[[], Any]] = None,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        """
+        读取单个键，按 soft / hard TTL 决定直接返回、返回旧值并后台刷新或同步加载
+
+        Args:
+            key: 缓存键
+            loader: 加载函数，返回可 JSON 序列化的值；None 表示没有数据
+            ttl: hard TTL（秒）
+            null_ttl: 空值的 hard TTL（默认与 ttl 相同）
+            soft_ttl: soft TTL（默认 ttl × CACHE_SOFT_TTL_RATIO）
+            background_loader: 后台刷新使用的加载函数（默认同 loader；loader 依赖请求内资源时需要单独提供）
+            tags: 失效标签
+
+        Returns:
+            缓存或新加载的值（同步加载时 loader 的异常向上抛出）
+        """
+        null_ttl = ttl if null_ttl is None else null_ttl
+        entry = self.read(key)
+        if entry is not None:
+            entry_soft_ttl = soft_ttl_for(null_ttl) if entry.value is None else (
+                soft_ttl if soft_ttl is not None else soft_ttl_for(ttl)
+            )
+            age = entry.age
+            record_data_age(age)
+            if age >= entry_soft_ttl:
+                logger.debug(f"[SWR缓存] 过期（{age:.0f}s），返回旧值并后台刷新: {key}")
+                refresh_loader = background_loader or loader
+                if entry.value is None:
+                    refresh = lambda _: self._load_and_store(key, refresh_loader, ttl, null_ttl, tags)
+                else:
+                    refresh = lambda _: self._refresh_value(key, refresh_loader, ttl, tags)
+                self.refresh_in_background([key], refresh)
+            return entry.value
+
+        value = self._load_and_store(key, loader, ttl, null_ttl, tags)
+        record_data_age(0)
+        return value
+
+    def _load_and_store(
+        self, key: str, loader: Callable[[], Any], ttl: int, null_ttl: int, tags: Iterable[str] = ()
+    ) -> Any:
+        value = loader()
+        self.write(key, value, ttl if value is not None else null_ttl, tags)
+        return value
+
+    def _refresh_value(self, key: str, loader: Callable[[], Any], ttl: int, tags: Iterable[str] = ()) -> None:
+        """后台刷新已有数据的键：加载结果为 None（如上游返回空数据）时不覆盖旧值"""
+        value = loader()
+        if value is None:
+            logger.info(f"[SWR缓存] 后台刷新没有返回数据，保留旧值: {key}")
+            return
+        self.write(key, value, ttl, tags)
+
+
+# 全局单例
+swr_cache = SWRCache()
@@ -0,0 +1,140 @@
+"""
+批量估算涨跌幅基准：逐只请求（旧的降级循环）vs 单次全量请求 vs 分批并发请求
+
+    python -m benchmarks.batch_estimates
+    python -m benchmarks.batch_estimates --funds 120 --rtt-ms 80 --per-code-ms 4
+    python -m benchmarks.batch_estimates --live --codes 161725,005827,110011   # 访问真实接口
+
+三种模式都走 efinance_client.get_realtime_increase_rate（EfinanceClient 重试包装 + efinance 解析）：
+- per_fund：逐只调用 FundDataFetcher.get_fund_realtime_valuation（旧的 _append_efinance_fallback 行为）
+- single_batch：所有基金一次请求
+- chunked：FundDataFetcher.get_realtime_estimates（按 FUND_ESTIMATE_* 配置分批并发）
+
+离线模式替换 efinance 的 HTTP 会话：按请求中的基金代码生成 FundMNFInfo 格式的响应，
+耗时按 RTT + 基金数 × 每只基金的服务端耗时 模拟。
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List
+
+from app.config import settings
+from app.services.fund_fetcher import FundDataFetcher
+
+
+class _StubResponse:
+    def __init__(self, body: bytes):
+        self.content = body
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SimulatedSession:
+    """efinance fund_session 的离线替身：记录请求次数并模拟接口耗时"""
+
+    def __init__(self, rtt_ms: float, per_code_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.per_code = per_code_ms / 1000
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, data=None, **kwargs):
+        codes = [code for code in (data or {}).get("Fcodes", "").split(",") if code]
+        body = json.dumps({"Datas": [{
+            "FCODE": code, "SHORTNAME": f"基金{code}", "ACCNAV": "1.2345", "PDATE": "2024-05-30",
+            "GZTIME": "2024-05-31 14:30", "GSZZL": "0.42",
+        } for code in codes], "ErrCode": 0, "Success": True}, ensure_ascii=False).encode()
+        time.sleep(self.rtt + len(codes) * self.per_code)
+        with self._lock:
+            self.requests += 1
+        return _StubResponse(body)
+
+
+class RecordingSession:
+    """包装真实会话，记录请求次数"""
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = 0
+
+    def get(self, *args, **kwargs):
+        self.requests += 1
+        return self.session.get(*args, **kwargs)
+
+
+def _per_fund(fund_codes: List[str]) -> int:
+    return sum(1 for code in fund_codes if FundDataFetcher.get_fund_realtime_valuation(code))
+
+
+def _single_batch(fund_codes: List[str]) -> int:
+    original = (settings.FUND_ESTIMATE_BATCH_SIZE, settings.FUND_ESTIMATE_FETCH_CONCURRENCY)
+    settings.FUND_ESTIMATE_BATCH_SIZE, settings.FUND_ESTIMATE_FETCH_CONCURRENCY = len(fund_codes), 1
+    try:
+        return len(FundDataFetcher.get_realtime_estimates(fund_codes))
+    finally:
+        settings.FUND_ESTIMATE_BATCH_SIZE, settings.FUND_ESTIMATE_FETCH_CONCURRENCY = original
+
+
+def _chunked(fund_codes: List[str]) -> int:
+    return len(FundDataFetcher.get_realtime_estimates(fund_codes))
+
+
+def run_mode(fn: Callable[[List[str]], int], fund_codes: List[str], session, repeat: int) -> Dict[str, float]:
+    latencies = []
+    session.requests = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = fn(fund_codes)
+        latencies.append(time.perf_counter() - start)
+        assert found == len(fund_codes), f"只获取到 {found}/{len(fund_codes)} 只基金的估值"
+    return {
+        "requests": session.requests / repeat,
+        "p50": statistics.median(latencies) * 1000,
+        "max": max(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量估算涨跌幅基准（逐只 vs 单次 vs 分批并发）")
+    parser.add_argument("--funds", type=int, default=40, help="离线模式：基金数量")
+    parser.add_argument("--codes", default="161725,005827,110011,000001,519674", help="--live 模式的基金代码（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式重复次数")
+    parser.add_argument("--rtt-ms", type=float, default=60, help="离线模式：网络往返耗时（毫秒）")
+    parser.add_argument("--per-code-ms", type=float, default=3, help="离线模式：每只基金的服务端耗时（毫秒）")
+    parser.add_argument("--live", action="store_true", help="访问真实接口")
+    args = parser.parse_args()
+
+    import efinance.fund.getter as getter
+
+    original_session = getter.fund_session
+    if args.live:
+        fund_codes = [code.strip() for code in args.codes.split(",") if code.strip()]
+        session = RecordingSession(original_session)
+        print("模式: live（真实接口）")
+    else:
+        fund_codes = [f"{i:06d}" for i in range(1, args.funds + 1)]
+        session = SimulatedSession(args.rtt_ms, args.per_code_ms)
+        print(f"模式: 离线模拟（RTT {args.rtt_ms:.0f} ms，每只基金 {args.per_code_ms:.1f} ms）")
+
+    chunks = [len(chunk) for chunk in FundDataFetcher._chunk_codes(fund_codes)]
+    getter.fund_session = session
+    try:
+        results = {
+            "per_fund": run_mode(_per_fund, fund_codes, session, args.repeat),
+            "single_batch": run_mode(_single_batch, fund_codes, session, args.repeat),
+            "chunked": run_mode(_chunked, fund_codes, session, args.repeat),
+        }
+    finally:
+        getter.fund_session = original_session
+
+    print(f"{len(fund_codes)} 只基金，分批: {chunks}（并发 {settings.FUND_ESTIMATE_FETCH_CONCURRENCY}）")
+    print(f"{'模式':<14}{'请求数':>8}{'p50 ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['requests']:>8.0f}{r['p50']:>10.1f}{r['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
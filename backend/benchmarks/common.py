@@ -0,0 +1,40 @@
+"""基准脚本公共工具"""
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.database import Base
+
+
+def create_sqlite_session_factory(path: str = ":memory:") -> sessionmaker:
+    """创建 SQLite 会话工厂并建表"""
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def create_async_session_factory(database_url: str, **engine_kwargs) -> async_sessionmaker:
+    """创建与同步连接串指向同一数据库的异步会话工厂（PostgreSQL 使用 asyncpg，SQLite 使用 aiosqlite）"""
+    url = make_url(database_url)
+    drivername = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}[url.get_backend_name()]
+    if url.get_backend_name() == "sqlite" and {"pool_size", "max_overflow"} & engine_kwargs.keys():
+        # aiosqlite 默认不使用连接池（NullPool）；指定连接池大小时改用队列连接池，结束前需 dispose 引擎
+        engine_kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+    engine = create_async_engine(url.set(drivername=drivername), **engine_kwargs)
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def timeit(func: Callable, repeat: int) -> float:
+    """返回单次调用的平均耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
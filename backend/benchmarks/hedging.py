@@ -0,0 +1,103 @@
+"""
+实时行情对冲请求基准：顺序降级 vs 对冲请求（本地桩数据源，不访问网络）
+
+    python -m benchmarks.hedging
+    python -m benchmarks.hedging --requests 500 --slow-ratio 0.1
+
+桩数据源模拟线上观察到的延迟分布：
+- primary（efinance）：大多数请求很快，少量请求长尾（--slow-ratio），极少数失败后才降级
+- secondary（Tushare）：稳定但整体更慢
+
+顺序模式等主数据源失败后再请求后备数据源；对冲模式在主数据源超过 p95 延迟未返回时
+并行请求后备数据源。两种模式各自使用独立的 LatencyTracker，对冲模式先用预热请求积累样本。
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from app.services.quote_hedging import LatencyTracker, QuoteHedger
+
+STOCK_CODES = ["600519.SH", "000001.SZ", "300750.SZ"]
+
+
+def make_source(name: str, latency: Callable[[random.Random], float], failure_ratio: float, seed: int):
+    rng = random.Random(seed)
+
+    def source(stock_codes: List[str]) -> Dict:
+        delay = latency(rng)
+        failed = rng.random() < failure_ratio
+        time.sleep(delay)
+        if failed:
+            return {}
+        return {code: {"code": code, "price": 10.0, "data_source": name} for code in stock_codes}
+    return source
+
+
+def summarize(label: str, latencies: List[float]):
+    values = sorted(v * 1000 for v in latencies)
+
+    def pct(p: float) -> float:
+        return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+    print(f"{label:<12}{statistics.median(values):>10.1f}{pct(95):>10.1f}{pct(99):>10.1f}{values[-1]:>10.1f}")
+
+
+def run(fetch: Callable[[], object], requests: int, concurrency: int) -> List[float]:
+    def one(_):
+        start = time.perf_counter()
+        fetch()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时行情对冲请求基准（本地桩数据源）")
+    parser.add_argument("--requests", type=int, default=300, help="每种模式的请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    parser.add_argument("--slow-ratio", type=float, default=0.06, help="主数据源长尾请求比例")
+    parser.add_argument("--failure-ratio", type=float, default=0.02, help="主数据源失败比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    def primary_latency(rng: random.Random) -> float:
+        if rng.random() < args.slow_ratio:
+            return rng.uniform(1.0, 2.5)
+        return rng.uniform(0.05, 0.15)
+
+    def secondary_latency(rng: random.Random) -> float:
+        return rng.uniform(0.2, 0.35)
+
+    def sources():
+        return [
+            ("primary", make_source("primary", primary_latency, args.failure_ratio, args.seed)),
+            ("secondary", make_source("secondary", secondary_latency, 0.0, args.seed + 1)),
+        ]
+
+    # 顺序降级：主数据源返回空数据后才请求后备数据源
+    sequential_tracker = LatencyTracker()
+    (primary_name, primary), (secondary_name, secondary) = sources()
+
+    def sequential():
+        return (sequential_tracker.measure(primary_name, primary, STOCK_CODES)
+                or sequential_tracker.measure(secondary_name, secondary, STOCK_CODES))
+
+    # 对冲：独立线程池，预热积累主数据源耗时样本
+    executor = ThreadPoolExecutor(max_workers=args.concurrency * 2)
+    hedger = QuoteHedger(sources(), tracker=LatencyTracker(), executor=executor)
+    run(lambda: hedger.fetch(STOCK_CODES), 50, args.concurrency)
+
+    print(f"请求数 {args.requests}，并发 {args.concurrency}，主数据源长尾 {args.slow_ratio:.0%}，失败 {args.failure_ratio:.0%}")
+    print(f"对冲延迟（primary p95）: {hedger.hedge_delay('primary') * 1000:.0f} ms")
+    print(f"{'模式':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    summarize("sequential", run(sequential, args.requests, args.concurrency))
+    summarize("hedged", run(lambda: hedger.fetch(STOCK_CODES), args.requests, args.concurrency))
+    executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+JSON 响应性能基准：完整响应路径上的 CustomJSONResponse (stdlib json) vs FastJSONResponse (orjson)
+
+通过 TestClient 请求返回相同数据的路由，计时包含 FastAPI 的 jsonable_encoder 转换、渲染和 ASGI 传输：
+
+    stdlib      default_response_class=CustomJSONResponse（改动前）
+    orjson      default_response_class=FastJSONResponse（当前默认）
+    prebuilt    prebuilt_response（to_jsonable_python + orjson，跳过 jsonable_encoder，只读列表接口使用；
+                与 response_model 序列化一致，Decimal 输出为字符串）
+
+jsonable_encoder 会先把 Decimal 转换为 float，因此只计时 render() 会高估默认响应类带来的提升。
+"""
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.json_response import CustomJSONResponse, FastJSONResponse, prebuilt_response
+
+from .common import timeit
+
+
+def build_nav_history(rows: int) -> list:
+    """净值历史（GET /api/nav/{code}/history）"""
+    start = date(2015, 1, 5)
+    return [
+        {
+            "id": i,
+            "fund_id": 1,
+            "date": (start + timedelta(days=i)).isoformat(),
+            "unit_nav": Decimal("1.2345") + Decimal(i) / 10000,
+            "accumulated_nav": Decimal("2.3456") + Decimal(i) / 10000,
+            "daily_growth": Decimal("0.0123"),
+            "created_at": datetime(2024, 1, 1).isoformat(),
+        }
+        for i in range(rows)
+    ]
+
+
+def build_portfolio_summary(funds: int, days: int) -> dict:
+    """投资组合汇总（GET /api/pnl/summary，含 daily_profits_history）"""
+    start = date(2020, 1, 1)
+    cumulative = 0.0
+    daily_profits = []
+    for i in range(days):
+        cumulative += 12.34
+        daily_profits.append({
+            "date": (start + timedelta(days=i)).isoformat(),
+            "profit": 12.34,
+            "cumulative": cumulative,
+        })
+    return {
+        "total_cost": Decimal("100000.00"),
+        "total_market_value": Decimal("112345.67"),
+        "total_profit": Decimal("12345.67"),
+        "total_profit_rate": Decimal("12.3457"),
+        "cumulative_profit": Decimal("12345.67"),
+        "daily_profits_history": daily_profits,
+        "fund_count": funds,
+        "funds": [
+            {
+                "fund_id": i,
+                "fund_code": f"{i:06d}",
+                "fund_name": f"测试基金{i}",
+                "amount": Decimal("10000.00"),
+                "shares": Decimal("8123.4567"),
+                "cost_price": Decimal("1.2310"),
+                "cost": Decimal("10000.00"),
+                "latest_nav": Decimal("1.3456"),
+                "market_value": Decimal("10931.12"),
+                "profit": Decimal("931.12"),
+                "profit_rate": Decimal("9.3112"),
+            }
+            for i in range(funds)
+        ],
+    }
+
+
+def build_batch_valuations(funds: int) -> dict:
+    """批量实时估值（POST /api/nav/realtime/batch-stock）"""
+    now = datetime.now().isoformat()
+    return {
+        "valuations": [
+            {
+                "fund_code": f"{i:06d}",
+                "data_source": "estimate",
+                "is_listed_fund": False,
+                "current_price": None,
+                "increase_rate": 1.23,
+                "estimate_time": now,
+                "latest_nav_date": "2024-01-02",
+                "latest_nav_unit_nav": 1.2345,
+            }
+            for i in range(funds)
+        ],
+        "update_time": now,
+        "is_trading_time": True,
+    }
+
+
+def build_client(payloads: dict) -> TestClient:
+    """每个场景注册 /stdlib/{i}、/orjson/{i}、/prebuilt/{i} 三个返回相同数据的路由"""
+    app = FastAPI()
+    for i, payload in payloads.items():
+        app.add_api_route(f"/stdlib/{i}", lambda payload=payload: payload, response_class=CustomJSONResponse)
+        app.add_api_route(f"/orjson/{i}", lambda payload=payload: payload, response_class=FastJSONResponse)
+        app.add_api_route(f"/prebuilt/{i}", lambda payload=payload: prebuilt_response(payload))
+    return TestClient(app)
+
+
+def bench(client: TestClient, path: str, repeat: int) -> float:
+    """返回单次请求的平均耗时（毫秒）"""
+    client.get(path)  # 预热
+    return timeit(lambda: client.get(path), repeat) * 1000
+
+
+def main():
+    cases = [
+        ("净值历史 100 条", build_nav_history(100), 300),
+        ("净值历史 1000 条", build_nav_history(1000), 50),
+        ("净值历史 10000 条", build_nav_history(10000), 5),
+        ("组合汇总 20 基金/250 天", build_portfolio_summary(20, 250), 200),
+        ("组合汇总 100 基金/2500 天", build_portfolio_summary(100, 2500), 10),
+        ("批量估值 50 只", build_batch_valuations(50), 300),
+        ("批量估值 1000 只", build_batch_valuations(1000), 30),
+    ]
+    client = build_client({i: payload for i, (_, payload, _) in enumerate(cases)})
+
+    print("=" * 84)
+    print("JSON 响应性能基准（完整响应路径，每次请求的平均耗时）")
+    print("=" * 84)
+    print(f"{'场景':<28}{'字节数':>10}{'stdlib(ms)':>12}{'orjson(ms)':>12}{'prebuilt(ms)':>14}{'提升':>8}")
+
+    for i, (name, payload, repeat) in enumerate(cases):
+        stdlib_body, orjson_body = (client.get(f"/{mode}/{i}").content for mode in ("stdlib", "orjson"))
+        # 两种默认响应类的输出应当语义一致
+        assert json.loads(orjson_body) == json.loads(stdlib_body), name
+        slow, fast, prebuilt = (bench(client, f"/{mode}/{i}", repeat) for mode in ("stdlib", "orjson", "prebuilt"))
+        speedup = slow / fast if fast > 0 else float("inf")
+        print(f"{name:<28}{len(orjson_body):>10}{slow:>12.3f}{fast:>12.3f}{prebuilt:>14.3f}{speedup:>7.1f}x")
+
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+最新净值获取基准：下载全部历史（旧行为）vs 只请求最新一页
+
+    python -m benchmarks.latest_nav
+    python -m benchmarks.latest_nav --history-rows 5000 --rtt-ms 60 --bandwidth-kbps 1000
+    python -m benchmarks.latest_nav --live --funds 161725,005827   # 访问真实接口
+
+两种模式都走完整的 FundDataFetcher._fetch_fund_nav 路径（EfinanceClient 重试包装 + efinance 解析），
+只切换 FUND_LATEST_NAV_PAGE_SIZE（0 = 下载全部历史）。
+
+离线模式替换 efinance 的 HTTP 会话：按请求的 pageSize 从合成的净值历史中生成
+FundMNHisNetList 格式的响应，并按 RTT + 响应字节数 / 带宽 模拟传输耗时；
+字节数为估算值（字段与线上响应一致，取值为合成数据）。
+--live 模式访问真实接口，统计实际响应字节数。
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from app.config import settings
+from app.services.fund_fetcher import FundDataFetcher
+
+PAGE_SIZE_FULL = 0
+
+
+class _StubResponse:
+    def __init__(self, body: bytes):
+        self.content = body
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _synthetic_history(rows: int) -> List[Dict]:
+    """合成净值历史（最新在前），字段与 FundMNHisNetList 响应一致"""
+    history = []
+    day = date(2024, 5, 31)
+    nav = 1.8
+    for i in range(rows):
+        history.append({
+            "FSRQ": day.isoformat(), "DWJZ": f"{nav:.4f}", "LJJZ": f"{nav + 1.1:.4f}",
+            "JZZZL": f"{(i % 7 - 3) * 0.31:.2f}", "SGZT": "开放申购", "SHZT": "开放赎回",
+            "FHFCZ": "", "FHFCBZ": "", "DTYPE": None, "FHSP": "", "NAVTYPE": "1",
+            "RATE": "", "SDATE": None, "ACTUALSYI": "", "ISBONUS": "0",
+        })
+        day -= timedelta(days=1 if day.weekday() else 3)
+        nav = max(0.5, nav - 0.001 * ((i % 5) - 2))
+    return history
+
+
+class SimulatedSession:
+    """efinance fund_session 的离线替身：记录响应字节数并模拟网络传输耗时"""
+
+    def __init__(self, history_rows: int, rtt_ms: float, bandwidth_kbps: float):
+        self.history = _synthetic_history(history_rows)
+        self.rtt = rtt_ms / 1000
+        self.bytes_per_second = bandwidth_kbps * 1024
+        self.bytes_received: List[int] = []
+
+    def get(self, url, headers=None, data=None, **kwargs):
+        page_size = int((data or {}).get("pageSize", 40000))
+        rows = self.history[:page_size]
+        body = json.dumps({
+            "Datas": rows, "ErrCode": 0, "Success": True, "ErrMsg": None,
+            "Message": None, "ErrorCode": "0", "ErrorMessage": None,
+            "ErrorMessageList": None, "TotalCount": len(self.history), "Expansion": None,
+        }, ensure_ascii=False).encode()
+        time.sleep(self.rtt + len(body) / self.bytes_per_second)
+        self.bytes_received.append(len(body))
+        return _StubResponse(body)
+
+
+class RecordingSession:
+    """包装真实会话，记录响应字节数"""
+
+    def __init__(self, session):
+        self.session = session
+        self.bytes_received: List[int] = []
+
+    def get(self, *args, **kwargs):
+        response = self.session.get(*args, **kwargs)
+        self.bytes_received.append(len(response.content))
+        return response
+
+
+def run_mode(fund_codes: List[str], page_size: int, session) -> Dict[str, float]:
+    original_page_size = settings.FUND_LATEST_NAV_PAGE_SIZE
+    settings.FUND_LATEST_NAV_PAGE_SIZE = page_size
+    session.bytes_received.clear()
+    latencies = []
+    try:
+        for fund_code in fund_codes:
+            start = time.perf_counter()
+            nav = FundDataFetcher._fetch_fund_nav(fund_code)
+            latencies.append(time.perf_counter() - start)
+            assert nav is not None, f"{fund_code} 没有净值"
+    finally:
+        settings.FUND_LATEST_NAV_PAGE_SIZE = original_page_size
+    return {
+        "bytes": statistics.mean(session.bytes_received),
+        "p50": statistics.median(latencies) * 1000,
+        "max": max(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="最新净值获取基准（全部历史 vs 最新一页）")
+    parser.add_argument("--funds", default="161725,005827,110011,000001,519674",
+                        help="基金代码（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=4, help="每只基金重复次数")
+    parser.add_argument("--history-rows", type=int, default=3000, help="离线模式：每只基金的历史净值条数")
+    parser.add_argument("--rtt-ms", type=float, default=40, help="离线模式：网络往返耗时（毫秒）")
+    parser.add_argument("--bandwidth-kbps", type=float, default=2048, help="离线模式：下行带宽（KB/s）")
+    parser.add_argument("--live", action="store_true", help="访问真实接口")
+    args = parser.parse_args()
+
+    import efinance.fund.getter as getter
+
+    original_session = getter.fund_session
+    if args.live:
+        session = RecordingSession(original_session)
+        print("模式: live（真实接口）")
+    else:
+        session = SimulatedSession(args.history_rows, args.rtt_ms, args.bandwidth_kbps)
+        print(f"模式: 离线模拟（历史 {args.history_rows} 条，RTT {args.rtt_ms:.0f} ms，带宽 {args.bandwidth_kbps:.0f} KB/s）")
+
+    fund_codes = [code.strip() for code in args.funds.split(",") if code.strip()] * args.repeat
+    getter.fund_session = session
+    try:
+        results = {
+            "full_history": run_mode(fund_codes, PAGE_SIZE_FULL, session),
+            f"latest_pz{settings.FUND_LATEST_NAV_PAGE_SIZE}": run_mode(
+                fund_codes, settings.FUND_LATEST_NAV_PAGE_SIZE, session
+            ),
+        }
+    finally:
+        getter.fund_session = original_session
+
+    print(f"每种模式 {len(fund_codes)} 次请求")
+    print(f"{'模式':<16}{'字节/基金':>14}{'p50 ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['bytes']:>14,.0f}{r['p50']:>10.1f}{r['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""只读列表接口性能基准：ORM 装配 + 二次校验 vs Core select 轻量路径（rows/sec）"""
+import warnings
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import crud, models, schemas
+from app.utils.json_response import prebuilt_response
+
+from .common import create_sqlite_session_factory, timeit
+
+# SQLite 不原生支持 Decimal，忽略 SQLAlchemy 的精度提示
+warnings.filterwarnings("ignore", message=".*Dialect sqlite\\+pysqlite does \\*not\\* support Decimal.*")
+
+
+def seed(db, fund_count: int, nav_days: int):
+    """写入基金、持仓、股票持仓和净值数据"""
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    for i in range(fund_count):
+        fund = models.Fund(
+            fund_code=f"{i:06d}", fund_name=f"测试基金{i}", fund_type="混合型",
+            created_at=now, updated_at=now,
+        )
+        db.add(fund)
+        db.flush()
+        db.add(models.Holding(
+            fund_id=fund.id, amount=Decimal("10000.00"), shares=Decimal("8000.0000"),
+            cost_price=Decimal("1.2500"), created_at=now, updated_at=now,
+        ))
+        for j in range(10):
+            db.add(models.FundStockPosition(
+                fund_id=fund.id, stock_code=f"{600000 + j}.SH", stock_name=f"股票{j}",
+                weight=Decimal("0.0500"), report_date=date(2024, 3, 31),
+                created_at=now, updated_at=now,
+            ))
+    db.flush()
+
+    start = date(2020, 1, 1)
+    db.bulk_insert_mappings(models.NavHistory, [
+        {
+            "fund_id": 1, "date": start + timedelta(days=d), "unit_nav": Decimal("1.2345"),
+            "accumulated_nav": Decimal("2.3456"), "daily_growth": Decimal("0.0012"), "created_at": now,
+        }
+        for d in range(nav_days)
+    ])
+    db.commit()
+
+
+def legacy_get_funds(db, limit: int):
+    """改造前的 GET /api/funds/ 实现（ORM + joinedload + 两次校验 + response_model 校验）"""
+    stock_positions_subquery = db.query(
+        models.FundStockPosition.fund_id,
+        func.count(models.FundStockPosition.id).label('count'),
+        func.max(models.FundStockPosition.updated_at).label('last_update')
+    ).group_by(models.FundStockPosition.fund_id).subquery()
+
+    funds = db.query(models.Fund)\
+        .options(joinedload(models.Fund.holdings))\
+        .outerjoin(stock_positions_subquery, models.Fund.id == stock_positions_subquery.c.fund_id)\
+        .add_columns(
+            stock_positions_subquery.c.count.label('stock_positions_count'),
+            stock_positions_subquery.c.last_update.label('stock_positions_updated_at')
+        )\
+        .limit(limit)\
+        .all()
+
+    result = []
+    for fund, stock_count, stock_updated in funds:
+        fund_dict = schemas.FundResponse.model_validate(fund).model_dump()
+        fund_dict['stock_positions_count'] = stock_count or 0
+        fund_dict['stock_positions_updated_at'] = stock_updated
+        result.append(schemas.FundResponse(**fund_dict))
+
+    # FastAPI 对 response_model 的再次校验与序列化
+    return [schemas.FundResponse.model_validate(r.model_dump()).model_dump(mode="json") for r in result]
+
+
+def legacy_get_nav_history(db, limit: int):
+    """改造前的 GET /api/nav/{code}/history 实现"""
+    navs = crud.get_nav_history(db, 1, limit=limit)
+    return [schemas.NavHistoryResponse.model_validate(n).model_dump(mode="json") for n in navs]
+
+
+def main():
+    fund_count = 1000
+    nav_days = 3650
+    SessionLocal = create_sqlite_session_factory()
+
+    with SessionLocal() as db:
+        seed(db, fund_count, nav_days)
+
+    cases = [
+        (
+            f"基金列表 {fund_count} 行",
+            fund_count,
+            lambda db: legacy_get_funds(db, fund_count),
+            lambda db: prebuilt_response(crud.get_funds_overview_rows(db, limit=fund_count)),
+        ),
+        (
+            f"净值历史 {nav_days} 行",
+            nav_days,
+            lambda db: legacy_get_nav_history(db, nav_days),
+            lambda db: prebuilt_response(crud.get_nav_history_rows(db, 1, limit=nav_days)),
+        ),
+    ]
+
+    print("=" * 72)
+    print("只读列表接口性能基准（SQLite 内存库）")
+    print("=" * 72)
+    print(f"{'场景':<22}{'改造前 rows/s':>16}{'轻量路径 rows/s':>18}{'提升':>8}")
+
+    for name, rows, legacy, lean in cases:
+        # 每次调用使用新会话，避免 identity map 复用掩盖 ORM 装配成本
+        def run(fn):
+            def call():
+                with SessionLocal() as db:
+                    fn(db)
+            return call
+
+        legacy_time = timeit(run(legacy), repeat=5)
+        lean_time = timeit(run(lean), repeat=5)
+        print(
+            f"{name:<22}{rows / legacy_time:>16,.0f}{rows / lean_time:>18,.0f}"
+            f"{legacy_time / lean_time:>7.1f}x"
+        )
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
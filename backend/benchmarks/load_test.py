@@ -0,0 +1,228 @@
+"""
+API 负载测试（Locust 风格的虚拟用户场景）
+
+    python -m benchmarks.generate_data --database-url sqlite:///loadtest.db --funds 1000
+    python -m benchmarks.load_test --database-url sqlite:///loadtest.db --users 50 --duration 60
+
+默认在进程内通过 ASGI 直接驱动 app.main:app：数据库使用 --database-url 指定的合成数据库，
+外部接口（efinance / Tushare）使用 benchmarks.replay 的回放客户端，Redis 关闭。
+指定 --base-url 时改为对已启动的服务发压（此时数据层由目标服务自身决定）。
+
+虚拟用户模拟前端页面的请求模式：
+- DashboardUser（Dashboard.vue）：打开时和每次刷新都请求一次 /api/dashboard（汇总、持仓、基金列表和估值），
+  即推送通道不可用时的轮询模式；/ws/realtime 推送不经过 HTTP，不在本脚本的统计范围内
+- FundListUser（FundList.vue）：打开时拉取基金列表 + 批量估值，之后刷新列表/估值，偶尔查看净值历史
+
+结束后按接口输出 p50 / p95 / p99 延迟、吞吐和错误数。
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+
+class Stats:
+    """按接口汇总的延迟统计"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, elapsed: float, ok: bool):
+        self.latencies[name].append(elapsed * 1000)
+        if not ok:
+            self.errors[name] += 1
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], pct: float) -> float:
+        index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+        return sorted_values[index]
+
+    def report(self, duration: float):
+        print("=" * 100)
+        print(f"{'接口':<42}{'请求数':>8}{'错误':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        print("-" * 100)
+        total = errors = 0
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            total += len(values)
+            errors += self.errors[name]
+            print(
+                f"{name:<42}{len(values):>8}{self.errors[name]:>6}{len(values) / duration:>9.1f}"
+                f"{statistics.median(values):>9.1f}{self._percentile(values, 95):>9.1f}"
+                f"{self._percentile(values, 99):>9.1f}{values[-1]:>9.1f}"
+            )
+        print("-" * 100)
+        print(f"{'合计':<42}{total:>8}{errors:>6}{total / duration:>9.1f}")
+        print("=" * 100)
+
+
+class User:
+    """虚拟用户基类：on_start 之后按权重随机执行任务，任务之间等待 wait_time 秒"""
+
+    weight = 1
+    wait_time: Tuple[float, float] = (1.0, 3.0)
+    tasks: Dict[str, int] = {}
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+
+    async def request(self, method: str, url: str, name: Optional[str] = None, **kwargs):
+        name = f"{method} {name or url}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            self.stats.record(name, time.perf_counter() - start, response.status_code < 400)
+            return response.json() if response.status_code < 400 else None
+        except httpx.HTTPError:
+            self.stats.record(name, time.perf_counter() - start, False)
+            return None
+
+    async def on_start(self):
+        pass
+
+    async def run(self, stop_at: float):
+        await self.on_start()
+        names = list(self.tasks)
+        weights = [self.tasks[n] for n in names]
+        while time.perf_counter() < stop_at:
+            await asyncio.sleep(self.rng.uniform(*self.wait_time))
+            if time.perf_counter() >= stop_at:
+                break
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+class DashboardUser(User):
+    """Dashboard.vue：打开时和每次刷新都请求组合接口 /api/dashboard（fundStore.fetchDashboard）"""
+
+    weight = 3
+    wait_time = (2.0, 5.0)
+    tasks = {"refresh_dashboard": 1}
+
+    async def on_start(self):
+        await self.refresh_dashboard()
+
+    async def refresh_dashboard(self):
+        await self.request("GET", "/api/dashboard")
+
+
+class FundListUser(User):
+    """FundList.vue：基金列表 + 列表内基金批量估值，偶尔查看净值历史"""
+
+    weight = 2
+    wait_time = (3.0, 8.0)
+    tasks = {"refresh_list": 2, "poll_valuations": 3, "view_nav_history": 1}
+
+    async def on_start(self):
+        await self.refresh_list()
+
+    async def refresh_list(self):
+        funds = await self.request("GET", "/api/funds/")
+        self.fund_codes = [f["fund_code"] for f in funds or []]
+        await self.poll_valuations()
+
+    async def poll_valuations(self):
+        if getattr(self, "fund_codes", None):
+            await self.request("POST", "/api/nav/realtime/batch-stock", json=self.fund_codes)
+
+    async def view_nav_history(self):
+        if getattr(self, "fund_codes", None):
+            code = self.rng.choice(self.fund_codes)
+            await self.request("GET", f"/api/nav/{code}/history", name="/api/nav/{fund_code}/history")
+
+
+USER_CLASSES = [DashboardUser, FundListUser]
+
+
+def build_inprocess_client(database_url: str) -> httpx.AsyncClient:
+    """进程内 ASGI 客户端：数据库指向合成数据库"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import get_async_db, get_db
+    from app.main import app
+    from app.services import dashboard
+
+    from .common import create_async_session_factory
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args, pool_size=20, max_overflow=20)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSessionLocal = create_async_session_factory(database_url)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # 看板各部分在线程池中自行创建会话（不经过 get_db），同样指向合成数据库
+    dashboard.SessionLocal = SessionLocal
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+
+
+async def run_load(client: httpx.AsyncClient, users: int, spawn_rate: float, duration: float, seed: int) -> Stats:
+    stats = Stats()
+    rng = random.Random(seed)
+    stop_at = time.perf_counter() + duration
+    tasks = []
+    async with client:
+        for i in range(users):
+            user_class = rng.choices(USER_CLASSES, [c.weight for c in USER_CLASSES])[0]
+            user = user_class(client, stats, random.Random(seed + i))
+            tasks.append(asyncio.create_task(user.run(stop_at)))
+            await asyncio.sleep(1 / spawn_rate)
+        await asyncio.gather(*tasks)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 负载测试（Dashboard / FundList 流量）")
+    parser.add_argument("--database-url", default="sqlite:///loadtest.db", help="进程内模式使用的合成数据库")
+    parser.add_argument("--base-url", default="", help="对已启动的服务发压（如 http://localhost:8000）")
+    parser.add_argument("--users", type=int, default=20, help="虚拟用户数")
+    parser.add_argument("--spawn-rate", type=float, default=10, help="每秒启动的用户数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        stubs = nullcontext()
+        target = args.base_url
+    else:
+        from .replay import stub_clients
+
+        client = build_inprocess_client(args.database_url)
+        stubs = stub_clients()
+        target = f"进程内 ASGI（{args.database_url}，回放数据）"
+
+    # 业务代码的 INFO 日志量很大，压测时只保留告警
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"压测目标: {target}")
+    print(f"虚拟用户: {args.users}，启动速率: {args.spawn_rate}/s，时长: {args.duration}s")
+    with stubs:
+        start = time.perf_counter()
+        stats = asyncio.run(run_load(client, args.users, args.spawn_rate, args.duration, args.seed))
+        stats.report(time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
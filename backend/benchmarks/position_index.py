@@ -0,0 +1,87 @@
+"""
+持仓反向索引基准：每次行情更新全量重算所有基金 vs 按变化的股票增量调整
+
+    python -m benchmarks.position_index
+    python -m benchmarks.position_index --funds 5000 --stocks-per-fund 10 --change-ratio 0.02
+
+全量重算与 calculate_fund_realtime_nav 的计算方式相同（逐只基金遍历持仓做加权和）；
+增量方式使用 PositionIndex.apply_quotes。纯内存计算，不访问数据库和行情接口。
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app.services.position_index import PositionIndex
+
+
+def _positions(funds: int, universe: int, per_fund: int) -> List[Tuple[str, str, float]]:
+    stocks = [f"{i:06d}.SZ" for i in range(universe)]
+    rows = []
+    for f in range(funds):
+        for stock_code in random.sample(stocks, per_fund):
+            rows.append((f"{f:06d}", stock_code, random.uniform(0.005, 0.1)))
+    return rows
+
+
+def _full_recompute(fund_positions: Dict[str, List[Tuple[str, float]]], quotes: Dict[str, dict]) -> Dict[str, float]:
+    result = {}
+    for fund_code, positions in fund_positions.items():
+        weighted = 0.0
+        for stock_code, weight in positions:
+            quote = quotes.get(stock_code)
+            if quote and quote.get("change_pct") is not None:
+                weighted += weight * (quote["change_pct"] / 100)
+        result[fund_code] = weighted * 100
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持仓反向索引基准（全量重算 vs 增量调整）")
+    parser.add_argument("--funds", type=int, default=1000, help="基金数量")
+    parser.add_argument("--universe", type=int, default=3000, help="股票池大小")
+    parser.add_argument("--stocks-per-fund", type=int, default=10, help="每只基金的持仓股票数")
+    parser.add_argument("--change-ratio", type=float, default=0.05, help="每次行情更新中涨跌幅变化的股票比例")
+    parser.add_argument("--ticks", type=int, default=50, help="行情更新次数")
+    args = parser.parse_args()
+
+    random.seed(42)
+    rows = _positions(args.funds, args.universe, args.stocks_per_fund)
+    fund_positions: Dict[str, List[Tuple[str, float]]] = {}
+    for fund_code, stock_code, weight in rows:
+        fund_positions.setdefault(fund_code, []).append((stock_code, weight))
+    stock_codes = sorted({stock_code for _, stock_code, _ in rows})
+
+    index = PositionIndex()
+    index.load(rows)
+    quotes = {code: {"change_pct": round(random.uniform(-5, 5), 2)} for code in stock_codes}
+    index.apply_quotes(quotes)
+
+    full_times, incremental_times, affected = [], [], []
+    changed_count = max(1, int(len(stock_codes) * args.change_ratio))
+    for _ in range(args.ticks):
+        for code in random.sample(stock_codes, changed_count):
+            quotes[code] = {"change_pct": round(random.uniform(-5, 5), 2)}
+
+        start = time.perf_counter()
+        expected = _full_recompute(fund_positions, quotes)
+        full_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        affected.append(len(index.apply_quotes(quotes)))
+        incremental_times.append(time.perf_counter() - start)
+
+    estimates = index.estimates()
+    drift = max(abs(estimates[code][0] - value) for code, value in expected.items())
+
+    print(f"{args.funds} 只基金 × {args.stocks_per_fund} 只持仓，股票 {len(stock_codes)} 只，"
+          f"每次更新 {changed_count} 只股票涨跌幅变化")
+    print(f"{'方式':<14}{'p50 ms':>10}{'max ms':>10}")
+    print(f"{'full':<14}{statistics.median(full_times) * 1000:>10.2f}{max(full_times) * 1000:>10.2f}")
+    print(f"{'incremental':<14}{statistics.median(incremental_times) * 1000:>10.2f}{max(incremental_times) * 1000:>10.2f}")
+    print(f"每次更新受影响的基金: 平均 {statistics.mean(affected):.0f} 只；与全量重算的最大偏差 {drift:.2e}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+共享内存行情看板基准：每个工作进程持有行情 DataFrame 并逐只匹配 vs 读取共享看板
+
+    python -m benchmarks.quote_board
+    python -m benchmarks.quote_board --rows 7000 --codes 200 --workers 8
+
+DataFrame 方式与 TushareService._get_efinance_realtime 的匹配方式相同（按股票代码逐只过滤）；
+看板方式先由写入方写入同样的行情，再由读取方按代码读取。
+内存按 DataFrame 的 memory_usage(deep=True) 与看板文件大小估算：DataFrame 每个工作进程一份，看板整台机器一份。
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.quote_board import QuoteBoard, QuoteBoardWriter, _layout_size
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    codes = [f"{i:06d}" for i in random.sample(range(1, 999999), rows)]
+    return pd.DataFrame({
+        "股票代码": codes,
+        "股票名称": [f"股票{code}" for code in codes],
+        "涨跌幅": np.round(np.random.uniform(-10, 10, rows), 2),
+        "最新价": np.round(np.random.uniform(1, 200, rows), 2),
+        "成交量": np.random.randint(1, 10 ** 7, rows),
+        "成交额": np.random.uniform(1e5, 1e10, rows),
+    })
+
+
+def _dataframe_lookup(df: pd.DataFrame, codes):
+    result = {}
+    for code in codes:
+        rows = df[df["股票代码"] == code.split(".")[0]]
+        if not rows.empty:
+            row = rows.iloc[0]
+            result[code] = {"price": float(row["最新价"]), "change_pct": float(row["涨跌幅"])}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享内存行情看板基准")
+    parser.add_argument("--rows", type=int, default=5500, help="全市场行情条数")
+    parser.add_argument("--codes", type=int, default=50, help="每次读取的代码数")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn 工作进程数（估算内存）")
+    parser.add_argument("--repeat", type=int, default=200, help="读取次数")
+    args = parser.parse_args()
+
+    random.seed(7)
+    np.random.seed(7)
+    df = _frame(args.rows)
+    path = os.path.join(tempfile.mkdtemp(), "quote_board")
+    writer = QuoteBoardWriter(path=path, capacity=max(16384, args.rows))
+    writer.open()
+    start = time.perf_counter()
+    writer.publish_frame(df)
+    publish_ms = (time.perf_counter() - start) * 1000
+    board = QuoteBoard(path=path)
+
+    requests = [
+        [f"{code}.SZ" for code in random.sample(df["股票代码"].tolist(), args.codes)]
+        for _ in range(args.repeat)
+    ]
+    assert board.read(requests[0]).keys() == _dataframe_lookup(df, requests[0]).keys()
+
+    timings = {}
+    for name, fn in (("dataframe", lambda codes: _dataframe_lookup(df, codes)), ("quote_board", board.read)):
+        latencies = []
+        for codes in requests:
+            start = time.perf_counter()
+            fn(codes)
+            latencies.append(time.perf_counter() - start)
+        timings[name] = latencies
+    writer.close()
+
+    df_bytes = df.memory_usage(deep=True).sum()
+    board_bytes = _layout_size(writer.capacity)
+    print(f"全市场 {args.rows} 条行情，每次读取 {args.codes} 个代码，写入看板耗时 {publish_ms:.1f} ms")
+    print(f"{'方式':<14}{'p50 ms':>10}{'max ms':>10}{'内存（{} 个工作进程）'.format(args.workers):>24}")
+    print(f"{'dataframe':<14}{statistics.median(timings['dataframe']) * 1000:>10.2f}"
+          f"{max(timings['dataframe']) * 1000:>10.2f}{df_bytes * args.workers / 1024:>20.0f} KB")
+    print(f"{'quote_board':<14}{statistics.median(timings['quote_board']) * 1000:>10.2f}"
+          f"{max(timings['quote_board']) * 1000:>10.2f}{board_bytes / 1024:>20.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Redis Streams 行情采集基准：请求时按需拉取（缓存未命中等待上游）vs 只读采集 worker 写入的最新行情
+
+    python -m benchmarks.quote_stream
+    python -m benchmarks.quote_stream --codes 200 --upstream-ms 800
+
+需要可用的 Redis（REDIS_HOST / REDIS_PORT），会写入 QUOTE_LATEST_KEY / QUOTE_STREAM_KEY 并在结束后删除。
+上游行情接口用 FakeQuoteProducer 加固定延迟模拟，不访问网络；request 模式每轮清空实时行情缓存，
+即缓存过期后第一个请求的延迟。
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from app.config import settings
+from app.services.quote_feed import FakeQuoteProducer, QuoteIngestion
+from app.services.quote_stream import RedisQuoteSink
+from app.services.tushare_service import tushare_service
+from app.utils.redis_client import redis_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis Streams 行情采集基准")
+    parser.add_argument("--codes", type=int, default=50, help="每次请求的股票数")
+    parser.add_argument("--upstream-ms", type=float, default=300, help="模拟的上游行情接口延迟（毫秒）")
+    parser.add_argument("--repeat", type=int, default=20, help="每种模式的请求次数")
+    args = parser.parse_args()
+
+    if not redis_client.is_available():
+        print("Redis 不可用，跳过")
+        return 1
+
+    codes = [f"{600000 + i:06d}.SH" for i in range(args.codes)]
+    producer = FakeQuoteProducer(codes)
+
+    def upstream(stock_codes):
+        time.sleep(args.upstream_ms / 1000)
+        quotes = producer()
+        return {code: {"code": code, **quotes[code.split(".")[0]]} for code in stock_codes}
+
+    service = tushare_service._get_instance()
+    service._fetch_realtime_quotes = upstream
+    cache_keys = [service._get_realtime_cache_key(code) for code in codes]
+
+    timings = {}
+    try:
+        settings.QUOTE_SOURCE = "request"
+        latencies = []
+        for _ in range(args.repeat):
+            redis_client.delete(*cache_keys)
+            start = time.perf_counter()
+            service.get_stock_realtime(codes)
+            latencies.append(time.perf_counter() - start)
+        timings["request"] = latencies
+
+        settings.QUOTE_SOURCE = "stream"
+        settings.QUOTE_INGEST_INTERVAL_TRADING = settings.QUOTE_INGEST_INTERVAL_NON_TRADING = 1
+        stop = threading.Event()
+        ingestion = QuoteIngestion(producer, [RedisQuoteSink()])
+        worker = threading.Thread(target=ingestion.run, args=(stop,), daemon=True)
+        worker.start()
+        time.sleep(0.5)
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = service.get_stock_realtime(codes)
+            latencies.append(time.perf_counter() - start)
+        assert len(result) == len(codes)
+        timings["stream"] = latencies
+        stop.set()
+        worker.join()
+    finally:
+        redis_client.delete(*cache_keys, settings.QUOTE_LATEST_KEY, settings.QUOTE_STREAM_KEY)
+
+    print(f"每次请求 {args.codes} 只股票，模拟上游延迟 {args.upstream_ms:.0f} ms")
+    print(f"{'模式':<12}{'p50 ms':>10}{'max ms':>10}")
+    for name, latencies in timings.items():
+        print(f"{name:<12}{statistics.median(latencies) * 1000:>10.2f}{max(latencies) * 1000:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
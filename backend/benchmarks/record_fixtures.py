@@ -0,0 +1,60 @@
+"""
+重新录制回放数据（需要网络和有效的 TUSHARE_TOKEN）
+
+    python -m benchmarks.record_fixtures [--fund-code 161725]
+
+调用真实的 efinance / Tushare 接口，把响应写入 benchmarks/fixtures/*.json。
+录制后请重新生成基线：python -m benchmarks.suite --update-baseline
+"""
+import argparse
+import json
+from typing import Callable
+
+import pandas as pd
+
+from .replay import FIXTURES_DIR
+
+
+def _dump(name: str, source: str, fetch: Callable[[], pd.DataFrame], limit: int = 0):
+    df = fetch()
+    if df is None or df.empty:
+        print(f"  ✗ {name}: 接口返回空数据，保留原 fixture")
+        return
+    if limit:
+        df = df.head(limit)
+    payload = json.loads(df.to_json(orient="split", index=False, force_ascii=False, date_format="iso"))
+    with open(FIXTURES_DIR / f"{name}.json", "w", encoding="utf-8") as f:
+        json.dump({"source": source, **payload}, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    print(f"  ✓ {name}: {len(df)} 行")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制 efinance / Tushare 回放数据")
+    parser.add_argument("--fund-code", default="161725", help="录制净值和持仓使用的基金代码")
+    parser.add_argument("--history-rows", type=int, default=250, help="历史净值保留条数")
+    args = parser.parse_args()
+
+    import efinance as ef
+    import tushare as ts
+    from app.config import settings
+
+    pro = ts.pro_api(settings.TUSHARE_TOKEN)
+    code = args.fund_code
+
+    print(f"录制回放数据 → {FIXTURES_DIR}")
+    _dump("efinance_quote_history", "efinance.fund.get_quote_history",
+          lambda: ef.fund.get_quote_history(code), limit=args.history_rows)
+    _dump("efinance_realtime_increase_rate", "efinance.fund.get_realtime_increase_rate",
+          lambda: ef.fund.get_realtime_increase_rate(code))
+    for market in ("ETF", "LOF"):
+        _dump(f"efinance_realtime_quotes_{market.lower()}", f"efinance.stock.get_realtime_quotes('{market}')",
+              lambda: ef.stock.get_realtime_quotes(market)[["股票代码", "股票名称", "涨跌幅", "最新价", "成交量", "成交额"]])
+    _dump("tushare_stock_basic", "tushare pro.stock_basic(exchange='', list_status='L')",
+          lambda: pro.stock_basic(exchange="", list_status="L", fields="ts_code,name,area,industry,list_date"))
+    _dump("tushare_fund_portfolio", f"tushare pro.fund_portfolio(ts_code='{code}.OF')",
+          lambda: pro.fund_portfolio(ts_code=f"{code}.OF"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+录制数据回放：用 benchmarks/fixtures/*.json 中录制的 efinance / Tushare 响应替换真实客户端
+
+fixture 文件格式（pandas orient="split"，不含索引）：
+    {"source": "<录制时调用的接口>", "columns": [...], "data": [[...], ...]}
+
+替换方式：
+- efinance：替换 efinance_client 的延迟导入模块（_ef_module），EfinanceClient 的重试包装仍然生效
+- Tushare：替换 tushare_service 代理背后的实例，只换掉 pro 接口对象，并关闭频率限制等待
+- Redis：标记为不可用，所有请求都走回放数据，结果不受缓存状态影响
+- 交易时间：固定为盘中，估值相关场景走完整的盘中路径
+"""
+import json
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional, Union
+
+import pandas as pd
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@lru_cache(maxsize=None)
+def _load_fixture(name: str) -> pd.DataFrame:
+    with open(FIXTURES_DIR / f"{name}.json", encoding="utf-8") as f:
+        payload = json.load(f)
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+
+def load_fixture(name: str) -> pd.DataFrame:
+    """加载 fixture 为 DataFrame（返回副本，调用方可以随意修改）"""
+    return _load_fixture(name).copy()
+
+
+class StubEfinanceFund:
+    """efinance.fund 的回放实现"""
+
+    def get_quote_history(self, fund_code: str, pz: Optional[int] = None) -> pd.DataFrame:
+        df = load_fixture("efinance_quote_history")
+        return df.head(pz) if pz else df
+
+    def get_realtime_increase_rate(self, fund_codes: Union[str, List[str]]) -> pd.DataFrame:
+        codes = [fund_codes] if isinstance(fund_codes, str) else list(fund_codes)
+        template = load_fixture("efinance_realtime_increase_rate").iloc[0]
+        rows = []
+        for code in codes:
+            row = template.copy()
+            row["基金代码"] = code
+            rows.append(row)
+        return pd.DataFrame(rows).reset_index(drop=True)
+
+
+class StubEfinanceStock:
+    """efinance.stock 的回放实现"""
+
+    def get_realtime_quotes(self, market_type: Optional[str] = None) -> pd.DataFrame:
+        if market_type in ("ETF", "LOF"):
+            return load_fixture(f"efinance_realtime_quotes_{market_type.lower()}")
+        return pd.DataFrame()
+
+
+class StubTusharePro:
+    """Tushare pro_api() 的回放实现"""
+
+    def fund_portfolio(self, ts_code: str, period: Optional[str] = None) -> pd.DataFrame:
+        df = load_fixture("tushare_fund_portfolio")
+        df["ts_code"] = ts_code
+        if period:
+            df = df[df["end_date"] == period].reset_index(drop=True)
+        return df
+
+    def stock_basic(self, **kwargs) -> pd.DataFrame:
+        return load_fixture("tushare_stock_basic")
+
+    def daily(self, **kwargs) -> pd.DataFrame:
+        return pd.DataFrame()
+
+
+def listed_fund_codes(limit: int) -> List[str]:
+    """录制行情中出现的场内基金代码（ETF 在前，LOF 在后）"""
+    codes = list(load_fixture("efinance_realtime_quotes_etf")["股票代码"])
+    codes += list(load_fixture("efinance_realtime_quotes_lof")["股票代码"])
+    return codes[:limit]
+
+
+@contextmanager
+def stub_clients():
+    """在上下文内用回放数据替换外部客户端，退出时恢复"""
+    from app.services import efinance_client as efinance_module
+    from app.services.fund_fetcher import FundDataFetcher
+    from app.services.tushare_service import TushareService, tushare_service
+    from app.utils.redis_client import redis_client
+
+    stub_service = TushareService.__new__(TushareService)
+    stub_service.pro = StubTusharePro()
+    stub_service.last_call_time = None
+    stub_service._name_memo, stub_service._name_memo_expires_at = {}, 0.0
+    stub_service._rate_limit_delay = lambda: None
+
+    saved = {
+        "ef_module": efinance_module._ef_module,
+        "tushare": tushare_service._instance,
+        "redis": (redis_client._initialized, redis_client._client),
+        "is_trading_time": FundDataFetcher.__dict__["is_trading_time"],
+    }
+
+    efinance_module._ef_module = SimpleNamespace(fund=StubEfinanceFund(), stock=StubEfinanceStock())
+    tushare_service._instance = stub_service
+    redis_client._initialized, redis_client._client = True, None
+    FundDataFetcher.is_trading_time = staticmethod(lambda: True)
+    try:
+        yield
+    finally:
+        efinance_module._ef_module = saved["ef_module"]
+        tushare_service._instance = saved["tushare"]
+        redis_client._initialized, redis_client._client = saved["redis"]
+        FundDataFetcher.is_trading_time = saved["is_trading_time"]
@@ -0,0 +1,399 @@
+"""
+离线基准套件：回放录制的 efinance / Tushare 响应，与 JSON 基线比较检测性能回退
+
+    python -m benchmarks.suite                      # 运行并与 baseline.json 比较，回退时退出码为 1
+    python -m benchmarks.suite --update-baseline    # 运行全部场景并写入新基线
+    python -m benchmarks.suite --only portfolio_summary --repeat 20
+
+每个场景使用独立的 SQLite 内存库，准备数据不计入耗时。外部接口由 benchmarks.replay
+中的回放客户端替代，Redis 关闭，因此结果可在无网络的 CI 中重复比较。
+
+回退判定：
+- SQL 语句数（确定性）：任一场景单次执行的语句数超过基线即为回退，退出码为 1
+- 耗时：各场景中位数除以紧接着该场景测得的参考负载中位数（相对耗时），抵消机器和负载差异；
+  相对耗时超过 基线 × (1 + tolerance) 时提示，只有指定 --strict-timing 时才计为回退
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import warnings
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+
+from app import crud, models
+from app.api import stock_positions
+from app.services import dashboard
+from app.services.fund_fetcher import FundDataFetcher
+from app.services.realtime_valuation import build_batch_stock_valuations
+
+from .common import create_sqlite_session_factory
+from .replay import listed_fund_codes, load_fixture, stub_clients
+
+# SQLite 不原生支持 Decimal，忽略 SQLAlchemy 的精度提示
+warnings.filterwarnings("ignore", message=".*Dialect sqlite\\+pysqlite does \\*not\\* support Decimal.*")
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+@dataclass
+class Scenario:
+    """基准场景：setup 准备数据库并返回被测函数（接收 db 会话）"""
+    name: str
+    description: str
+    setup: Callable
+
+
+def seed_portfolio(db, fund_count: int, nav_days: int = 30, listed_codes: List[str] = ()) -> List[models.Fund]:
+    """写入基金、持仓、近 nav_days 天净值和每日收益"""
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    listed_codes = list(listed_codes)
+    funds = []
+    for i in range(fund_count):
+        if i < len(listed_codes):
+            code, fund_type = listed_codes[i], "ETF"
+        else:
+            code, fund_type = f"{i:06d}", "混合型"
+        fund = models.Fund(fund_code=code, fund_name=f"测试基金{i}", fund_type=fund_type,
+                           created_at=now, updated_at=now)
+        db.add(fund)
+        funds.append(fund)
+    db.flush()
+
+    db.bulk_insert_mappings(models.Holding, [
+        {"fund_id": f.id, "amount": Decimal("10000.00"), "shares": Decimal("8000.0000"),
+         "cost_price": Decimal("1.2500"), "created_at": now, "updated_at": now}
+        for f in funds
+    ])
+    start = date(2024, 5, 31) - timedelta(days=nav_days - 1)
+    db.bulk_insert_mappings(models.NavHistory, [
+        {"fund_id": f.id, "date": start + timedelta(days=d), "unit_nav": Decimal("1.2345"),
+         "accumulated_nav": Decimal("2.3456"), "daily_growth": Decimal("0.0012"), "created_at": now}
+        for f in funds for d in range(nav_days)
+    ])
+    db.bulk_insert_mappings(models.DailyPnL, [
+        {"fund_id": f.id, "date": start + timedelta(days=d), "shares": Decimal("8000.0000"),
+         "unit_nav": Decimal("1.2345"), "market_value": Decimal("9876.00"), "cost": Decimal("10000.00"),
+         "profit": Decimal("-124.00"), "profit_rate": Decimal("-1.2400"), "created_at": now}
+        for f in funds for d in range(nav_days)
+    ])
+    db.commit()
+    return funds
+
+
+def _sync_funds(fund_count: int) -> Scenario:
+    def setup(db):
+        seed_portfolio(db, fund_count)
+        return lambda: crud.sync_all_funds(db)
+    return Scenario(f"sync_funds_{fund_count}", f"同步 {fund_count} 只基金最新净值并计算收益",
+                    setup)
+
+
+def _portfolio_summary(holding_count: int) -> Scenario:
+    def setup(db):
+        seed_portfolio(db, holding_count)
+        return lambda: dashboard.build_portfolio_summary(db)
+    return Scenario(f"portfolio_summary_{holding_count}", f"投资组合汇总（{holding_count} 个持仓）",
+                    setup)
+
+
+def _batch_realtime_valuation(fund_count: int) -> Scenario:
+    def setup(db):
+        # 四成场内基金（实时行情）+ 六成场外基金（估算涨跌幅）
+        funds = seed_portfolio(db, fund_count, listed_codes=listed_fund_codes(fund_count * 2 // 5))
+        codes = [f.fund_code for f in funds]
+        return lambda: build_batch_stock_valuations(db, codes)
+    return Scenario(f"batch_realtime_valuation_{fund_count}", f"批量盘中估值（{fund_count} 只基金）",
+                    setup)
+
+
+def _dashboard(holding_count: int) -> Scenario:
+    def setup(db):
+        seed_portfolio(db, holding_count, listed_codes=listed_fund_codes(holding_count * 2 // 5))
+
+        def run():
+            # 各部分缓存均未命中时的计算量（Redis 关闭，同一会话内顺序执行）
+            dashboard._load_portfolio(db)
+            dashboard._load_funds(db)
+            dashboard._load_valuations(db)
+        return run
+    return Scenario(f"dashboard_{holding_count}", f"首页看板全部部分（{holding_count} 个持仓，缓存未命中）",
+                    setup)
+
+
+def _position_sync(fund_count: int) -> Scenario:
+    def setup(db):
+        funds = seed_portfolio(db, fund_count, nav_days=1)
+        fund_ids = [f.id for f in funds]
+
+        def run():
+            for fund_id in fund_ids:
+                stock_positions.sync_fund_stock_positions(fund_id, db)
+        return run
+    return Scenario(f"position_sync_{fund_count}", f"同步 {fund_count} 只基金股票持仓（含股票名称查询）",
+                    setup)
+
+
+def _history_ingestion(fund_count: int) -> Scenario:
+    def setup(db):
+        funds = seed_portfolio(db, fund_count, nav_days=1)
+
+        def run():
+            for fund in funds:
+                for row in FundDataFetcher.get_fund_history(fund.fund_code):
+                    crud.upsert_nav_history(db, fund.id, row["date"], row["unit_nav"],
+                                            row["accumulated_nav"], row["daily_growth"])
+        return run
+    return Scenario(f"history_ingestion_{fund_count}", f"拉取并写入 {fund_count} 只基金历史净值",
+                    setup)
+
+
+def _nav_history_sync(fund_count: int) -> Scenario:
+    def setup(db):
+        from app.services.nav_sync import sync_nav_history
+
+        # 回放数据最新净值为 2024-05-31（周五），先完成一次基线同步，每轮把水位线回退一周
+        funds = seed_portfolio(db, fund_count, nav_days=1)
+        now = datetime(2024, 5, 31, 21, 0, 0)
+        sync_nav_history(db, now=now)
+
+        def run():
+            db.query(models.FundSyncState).update(
+                {"last_nav_date": date(2024, 5, 24), "next_eligible_at": None}, synchronize_session=False
+            )
+            db.commit()
+            return sync_nav_history(db, [f.id for f in funds], now=now)
+        return run
+    return Scenario(f"nav_history_sync_{fund_count}", f"增量同步 {fund_count} 只基金净值历史（每只缺 5 个交易日）",
+                    setup)
+
+
+def _fix_stock_names(row_count: int) -> Scenario:
+    def setup(db):
+        # 每只基金 100 条持仓（10 个报告期 × 10 只股票），约 12% 的名称为空、乱码或带控制字符
+        funds = seed_portfolio(db, row_count // 100, nav_days=1)
+        stocks = list(load_fixture("tushare_stock_basic")[["ts_code", "name"]].itertuples(index=False))
+        now = datetime(2024, 6, 1, 12, 0, 0)
+        rows = []
+        for f in funds:
+            for quarter in range(10):
+                report_date = date(2022 + quarter // 4, 3 * (quarter % 4) + 1, 1)
+                for n, (code, name) in enumerate(stocks[(f.id * 7 + quarter) % 4000:][:10]):
+                    bucket = (f.id + quarter + n) % 25
+                    if bucket == 0:
+                        name = ""
+                    elif bucket in (1, 2):
+                        name = name.encode("utf-8").decode("gbk", errors="replace")
+                    rows.append({"fund_id": f.id, "stock_code": code, "stock_name": name,
+                                 "weight": Decimal("0.0500"), "report_date": report_date,
+                                 "created_at": now, "updated_at": now})
+        db.bulk_insert_mappings(models.FundStockPosition, rows)
+        db.commit()
+        return lambda: stock_positions.fix_all_stock_names(fund_id=None, dry_run=True, db=db)
+    return Scenario(f"fix_stock_names_{row_count // 1000}k", f"批量修复股票名称（{row_count} 条持仓，dry run）",
+                    setup)
+
+
+def _stock_master_names(count: int) -> Scenario:
+    def setup(db):
+        from app.services.tushare_service import tushare_service
+        from app.utils import encoding
+
+        def run():
+            # 冷启动：清空名称校验的进程内缓存，衡量 stock_basic 全量名称的清理和校验
+            for func in (encoding.validate_chinese_name, encoding.repair_stock_name):
+                getattr(func, "cache_clear", lambda: None)()
+            return tushare_service._load_stock_master()
+        return run
+    return Scenario(f"stock_master_names_{count}", f"stock_basic 名称清理与校验（{count} 只股票）",
+                    setup)
+
+
+def _ensure_stock_names(count: int) -> Scenario:
+    def setup(db):
+        from app.services.tushare_service import tushare_service
+
+        # 约一成名称为空或乱码，其余为有效名称
+        positions = []
+        for n, (code, name) in enumerate(load_fixture("tushare_stock_basic")[["ts_code", "name"]].head(count)
+                                         .itertuples(index=False)):
+            if n % 20 == 0:
+                name = ""
+            elif n % 20 == 1:
+                name = name.encode("utf-8").decode("gbk", errors="replace")
+            positions.append({"stock_code": code, "stock_name": name})
+        return lambda: tushare_service.ensure_stock_names(positions)
+    return Scenario(f"ensure_stock_names_{count}", f"持仓股票名称校验与补充（{count} 条）",
+                    setup)
+
+
+SCENARIOS: List[Scenario] = [
+    _sync_funds(50),
+    _portfolio_summary(10),
+    _portfolio_summary(100),
+    _portfolio_summary(1000),
+    _batch_realtime_valuation(100),
+    _dashboard(100),
+    _position_sync(10),
+    _history_ingestion(5),
+    _nav_history_sync(50),
+    _fix_stock_names(100000),
+    _stock_master_names(5000),
+    _ensure_stock_names(5000),
+]
+
+
+def _reference_workload() -> None:
+    """参考负载：固定的 SQLite 写入 / 聚合和 Python 对象处理，用于把场景耗时换算为相对耗时"""
+    SessionLocal = create_sqlite_session_factory()
+    with SessionLocal() as db:
+        seed_portfolio(db, 20, nav_days=20)
+        rows = db.query(models.NavHistory).all()
+        json.dumps([{"fund_id": r.fund_id, "date": r.date, "nav": r.unit_nav} for r in rows], default=str)
+    SessionLocal.kw["bind"].dispose()
+
+
+def measure_reference(repeat: int) -> float:
+    """参考负载耗时的中位数（毫秒）；每个场景前单独测量，跟随运行期间的机器负载变化"""
+    _reference_workload()  # 预热
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _reference_workload()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_scenario(scenario: Scenario, repeat: int, warmup: int) -> Dict[str, float]:
+    """预热 warmup 次后重复执行 repeat 次，返回耗时统计（毫秒）和单次执行的 SQL 语句数"""
+    SessionLocal = create_sqlite_session_factory()
+    engine = SessionLocal.kw["bind"]
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    with SessionLocal() as db:
+        func = scenario.setup(db)
+        # 预热：首次执行包含导入和 fixture 解析，同时让写入类场景和进程内缓存进入稳态
+        for _ in range(max(1, warmup)):
+            func()
+        samples = []
+        for _ in range(repeat):
+            statements[0] = 0
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+    engine.dispose()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "queries": statements[0],
+        "repeat": repeat,
+    }
+
+
+def load_baseline() -> Dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_baseline(results: Dict[str, Dict[str, float]], reference_ms: float):
+    payload = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "reference_ms": round(reference_ms, 3),  # 各场景参考负载耗时的中位数
+        },
+        "scenarios": results,
+    }
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="离线基准套件（回放录制数据）")
+    parser.add_argument("--repeat", type=int, default=15, help="每个场景的计时次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个场景计时前的预热次数")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="允许的相对耗时回退幅度")
+    parser.add_argument("--strict-timing", action="store_true", help="相对耗时回退也计为失败（默认只提示）")
+    parser.add_argument("--only", default="", help="只运行名称包含该字符串的场景")
+    parser.add_argument("--update-baseline", action="store_true", help="运行全部场景并写入新基线")
+    args = parser.parse_args()
+
+    if args.update_baseline and args.only:
+        parser.error("--update-baseline 需要运行全部场景，不能与 --only 同时使用")
+
+    # 业务代码的 INFO 日志量很大，基准时只保留告警
+    logging.basicConfig(level=logging.WARNING)
+
+    scenarios = [s for s in SCENARIOS if args.only in s.name]
+    baseline = load_baseline().get("scenarios", {})
+    results = {}
+    query_regressions = []
+    timing_regressions = []
+
+    references = []
+    print("=" * 96)
+    print(f"离线基准套件（SQLite 内存库 + 回放数据，repeat={args.repeat}）")
+    print("=" * 96)
+    print(f"{'场景':<32}{'中位数 ms':>12}{'相对耗时':>10}{'基线':>10}{'变化':>8}{'SQL':>8}{'基线':>8}")
+
+    with stub_clients():
+        for scenario in scenarios:
+            reference_ms = measure_reference(5)
+            references.append(reference_ms)
+            stats = run_scenario(scenario, args.repeat, args.warmup)
+            stats["reference_ms"] = round(reference_ms, 3)
+            stats["relative"] = round(stats["median_ms"] / reference_ms, 4)
+            results[scenario.name] = stats
+
+            base = baseline.get(scenario.name)
+            line = f"{scenario.name:<32}{stats['median_ms']:>12.1f}{stats['relative']:>10.3f}"
+            if not base or "relative" not in base:
+                print(f"{line}{'-':>10}{'-':>8}{stats['queries']:>8}{'-':>8}")
+                continue
+
+            flags = []
+            change = stats["relative"] / base["relative"] - 1
+            if change > args.tolerance:
+                timing_regressions.append(scenario.name)
+                flags.append("耗时")
+            if stats["queries"] > base["queries"]:
+                query_regressions.append(scenario.name)
+                flags.append("SQL")
+            flag = f"  ✗ {'/'.join(flags)}" if flags else ""
+            print(f"{line}{base['relative']:>10.3f}{change:>+8.0%}{stats['queries']:>8}{base['queries']:>8}{flag}")
+
+    print("=" * 96)
+
+    if args.update_baseline:
+        write_baseline(results, statistics.median(references))
+        print(f"基线已写入 {BASELINE_PATH}")
+        return 0
+
+    if timing_regressions:
+        print(f"相对耗时回退（超过 {args.tolerance:.0%}）: {', '.join(timing_regressions)}")
+    if query_regressions:
+        print(f"SQL 语句数增加: {', '.join(query_regressions)}")
+    if query_regressions or (args.strict_timing and timing_regressions):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
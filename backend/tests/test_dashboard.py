@@ -0,0 +1,79 @@
+"""首页看板缓存：按失效标签删除受影响的部分，summary / holdings 共用一次后台加载"""
+import json
+import time
+
+import pytest
+
+from app import models
+from app.services import dashboard
+from app.utils.cache_invalidation import invalidation_bus
+from app.utils.swr_cache import swr_cache
+
+
+def cached_sections(fake_redis):
+    return {section for section, key in dashboard.SECTION_KEYS.items() if fake_redis.exists(key)}
+
+
+@pytest.mark.parametrize("tag, remaining", [
+    ("nav:000001", {"funds"}),
+    ("positions:000001", {"summary", "holdings", "valuations"}),
+    ("transactions:*", {"funds", "valuations"}),
+    ("fund:000001", {"valuations"}),
+])
+def test_fund_write_purges_dependent_sections(fake_redis, tag, remaining):
+    for section, key in dashboard.SECTION_KEYS.items():
+        swr_cache.write(key, {"section": section}, ttl=600, tags=dashboard.SECTION_TAGS[section])
+
+    invalidation_bus.invalidate([tag])
+
+    assert cached_sections(fake_redis) == remaining
+
+
+@pytest.mark.parametrize("change", ["create", "rename", "retype", "delete"])
+def test_fund_table_writes_purge_dashboard_sections(fake_redis, session_factory, change):
+    invalidation_bus.install(session_factory)
+    db = session_factory()
+    fund = models.Fund(fund_code="000001", fund_name="测试基金", fund_type="混合型")
+    if change != "create":
+        db.add(fund)
+        db.commit()
+    for section, key in dashboard.SECTION_KEYS.items():
+        swr_cache.write(key, {"section": section}, ttl=600, tags=dashboard.SECTION_TAGS[section])
+
+    if change == "create":
+        db.add(fund)
+    elif change == "rename":
+        fund.fund_name = "新名称"
+    elif change == "retype":
+        fund.fund_type = "股票型"
+    else:
+        db.delete(fund)
+    db.commit()
+    db.close()
+
+    assert cached_sections(fake_redis) == {"valuations"}
+
+
+def test_stale_portfolio_sections_refresh_with_one_load(fake_redis, monkeypatch):
+    loads = []
+
+    def load_portfolio(db):
+        loads.append(db)
+        return {"summary": {"total": len(loads)}, "holdings": [len(loads)]}
+
+    monkeypatch.setattr(dashboard, "SessionLocal", lambda: type("Session", (), {"close": lambda self: None})())
+    monkeypatch.setattr(dashboard, "_load_portfolio", load_portfolio)
+    stale_at = time.time() - 24 * 3600
+    fake_redis.set(dashboard.SECTION_KEYS["summary"], json.dumps({"at": stale_at, "value": {"total": 0}}))
+    fake_redis.set(dashboard.SECTION_KEYS["holdings"], json.dumps({"at": stale_at, "value": [0]}))
+
+    assert dashboard._portfolio_sections() == {"summary": {"total": 0}, "holdings": [0]}
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(
+        swr_cache.read(dashboard.SECTION_KEYS[section]).stored_at == stale_at for section in ("summary", "holdings")
+    ):
+        time.sleep(0.01)
+    assert len(loads) == 1
+    assert swr_cache.read(dashboard.SECTION_KEYS["summary"]).value == {"total": 1}
+    assert swr_cache.read(dashboard.SECTION_KEYS["holdings"]).value == [1]
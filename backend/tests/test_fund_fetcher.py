@@ -0,0 +1,20 @@
+"""基金净值并发获取：工作线程继承调用方的请求上下文"""
+from app.services.fund_fetcher import FundDataFetcher
+from app.utils.retry_helper import deadline, remaining_time
+
+
+def test_get_fund_navs_keeps_caller_deadline(monkeypatch):
+    remaining = {}
+
+    def get_fund_nav(fund_code):
+        remaining[fund_code] = remaining_time()
+        return None if fund_code == "000003" else {"fund_code": fund_code}
+
+    monkeypatch.setattr(FundDataFetcher, "get_fund_nav", staticmethod(get_fund_nav))
+
+    with deadline(5):
+        navs = FundDataFetcher.get_fund_navs(["000001", "000002", "000001", "000003"])
+
+    assert list(navs) == ["000001", "000002"]
+    assert set(remaining) == {"000001", "000002", "000003"}
+    assert all(value is not None and 0 < value <= 5 for value in remaining.values())
@@ -0,0 +1,26 @@
+"""默认 JSON 响应类与标准库渲染的兼容性"""
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.utils.json_response import CustomJSONResponse, FastJSONResponse
+
+PAYLOAD = {"fund_name": "测试基金", "unit_nav": Decimal("1.2345"), "date": date(2024, 5, 31), "rate": 1.5}
+
+
+def render(response_cls, content) -> bytes:
+    return response_cls.__new__(response_cls).render(content)
+
+
+def test_fast_response_matches_stdlib_output():
+    assert render(FastJSONResponse, PAYLOAD) == render(CustomJSONResponse, PAYLOAD)
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_non_finite_floats_render_as_null(value):
+    # 标准库渲染（allow_nan=False）抛出，默认响应类输出 null
+    with pytest.raises(ValueError):
+        render(CustomJSONResponse, {"rate": value})
+    assert json.loads(render(FastJSONResponse, {"rate": value})) == {"rate": None}
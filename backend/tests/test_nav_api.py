@@ -0,0 +1,39 @@
+"""净值接口路由"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import models
+from app.services import nav_sync
+
+
+def test_sync_status_is_not_matched_as_fund_code(client, db):
+    fund = models.Fund(fund_code="000001", fund_name="测试基金")
+    db.add(fund)
+    db.flush()
+    db.add(models.FundSyncState(fund_id=fund.id, consecutive_failures=2, last_error="timeout",
+                                last_attempt_at=datetime(2026, 10, 16, 20, 0)))
+    db.add(models.SyncJobRun(job=nav_sync.NIGHTLY_JOB, run_date=date(2026, 10, 16), status="partial",
+                             attempts=1, funds_total=1, funds_failed=1))
+    db.commit()
+
+    response = client.get("/api/nav/sync-status")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [run["status"] for run in body["runs"]] == ["partial"]
+    assert body["failing_funds"][0]["fund_code"] == "000001"
+    assert body["failing_funds"][0]["consecutive_failures"] == 2
+
+
+def test_latest_nav_route_still_matches_fund_code(client, db):
+    fund = models.Fund(fund_code="000001", fund_name="测试基金")
+    db.add(fund)
+    db.flush()
+    db.add(models.NavHistory(fund_id=fund.id, date=date(2026, 10, 16), unit_nav=Decimal("1.2345")))
+    db.commit()
+
+    response = client.get("/api/nav/000001")
+
+    assert response.status_code == 200
+    assert response.json()["date"] == "2026-10-16"
+    assert client.get("/api/nav/999999").status_code == 404
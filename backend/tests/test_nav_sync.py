@@ -0,0 +1,76 @@
+"""净值历史增量同步：首次运行的水位线和请求截止时间"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app import crud, models
+from app.config import settings
+from app.services import nav_sync
+from app.services.fund_fetcher import FundDataFetcher
+from app.utils.retry_helper import deadline, remaining_time
+
+NOW = datetime(2024, 5, 31, 23, 0, 0)  # 周五晚间，预期净值日期为当天
+
+
+def nav_row(day: date) -> dict:
+    return {"date": day, "unit_nav": Decimal("1.2345"), "accumulated_nav": Decimal("2.3456"),
+            "daily_growth": Decimal("0.1")}
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    calls = []
+
+    def fetch_nav_history(fund_code, pz=None):
+        calls.append({"fund_code": fund_code, "pz": pz, "remaining": remaining_time()})
+        return [nav_row(date(2024, 5, 30)), nav_row(date(2024, 5, 31))]
+
+    monkeypatch.setattr(FundDataFetcher, "fetch_nav_history", staticmethod(fetch_nav_history))
+    return calls
+
+
+def add_fund(db, code, nav_dates=()):
+    fund = models.Fund(fund_code=code, fund_name=f"基金{code}")
+    db.add(fund)
+    db.flush()
+    for day in nav_dates:
+        db.add(models.NavHistory(fund_id=fund.id, date=day, unit_nav=Decimal("1.2")))
+    db.commit()
+    return fund
+
+
+def test_first_run_seeds_watermark_from_existing_history(db, fetch_calls):
+    synced = add_fund(db, "000001", [date(2024, 5, 28), date(2024, 5, 29)])
+    new = add_fund(db, "000002")
+
+    result = nav_sync.sync_nav_history(db, now=NOW)
+
+    pz = {call["fund_code"]: call["pz"] for call in fetch_calls}
+    assert pz["000001"] == nav_sync.trading_days_between(date(2024, 5, 29), date(2024, 5, 31)) \
+        + settings.NAV_SYNC_PAGE_MARGIN
+    assert pz["000002"] is None  # 没有任何净值记录：下载全部历史
+    states = crud.get_fund_sync_states(db, [synced.id, new.id])
+    assert states[synced.id].last_nav_date == date(2024, 5, 31)
+    assert states[new.id].last_nav_date == date(2024, 5, 31)
+    assert result.rows_written == 4
+
+
+def test_up_to_date_history_is_not_fetched(db, fetch_calls):
+    add_fund(db, "000001", [date(2024, 5, 30), date(2024, 5, 31)])
+
+    result = nav_sync.sync_nav_history(db, now=NOW)
+
+    assert fetch_calls == []
+    assert result.skipped == 1
+
+
+def test_fetches_run_within_the_caller_deadline(db, fetch_calls):
+    for code in ("000001", "000002", "000003"):
+        add_fund(db, code)
+
+    with deadline(5):
+        nav_sync.sync_nav_history(db, now=NOW)
+
+    assert len(fetch_calls) == 3
+    assert all(call["remaining"] is not None and 0 < call["remaining"] <= 5 for call in fetch_calls)
@@ -0,0 +1,102 @@
+"""持仓反向索引：并发读取和加载期间的失效"""
+import threading
+
+import pytest
+
+from app.services import position_index as position_index_module
+from app.services.position_index import PositionIndex
+
+ROWS = [("000001", "600000", 0.05), ("000001", "000002", 0.03), ("000002", "600000", 0.04)]
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def weights_query(monkeypatch):
+    """替换数据库查询：记录调用参数，started 在查询开始时置位，release 置位前查询不会返回，error 不为空时抛出"""
+    query = type("Query", (), {})()
+    query.calls = []
+    query.started = threading.Event()
+    query.release = threading.Event()
+    query.release.set()
+    query.error = None
+
+    def get_latest_stock_weights(db, fund_codes=None):
+        query.calls.append(fund_codes)
+        if query.error:
+            raise query.error
+        query.started.set()
+        assert query.release.wait(5)
+        return [row for row in ROWS if fund_codes is None or row[0] in fund_codes]
+
+    monkeypatch.setattr(position_index_module, "SessionLocal", FakeSession)
+    monkeypatch.setattr(position_index_module.crud, "get_latest_stock_weights", get_latest_stock_weights)
+    return query
+
+
+def test_concurrent_reader_waits_for_build(weights_query):
+    index = PositionIndex()
+    weights_query.release.clear()
+    builder = threading.Thread(target=index.ensure_fresh)
+    builder.start()
+    assert weights_query.started.wait(5)
+
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(funds=index.funds_holding("600000")))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()  # 正在构建：读取等待，而不是返回空索引
+
+    weights_query.release.set()
+    builder.join(5)
+    reader.join(5)
+    assert result["funds"] == {"000001": 0.05, "000002": 0.04}
+    assert weights_query.calls == [None]
+
+
+def test_invalidation_during_build_is_kept(weights_query):
+    index = PositionIndex()
+    weights_query.release.clear()
+    builder = threading.Thread(target=index.ensure_fresh)
+    builder.start()
+    assert weights_query.started.wait(5)
+    index.invalidate(None)
+    weights_query.release.set()
+    builder.join(5)
+
+    index.ensure_fresh()
+    assert weights_query.calls == [None, None]
+    index.ensure_fresh()
+    assert weights_query.calls == [None, None]
+
+
+def test_partial_reload_keeps_funds_invalidated_meanwhile(weights_query):
+    index = PositionIndex()
+    index.ensure_fresh()
+    index.invalidate({"000001"})
+
+    weights_query.release.clear()
+    weights_query.started.clear()
+    builder = threading.Thread(target=index.ensure_fresh)
+    builder.start()
+    assert weights_query.started.wait(5)
+    index.invalidate({"000002"})
+    weights_query.release.set()
+    builder.join(5)
+
+    index.ensure_fresh()
+    assert weights_query.calls == [None, ["000001"], ["000001", "000002"]]
+
+
+def test_failed_build_stays_stale(weights_query):
+    index = PositionIndex()
+    weights_query.error = RuntimeError("database unavailable")
+    with pytest.raises(RuntimeError):
+        index.ensure_fresh()
+
+    weights_query.error = None
+    assert index.stocks_of("000002") == {"600000": 0.04}
+    assert weights_query.calls == [None, None]
@@ -0,0 +1,88 @@
+"""行情采集链路：模拟行情源 → 共享内存看板 / Redis → get_stock_realtime（离线运行）"""
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.fund_fetcher import FundDataFetcher
+from app.services.quote_board import QuoteBoard, QuoteBoardWriter
+from app.services.quote_feed import FakeQuoteProducer, QuoteIngestion
+from app.services.quote_stream import RedisQuoteSink, quote_stream
+from app.services.tushare_service import tushare_service
+
+CODES = ["600519.SH", "000001.SZ", "510300.SH", "159915.SZ"]
+
+
+@pytest.fixture
+def stream_mode(monkeypatch, fake_redis):
+    monkeypatch.setattr(settings, "QUOTE_SOURCE", "stream")
+    monkeypatch.setattr(settings, "QUOTE_BOARD_ENABLED", False)
+    return fake_redis
+
+
+@pytest.fixture
+def board_writer(tmp_path):
+    writer = QuoteBoardWriter(str(tmp_path / "quote_board"), capacity=64)
+    writer.open()
+    yield writer
+    writer.close()
+
+
+def test_one_poll_feeds_board_and_redis(stream_mode, board_writer):
+    producer = FakeQuoteProducer(CODES, seed=1)
+    ingestion = QuoteIngestion(producer, [board_writer, RedisQuoteSink()])
+
+    assert ingestion.poll_once() == {"quote_board": 4, "redis": 4}
+
+    from_board = QuoteBoard(board_writer.path).read(CODES)
+    from_redis = quote_stream.read(CODES)
+    assert set(from_board) == set(from_redis) == set(CODES)
+    for code in CODES:
+        assert from_board[code]["price"] == from_redis[code]["price"]
+        assert from_board[code]["change_pct"] == from_redis[code]["change_pct"]
+
+
+def test_stream_mode_serves_realtime_quotes_from_redis(stream_mode, monkeypatch):
+    service = tushare_service._get_instance()
+    monkeypatch.setattr(service, "_fetch_realtime_quotes", lambda codes: pytest.fail("upstream called"))
+    QuoteIngestion(FakeQuoteProducer(CODES, seed=2), [RedisQuoteSink()]).poll_once()
+
+    quotes = service.get_stock_realtime(CODES + ["300750.SZ"])
+
+    assert set(quotes) == set(CODES)
+    assert all(quote["data_source"] == "quote_stream" for quote in quotes.values())
+    assert quotes["600519.SH"]["name"] == "模拟600519"
+
+
+def test_stream_records_only_changed_quotes(stream_mode):
+    producer = FakeQuoteProducer(CODES, seed=3, change_ratio=0.5)
+    ingestion = QuoteIngestion(producer, [RedisQuoteSink()])
+
+    ingestion.poll_once()
+    ingestion.poll_once()
+    updates = quote_stream.read_updates()
+
+    assert [len(quotes) for _, quotes in updates] == [4, 2]
+    last_id = updates[0][0]
+    assert [entry_id for entry_id, _ in quote_stream.read_updates(last_id)] == [updates[1][0]]
+
+
+def test_empty_producer_writes_nothing(stream_mode):
+    assert QuoteIngestion(lambda: {}, [RedisQuoteSink()]).poll_once() == {}
+    assert quote_stream.read(CODES) == {}
+
+
+@pytest.mark.parametrize("trading", [True, False])
+def test_stream_mode_rejects_stale_quotes(stream_mode, monkeypatch, trading):
+    service = tushare_service._get_instance()
+    monkeypatch.setattr(service, "_fetch_realtime_quotes", lambda codes: pytest.fail("upstream called"))
+    monkeypatch.setattr(service, "_is_trading_time", lambda: trading)
+    monkeypatch.setattr(FundDataFetcher, "is_trading_time", staticmethod(lambda: trading))
+    QuoteIngestion(FakeQuoteProducer(CODES, seed=4), [RedisQuoteSink()]).poll_once()
+    assert set(service.get_stock_realtime(CODES)) == set(CODES)
+
+    # 采集 worker 停止三天后，哈希中的旧价格不能再作为实时行情返回
+    stream_mode.hset(settings.QUOTE_LATEST_KEY, "_updated_at", repr(time.time() - 3 * 86400))
+
+    assert service.get_stock_realtime(CODES) == {}
+    assert FundDataFetcher.get_ingested_listed_quotes(["510300", "159915"]) == {}
@@ -0,0 +1,116 @@
+"""行情对冲请求：用本地桩数据源验证胜出 / 落后数据源和请求截止时间的传递"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import settings
+from app.services.quote_hedging import LatencyTracker, QuoteHedger
+from app.utils.retry_helper import deadline, remaining_time
+
+CODES = ["600519.SH"]
+
+
+def stub(name, delay=0.0, result=True, calls=None):
+    def source(stock_codes):
+        if calls is not None:
+            calls.append(name)
+        time.sleep(delay)
+        return {code: {"code": code, "source": name} for code in stock_codes} if result else {}
+    return source
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+@pytest.fixture(autouse=True)
+def hedge_delay(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTE_HEDGE_DELAY_DEFAULT", 0.05)
+
+
+def test_primary_wins_before_hedge_delay(executor):
+    calls = []
+    hedger = QuoteHedger([("primary", stub("primary", calls=calls)), ("backup", stub("backup", calls=calls))],
+                         tracker=LatencyTracker(), executor=executor)
+
+    source, quotes = hedger.fetch(CODES)
+
+    assert source == "primary"
+    assert quotes["600519.SH"]["source"] == "primary"
+    assert calls == ["primary"]
+
+
+def test_backup_wins_when_primary_is_slow(executor):
+    hedger = QuoteHedger([("primary", stub("primary", delay=0.5)), ("backup", stub("backup"))],
+                         tracker=LatencyTracker(), executor=executor)
+
+    start = time.perf_counter()
+    source, quotes = hedger.fetch(CODES)
+
+    assert source == "backup"
+    assert quotes["600519.SH"]["source"] == "backup"
+    assert time.perf_counter() - start < 0.4
+
+
+def test_empty_primary_starts_backup_immediately(executor, monkeypatch):
+    monkeypatch.setattr(settings, "QUOTE_HEDGE_DELAY_DEFAULT", 5.0)
+    hedger = QuoteHedger([("primary", stub("primary", result=False)), ("backup", stub("backup"))],
+                         tracker=LatencyTracker(), executor=executor)
+
+    start = time.perf_counter()
+    source, _ = hedger.fetch(CODES)
+
+    assert source == "backup"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_all_sources_failing_returns_none(executor):
+    def broken(stock_codes):
+        raise ConnectionError("down")
+
+    hedger = QuoteHedger([("primary", broken), ("backup", stub("backup", result=False))],
+                         tracker=LatencyTracker(), executor=executor)
+
+    assert hedger.fetch(CODES) == (None, {})
+
+
+def test_loser_latency_is_recorded(executor):
+    tracker = LatencyTracker()
+    loser_done = threading.Event()
+
+    def slow_primary(stock_codes):
+        time.sleep(0.2)
+        loser_done.set()
+        return {"600519.SH": {}}
+
+    hedger = QuoteHedger([("primary", slow_primary), ("backup", stub("backup"))], tracker=tracker, executor=executor)
+
+    assert hedger.fetch(CODES)[0] == "backup"
+    assert loser_done.wait(1.0)
+    time.sleep(0.05)
+    assert tracker.percentile("primary", 50, min_samples=1) >= 0.2
+
+
+def test_sources_run_with_caller_deadline(executor):
+    seen = {}
+
+    def source(name, delay):
+        def fetch(stock_codes):
+            seen[name] = remaining_time()
+            time.sleep(delay)
+            return {"600519.SH": {}}
+        return fetch
+
+    hedger = QuoteHedger([("primary", source("primary", 0.3)), ("backup", source("backup", 0))],
+                         tracker=LatencyTracker(), executor=executor)
+
+    with deadline(3):
+        assert hedger.fetch(CODES)[0] == "backup"
+    time.sleep(0.35)
+
+    assert set(seen) == {"primary", "backup"}
+    assert all(remaining is not None and 0 < remaining <= 3 for remaining in seen.values())
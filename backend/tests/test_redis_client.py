@@ -0,0 +1,41 @@
+"""RedisClient 延迟初始化的线程安全"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fakeredis
+import pytest
+import redis
+
+from app.utils import redis_client as redis_client_module
+from app.utils.redis_client import RedisClient
+
+
+def slow_redis(ping_error=None):
+    class SlowRedis(fakeredis.FakeRedis):
+        def __init__(self, connection_pool=None, **kwargs):
+            super().__init__(decode_responses=True)
+
+        def ping(self, **kwargs):
+            time.sleep(0.2)
+            if ping_error:
+                raise ping_error
+            return True
+
+    return SlowRedis
+
+
+@pytest.mark.parametrize("ping_error, expected", [(None, True), (redis.ConnectionError("refused"), False)])
+def test_concurrent_first_use_waits_for_connection(monkeypatch, ping_error, expected):
+    monkeypatch.setattr(redis_client_module.redis, "Redis", slow_redis(ping_error))
+    client = RedisClient()
+    start = threading.Barrier(8)
+
+    def check():
+        start.wait()
+        return client.is_available(), client._client is not None
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: check(), range(8)))
+
+    assert results == [(expected, expected)] * 8
@@ -0,0 +1,31 @@
+"""SQL 执行统计：指标和 SQL 分析共用一组游标执行钩子"""
+from sqlalchemy import create_engine, text
+
+from app.utils import metrics, sql_profiler
+
+
+def test_statement_is_timed_once_for_metrics_and_profiler(monkeypatch):
+    monkeypatch.setattr(metrics, "_query_listeners", [])
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(engine)
+    sql_profiler.install_sql_profiler()
+    sql_profiler.install_sql_profiler()
+
+    stats = metrics.RequestDBStats()
+    profile = sql_profiler.QueryProfile()
+    stats_token = metrics._request_db_stats.set(stats)
+    profile_token = sql_profiler._current_profile.set(profile)
+    try:
+        with engine.connect() as conn:
+            for fund_id in (1, 2, 3):
+                conn.execute(text("SELECT :fund_id"), {"fund_id": fund_id})
+    finally:
+        sql_profiler._current_profile.reset(profile_token)
+        metrics._request_db_stats.reset(stats_token)
+
+    assert stats.count == 3
+    assert profile.count == 3
+    assert profile.duration == stats.duration
+    assert profile.repeated_shapes(3) == [("SELECT ?", 3, profile.duration)]
+
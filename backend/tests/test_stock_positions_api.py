@@ -0,0 +1,30 @@
+"""股票持仓接口：批量修复股票名称"""
+from datetime import date
+
+from app import models
+from app.services.tushare_service import tushare_service
+
+
+def test_fix_names_dry_run_count_matches_real_run(client, db, monkeypatch):
+    names = {"600519.SH": "贵州茅台", "000001.SZ": "平安银行", "300750.SZ": "宁德时代"}
+    monkeypatch.setattr(tushare_service, "lookup_stock_names", lambda codes: {c: names[c] for c in codes})
+    funds = [models.Fund(fund_code=code, fund_name=f"基金{code}") for code in ("000001", "000002")]
+    db.add_all(funds)
+    db.flush()
+    report_date = date(2026, 6, 30)
+    db.add_all([
+        models.FundStockPosition(fund_id=funds[0].id, stock_code="600519.SH", stock_name="", report_date=report_date),
+        models.FundStockPosition(fund_id=funds[0].id, stock_code="000001.SZ", stock_name=None, report_date=report_date),
+        models.FundStockPosition(fund_id=funds[0].id, stock_code="300750.SZ", stock_name="宁德时代",
+                                 report_date=report_date),
+        models.FundStockPosition(fund_id=funds[1].id, stock_code="600519.SH", stock_name="", report_date=report_date),
+    ])
+    db.commit()
+
+    preview = client.post("/api/stock-positions/admin/fix-names", params={"dry_run": True}).json()
+    result = client.post("/api/stock-positions/admin/fix-names").json()
+
+    assert preview["dry_run"] and len(preview["changes"]) == 3
+    assert preview["funds_updated"] == result["funds_updated"] == 3
+    db.expire_all()
+    assert {p.stock_name for p in db.query(models.FundStockPosition)} == {"贵州茅台", "平安银行", "宁德时代"}
@@ -0,0 +1,72 @@
+"""stale-while-revalidate 缓存：过期返回旧值、后台刷新和空值处理"""
+import json
+import time
+
+import pytest
+
+from app.utils.swr_cache import SWRCache
+
+
+@pytest.fixture
+def cache(fake_redis):
+    swr = SWRCache()
+    yield swr
+    if swr._executor is not None:
+        swr._executor.shutdown(wait=True)
+
+
+def store(fake_redis, key, value, age):
+    fake_redis.set(key, json.dumps({"at": time.time() - age, "value": value}), ex=3600)
+
+
+def cached_value(fake_redis, key):
+    return json.loads(fake_redis.get(key))["value"]
+
+
+def wait_for_refresh(cache):
+    cache._executor.shutdown(wait=True)
+    cache._executor = None
+
+
+def test_fresh_entry_is_returned_without_loading(cache, fake_redis):
+    store(fake_redis, "k", {"nav": 1.0}, age=0)
+
+    assert cache.get("k", lambda: pytest.fail("loader called"), ttl=3600) == {"nav": 1.0}
+
+
+def test_stale_entry_is_refreshed_in_background(cache, fake_redis):
+    store(fake_redis, "k", {"nav": 1.0}, age=3000)
+
+    assert cache.get("k", lambda: {"nav": 2.0}, ttl=3600) == {"nav": 1.0}
+    wait_for_refresh(cache)
+
+    assert cached_value(fake_redis, "k") == {"nav": 2.0}
+
+
+def test_background_refresh_returning_none_keeps_old_value(cache, fake_redis):
+    store(fake_redis, "k", {"nav": 1.0}, age=3000)
+
+    assert cache.get("k", lambda: None, ttl=3600, null_ttl=60) == {"nav": 1.0}
+    wait_for_refresh(cache)
+
+    assert cached_value(fake_redis, "k") == {"nav": 1.0}
+    assert fake_redis.ttl("k") > 60
+
+
+def test_background_refresh_failure_keeps_old_value(cache, fake_redis):
+    store(fake_redis, "k", {"nav": 1.0}, age=3000)
+
+    def broken():
+        raise ConnectionError("upstream down")
+
+    assert cache.get("k", broken, ttl=3600) == {"nav": 1.0}
+    wait_for_refresh(cache)
+
+    assert cached_value(fake_redis, "k") == {"nav": 1.0}
+
+
+def test_synchronous_miss_caches_none_with_null_ttl(cache, fake_redis):
+    assert cache.get("k", lambda: None, ttl=3600, null_ttl=60) is None
+
+    assert cached_value(fake_redis, "k") is None
+    assert 0 < fake_redis.ttl("k") <= 60
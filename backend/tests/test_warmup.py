@@ -0,0 +1,41 @@
+"""启动预热：单个阶段失败不影响预热结束和应用启动"""
+import pytest
+
+from app import crud
+from app.services import tushare_service as tushare_module
+from app.services import warmup
+from app.services.fund_fetcher import FundDataFetcher
+
+
+@pytest.fixture
+def warmup_env(fake_redis, session_factory, monkeypatch):
+    monkeypatch.setattr(warmup, "SessionLocal", session_factory)
+    monkeypatch.setattr(crud, "get_held_fund_codes", lambda db: ["000001", "000002"])
+    monkeypatch.setattr(FundDataFetcher, "get_fund_nav", staticmethod(lambda code: {"fund_code": code}))
+    monkeypatch.setattr(FundDataFetcher, "get_fund_info", staticmethod(lambda code: {"fund_code": code}))
+
+
+def test_phase_client_construction_failure_is_contained(warmup_env, monkeypatch):
+    def missing_token():
+        raise ValueError("TUSHARE_TOKEN 未配置，请在 .env 文件中设置 TUSHARE_TOKEN")
+
+    monkeypatch.setattr(tushare_module, "tushare_service", tushare_module._LazyTushareService())
+    monkeypatch.setattr(tushare_module, "TushareService", missing_token)
+
+    timings = warmup.run_warmup()
+
+    assert set(timings) == {"latest_nav", "fund_info", "stock_master"}
+
+
+def test_held_fund_query_failure_is_contained(warmup_env, monkeypatch):
+    def database_down(db):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(crud, "get_held_fund_codes", database_down)
+    monkeypatch.setattr(tushare_module.tushare_service, "_instance", type("Service", (), {
+        "warm_stock_name_cache": lambda self: 5000,
+    })())
+
+    timings = warmup.run_warmup()
+
+    assert set(timings) == {"latest_nav", "fund_info", "stock_master"}
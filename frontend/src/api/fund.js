@@ -24,6 +24,9 @@ export const getRealtimeValuation = (fundCode) => api.get(`/nav/${fundCode}/real
 // 批量获取基金实时估值（基于股票持仓）
 export const getBatchRealtimeValuation = (fundCodes) => api.post('/nav/realtime/batch-stock', fundCodes)
 
+// Dashboard API（汇总、持仓、基金列表和实时估值一次获取）
+export const getDashboard = () => api.get('/dashboard')
+
 // PnL APIs
 export const getPortfolioSummary = () => api.get('/pnl/summary')
 export const getDailyPnL = (fundId, params = {}) => api.get(`/pnl/daily/${fundId}`, { params })
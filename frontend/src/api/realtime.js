@@ -0,0 +1,29 @@
+/**
+ * 实时估值推送通道（WebSocket /ws/realtime）
+ * 服务端统一计算所有订阅基金的估值，只推送发生变化的部分
+ */
+
+/**
+ * 建立实时估值推送连接
+ * @param {string[]} fundCodes 订阅的基金代码
+ * @param {Object} handlers
+ * @param {Function} handlers.onMessage 收到推送 {type, valuations, update_time, is_trading_time}
+ * @param {Function} handlers.onClose 连接关闭（用于降级到轮询）
+ * @returns {WebSocket}
+ */
+export function connectRealtimeValuation(fundCodes, { onMessage, onClose } = {}) {
+  const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+  const socket = new WebSocket(`${protocol}://${window.location.host}/ws/realtime`)
+
+  socket.onopen = () => {
+    socket.send(JSON.stringify({ action: 'subscribe', fund_codes: fundCodes }))
+  }
+  socket.onmessage = (event) => {
+    onMessage && onMessage(JSON.parse(event.data))
+  }
+  socket.onclose = () => {
+    onClose && onClose()
+  }
+
+  return socket
+}
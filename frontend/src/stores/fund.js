@@ -1,6 +1,6 @@
 import { defineStore } from 'pinia'
 import { ref } from 'vue'
-import { getPortfolioSummary } from '@/api/fund'
+import { getDashboard, getPortfolioSummary } from '@/api/fund'
 
 export const useFundStore = defineStore('fund', () => {
   const summary = ref(null)
@@ -15,9 +15,22 @@ export const useFundStore = defineStore('fund', () => {
     }
   }
 
+  // 首页看板：汇总和实时估值一次请求获取，返回完整的看板数据
+  const fetchDashboard = async () => {
+    loading.value = true
+    try {
+      const dashboard = await getDashboard()
+      summary.value = dashboard.summary
+      return dashboard
+    } finally {
+      loading.value = false
+    }
+  }
+
   return {
     summary,
     loading,
-    fetchSummary
+    fetchSummary,
+    fetchDashboard
   }
 })